@@ -0,0 +1,60 @@
+'''
+Compares load_cyclical_data on per-group CSV files against the binary group store.
+
+Usage:
+    python -m benchmarks.bench_group_store [--groups 60] [--numbers 5000] [--repeat 5]
+'''
+import os
+import time
+import argparse
+import tempfile
+import numpy as np
+import pandas as pd
+from contextlib import redirect_stdout
+from utils.analyze_data import load_cyclical_data
+from utils.group_store import import_csv_dir
+
+
+def _best_time(func, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        # load_cyclical_data prints its progress, which would dominate the timing
+        with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+            func()
+        best = min(best, time.perf_counter() - start_time)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--groups', type=int, default=60, help="Number of synthetic groups")
+    parser.add_argument('--numbers', type=int, default=5000, help="Numbers per group")
+    parser.add_argument('--repeat', type=int, default=5, help="Timed runs per path, the best one is reported")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as data_dir:
+        for group_id in range(1, args.groups + 1):
+            numbers = rng.integers(1, 5000, size=args.numbers)
+            pd.DataFrame({'group_id': group_id, 'number': numbers}).to_csv(os.path.join(data_dir, f"{group_id}.csv"), index=False)
+
+        store_path = os.path.join(data_dir, 'groups.bin')
+        with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+            import_csv_dir(data_dir, store_path)
+
+        target_day = args.groups + 1
+        csv_df, _ = load_cyclical_data(target_day, data_dir)
+        store_df, _ = load_cyclical_data(target_day, data_dir, store_path)
+        assert csv_df['number'].tolist() == store_df['number'].tolist()
+
+        csv_time = _best_time(lambda: load_cyclical_data(target_day, data_dir), args.repeat)
+        store_time = _best_time(lambda: load_cyclical_data(target_day, data_dir, store_path), args.repeat)
+
+    print(f"Rows loaded for Day {target_day}: {len(csv_df)}")
+    print(f"CSV path:   {csv_time * 1000:.2f} ms")
+    print(f"Store path: {store_time * 1000:.2f} ms ({csv_time / store_time:.1f}x faster)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,193 @@
+'''
+Offline benchmark suite for the OCR and analysis hot paths.
+
+Synthetic screenshots and group data are generated into a temporary directory, so
+no scraped data or network access is needed. Results are printed and written as
+JSON, so runs can be compared over time.
+
+Usage:
+    python -m benchmarks.run_benchmarks [--images 10] [--numbers 20] [--scale 1.0]
+                                        [--groups 60] [--output bench_results.json]
+                                        [--only ocr,create_csv,analysis]
+'''
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+from datetime import datetime, timezone
+from contextlib import redirect_stdout, redirect_stderr, contextmanager
+from benchmarks.synthetic import write_image_set, write_group_data
+
+BENCHMARKS = ('ocr', 'create_csv', 'analysis')
+
+
+@contextmanager
+def _quiet():
+    # The pipeline prints progress and tqdm bars, which would dominate the timings
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull), redirect_stderr(devnull):
+        yield
+
+
+@contextmanager
+def _working_directory(path):
+    # analyze_data reads data/ and writes plots/ relative to the working directory
+    previous = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
+
+'''
+Args:
+    predicted(list[int]): The numbers the OCR returned for an image.
+    expected(list[int]): The ground truth of the image.
+Returns:
+    int: The numbers read correctly, compared position by position.
+'''
+def _correct_count(predicted, expected):
+    return sum(p == e for p, e in zip(predicted, expected))
+
+
+'''
+Args:
+    ground_truth(dict): {image path: list[int]} from write_image_set.
+    options(dict): Keyword arguments for extract_num_from_img.
+Returns:
+    dict: Throughput and accuracy of extract_num_from_img.
+'''
+def bench_ocr(ground_truth, **options):
+    from utils.extract_num_from_image import extract_num_from_img
+
+    total_expected = sum(len(numbers) for numbers in ground_truth.values())
+    total_read = 0
+    total_correct = 0
+
+    start_time = time.perf_counter()
+    with _quiet():
+        for image_path, expected in ground_truth.items():
+            predicted = extract_num_from_img(image_path, **options)
+            total_read += len(predicted)
+            total_correct += _correct_count(predicted, expected)
+    elapsed = time.perf_counter() - start_time
+
+    return {
+        'options': options,
+        'seconds': elapsed,
+        'images_per_sec': len(ground_truth) / elapsed,
+        'numbers_per_sec': total_read / elapsed,
+        'accuracy': total_correct / total_expected if total_expected else None,
+        'recall': total_read / total_expected if total_expected else None,
+    }
+
+
+'''
+Args:
+    work_dir(str): A directory holding images/ with the synthetic group 1.
+    n_images(int): The number of images of the group.
+    options(dict): Keyword arguments for create_csv.
+Returns:
+    dict: Throughput of create_csv.
+'''
+def bench_create_csv(work_dir, n_images, **options):
+    from utils.extract_csv import create_csv
+
+    start_time = time.perf_counter()
+    with _quiet():
+        create_csv(1, os.path.join(work_dir, 'images'), os.path.join(work_dir, 'data_ocr'), **options)
+    elapsed = time.perf_counter() - start_time
+
+    return {'options': options, 'seconds': elapsed, 'images_per_sec': n_images / elapsed}
+
+
+'''
+Args:
+    work_dir(str): A directory holding data/ with the synthetic groups.
+    n_groups(int): The number of synthetic groups.
+Returns:
+    dict: Throughput of run_full_analysis (without plots) and run_batch_analysis.
+'''
+def bench_analysis(work_dir, n_groups):
+    from utils.analyze_data import run_full_analysis, run_batch_analysis
+
+    target_days = list(range(8, n_groups + 2))
+    results = {}
+    with _working_directory(work_dir), _quiet():
+        start_time = time.perf_counter()
+        for day in target_days:
+            run_full_analysis(day, plot_mode='none')
+        elapsed = time.perf_counter() - start_time
+        results['run_full_analysis'] = {'seconds': elapsed, 'days_per_sec': len(target_days) / elapsed}
+
+        start_time = time.perf_counter()
+        run_batch_analysis(target_days)
+        elapsed = time.perf_counter() - start_time
+        results['run_batch_analysis'] = {'seconds': elapsed, 'days_per_sec': len(target_days) / elapsed}
+
+    return results
+
+
+'''
+Runs a benchmark and records a skip instead of failing the whole suite, e.g. when
+the Tesseract binary isn't installed.
+'''
+def _run(name, func, *args, **kwargs):
+    try:
+        return func(*args, **kwargs)
+    except Exception as e:
+        print(f"[skip] {name}: {type(e).__name__}: {e}")
+        return {'skipped': f"{type(e).__name__}: {e}"}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--images', type=int, default=10, help="Synthetic screenshots")
+    parser.add_argument('--numbers', type=int, default=20, help="Numbers per screenshot")
+    parser.add_argument('--scale', type=float, default=1.0, help="Screenshot resolution multiplier")
+    parser.add_argument('--groups', type=int, default=60, help="Synthetic groups for the analysis benchmarks")
+    parser.add_argument('--output', default='bench_results.json', help="Where the JSON report is written")
+    parser.add_argument('--only', default=','.join(BENCHMARKS), help="Comma-separated benchmarks to run")
+    args = parser.parse_args()
+
+    selected = set(args.only.split(','))
+    report = {
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'parameters': {
+            'images': args.images, 'numbers_per_image': args.numbers,
+            'scale': args.scale, 'groups': args.groups,
+        },
+        'results': {},
+    }
+    results = report['results']
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        ground_truth = write_image_set(
+            os.path.join(work_dir, 'images'), 1, args.images, args.numbers, args.scale
+        )
+        write_group_data(os.path.join(work_dir, 'data'), args.groups)
+
+        if 'ocr' in selected:
+            results['ocr'] = _run('ocr', bench_ocr, ground_truth)
+            results['ocr_batched'] = _run('ocr_batched', bench_ocr, ground_truth, batch_ocr=True)
+        if 'create_csv' in selected:
+            results['create_csv_serial'] = _run('create_csv_serial', bench_create_csv, work_dir, args.images)
+            results['create_csv_parallel'] = _run('create_csv_parallel', bench_create_csv, work_dir, args.images, parallel=True)
+            results['create_csv_tile_dedup'] = _run('create_csv_tile_dedup', bench_create_csv, work_dir, args.images, tile_dedup='exact')
+        if 'analysis' in selected:
+            results['analysis'] = _run('analysis', bench_analysis, work_dir, args.groups)
+
+    print(json.dumps(results, indent=2))
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Benchmark report saved to: {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+'''
+Checks the CLI's startup cost with `python -X importtime`.
+
+Every case runs main.py in a fresh interpreter and sums the cumulative import time of
+the top-level imports, leaving out the packages a bare interpreter already imports
+(site, encodings). One analyze case doesn't count the numpy and pandas import time
+either, so its budget only covers the project's own share; both are taken out of the
+same run they were measured in. A second analyze case counts them, with headroom
+for a slower machine. It fails if that goes
+over budget or if a heavy module that the subcommand doesn't need gets imported.
+Every measurement is the fastest of a few runs, so one slow run doesn't fail a case.
+
+Usage:
+    python -m benchmarks.startup_budget [--scale 1.0] [--repeat 5]
+    python -m pytest tests/test_startup_budget.py
+'''
+import os
+import sys
+import argparse
+import tempfile
+import subprocess
+
+MAIN_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'main.py')
+
+# (name, CLI arguments, import budget in ms, modules that must not be imported,
+#  required modules whose import time isn't counted)
+CASES = [
+    ('help', ['--help'], 20, ['numpy', 'pandas', 'cv2', 'pytesseract', 'matplotlib', 'seaborn', 'requests', 'bs4'], []),
+    ('analyze without plots', ['analyze', '1', '--plots', 'none'], 100,
+     ['cv2', 'pytesseract', 'matplotlib', 'seaborn', 'requests', 'bs4'], ['numpy', 'pandas']),
+    ('analyze without plots, with numpy and pandas', ['analyze', '1', '--plots', 'none'], 1200,
+     ['cv2', 'pytesseract', 'matplotlib', 'seaborn', 'requests', 'bs4'], []),
+]
+
+
+'''
+Args:
+    argv(list[str]): The interpreter arguments after -X importtime.
+    excluded(list[str]): Packages whose import time is left out of the total.
+Returns:
+    float: The total import time in ms.
+    set[str]: The names of every imported top-level package.
+'''
+def measure_imports(argv, excluded=()):
+    # Run from an empty directory, so the analysis finds no data and returns right away
+    with tempfile.TemporaryDirectory() as work_dir:
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', *argv],
+            cwd=work_dir, capture_output=True, text=True
+        )
+
+    total_us = 0
+    packages = set()
+    # Parents come after their children, so walk backwards and keep the chain of open parents
+    parents = []
+    lines = [line for line in result.stderr.splitlines() if line.startswith('import time:') and 'cumulative' not in line]
+    for line in reversed(lines):
+        _, cumulative, name = (part.strip() for part in line[len('import time:'):].split('|'))
+        depth = len(line.rsplit('|', 1)[1]) - len(line.rsplit('|', 1)[1].lstrip())
+        while parents and parents[-1][0] >= depth:
+            parents.pop()
+
+        package = name.split('.')[0]
+        packages.add(package)
+        # Top-level imports are not indented, nested ones are already in their parent's cumulative time
+        if not parents:
+            total_us += int(cumulative)
+        # An excluded package is subtracted where it's first imported, e.g. numpy inside pandas
+        # is already part of the pandas time
+        if name == package and package in excluded and not any(parent in excluded for _, parent in parents):
+            total_us -= int(cumulative)
+        parents.append((depth, package))
+
+    return total_us / 1000, packages
+
+
+'''
+Returns:
+    float: The fastest total import time of `repeat` runs of measure_imports, in ms.
+    set[str]: The names of every imported top-level package.
+'''
+def best_of(argv, repeat, excluded=()):
+    runs = [measure_imports(argv, excluded) for _ in range(repeat)]
+    return min(total_ms for total_ms, _ in runs), runs[0][1]
+
+
+'''
+Args:
+    case(tuple): An entry of CASES.
+    baseline_packages(set[str]): The packages a bare interpreter imports, see best_of.
+    repeat(int): Runs per measurement.
+    scale(float): The budget multiplier.
+Returns:
+    float: The import time of the case in ms.
+    float: Its budget in ms.
+    list[str]: The forbidden modules that were imported.
+'''
+def check_case(case, baseline_packages, repeat, scale=1.0):
+    _, cli_args, budget_ms, forbidden, required = case
+    total_ms, packages = best_of([MAIN_PATH, *cli_args], repeat, set(baseline_packages) | set(required))
+    return total_ms, budget_ms * scale, sorted(set(forbidden) & packages)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', type=float, default=1.0, help="Multiply every budget, for slow machines")
+    parser.add_argument('--repeat', type=int, default=5, help="Runs per measurement, the fastest counts")
+    args = parser.parse_args()
+
+    baseline_ms, baseline_packages = best_of(['-c', 'pass'], args.repeat)
+    print(f"Bare interpreter imports: {baseline_ms:.1f} ms in {len(baseline_packages)} packages (not counted below)")
+
+    failures = 0
+    for case in CASES:
+        name, required = case[0], case[4]
+        total_ms, budget_ms, leaked = check_case(case, baseline_packages, args.repeat, args.scale)
+
+        status = 'FAIL' if leaked or total_ms > budget_ms else 'ok'
+        required_note = f", not counting {', '.join(required)}" if required else ""
+        print(f"[{status}] {name}: {total_ms:.1f} ms of imports (budget {budget_ms:.0f} ms{required_note})")
+        if leaked:
+            print(f"       unexpected heavy imports: {', '.join(leaked)}")
+        failures += status == 'FAIL'
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
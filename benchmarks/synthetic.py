@@ -0,0 +1,93 @@
+'''
+Generators for synthetic benchmark inputs, so the OCR and analysis paths can be
+measured offline without real scraped screenshots.
+'''
+import os
+import cv2
+import numpy as np
+import pandas as pd
+
+# BGR yellow whose HSV (25, 255, 255) sits inside LOWER_YELLOW..UPPER_YELLOW
+RECT_COLOR = (0, 212, 255)
+BACKGROUND_COLOR = (40, 40, 40)
+TEXT_COLOR = (0, 0, 0)
+
+
+'''
+Args:
+    numbers(list[int]): The numbers to draw, one per yellow rectangle.
+    columns(int): Rectangles per row.
+    scale(float): Resolution multiplier. 1.0 draws 160x60 rectangles.
+Returns:
+    np.ndarray: A BGR result screenshot. Rectangles are laid out row by row, so
+                reading them in (y, x) order gives back `numbers`.
+'''
+def make_result_image(numbers, columns=5, scale=1.0):
+    rect_w, rect_h = int(160 * scale), int(60 * scale)
+    gap = int(30 * scale)
+    rows = (len(numbers) + columns - 1) // columns
+
+    height = gap + rows * (rect_h + gap)
+    width = gap + columns * (rect_w + gap)
+    image = np.full((height, width, 3), BACKGROUND_COLOR, dtype=np.uint8)
+
+    font_scale = 1.2 * scale
+    thickness = max(1, int(round(2 * scale)))
+    for i, number in enumerate(numbers):
+        row, column = divmod(i, columns)
+        x = gap + column * (rect_w + gap)
+        y = gap + row * (rect_h + gap)
+        cv2.rectangle(image, (x, y), (x + rect_w, y + rect_h), RECT_COLOR, -1)
+
+        text = str(number)
+        (text_w, text_h), _ = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, font_scale, thickness)
+        origin = (x + (rect_w - text_w) // 2, y + (rect_h + text_h) // 2)
+        cv2.putText(image, text, origin, cv2.FONT_HERSHEY_SIMPLEX, font_scale, TEXT_COLOR, thickness, cv2.LINE_AA)
+
+    return image
+
+
+'''
+Args:
+    image_dir(str): Where the images are written as {group_id}_{sub_id}.png.
+    group_id(int): The group ID of the images.
+    n_images(int): The number of screenshots.
+    numbers_per_image(int): Yellow rectangles per screenshot.
+    scale(float): Resolution multiplier, see make_result_image.
+    seed(int): Random seed.
+Returns:
+    dict: {image path: list[int]} ground truth of every image.
+'''
+def write_image_set(image_dir, group_id, n_images=10, numbers_per_image=20, scale=1.0, seed=0):
+    os.makedirs(image_dir, exist_ok=True)
+    rng = np.random.default_rng(seed)
+
+    ground_truth = {}
+    for sub_id in range(1, n_images + 1):
+        numbers = rng.integers(1, 10000, size=numbers_per_image).tolist()
+        image_path = os.path.join(image_dir, f"{group_id}_{sub_id}.png")
+        cv2.imwrite(image_path, make_result_image(numbers, scale=scale))
+        ground_truth[image_path] = numbers
+    return ground_truth
+
+
+'''
+Args:
+    data_dir(str): Where the group CSV files are written.
+    n_groups(int): Groups 1..n_groups are generated.
+    numbers_per_group(int): Numbers per group.
+    seed(int): Random seed.
+Returns:
+    dict: {group_id: np.ndarray} of the generated numbers.
+'''
+def write_group_data(data_dir, n_groups=60, numbers_per_group=500, seed=0):
+    os.makedirs(data_dir, exist_ok=True)
+    rng = np.random.default_rng(seed)
+
+    groups = {}
+    for group_id in range(1, n_groups + 1):
+        # A log-normal spread looks like real results: many small numbers, a long tail
+        numbers = np.clip(rng.lognormal(mean=6.5, sigma=0.8, size=numbers_per_group), 1, 20000).astype(np.int64)
+        pd.DataFrame({'group_id': group_id, 'number': numbers}).to_csv(os.path.join(data_dir, f"{group_id}.csv"), index=False)
+        groups[group_id] = numbers
+    return groups
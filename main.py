@@ -1,15 +1,276 @@
-from utils.extract_csv import create_csv
-from utils.image_scraper import scrape_images
-from utils.analyze_data import run_full_analysis
+import argparse
 
-if __name__ == "__main__":
-    IMG_DIR = 'images/'
-    CSV_DIR= 'data/'
+IMG_DIR = 'images/'
+CSV_DIR = 'data/'
+
+# Every subcommand imports only the modules it needs, so a quick analysis
+# doesn't pay for OpenCV, Tesseract or the HTTP stack.
+
+
+def _open_cache(args):
+    if not args.cache:
+        return None
+    from utils.ocr_cache import OCRCache
+    # A bare --cache uses the default path
+    return OCRCache() if args.cache is True else OCRCache(args.cache)
+
+
+def run_scrape(args):
+    from utils.image_scraper import scrape_images
+    scrape_images(args.url, args.gid, args.image_dir, concurrent=args.concurrent,
+                  max_workers=args.workers, incremental=not args.full)
+
+
+def _load_templates(args):
+    if not args.templates:
+        return None
+    from utils.digit_classifier import load_templates
+    return load_templates(args.templates)
+
+
+def run_ocr(args):
+    from utils.extract_csv import create_csv
+    cache = _open_cache(args)
+    create_csv(args.gid, args.image_dir, args.data_dir, parallel=args.parallel, max_workers=args.workers,
+               batch_ocr=args.batch_ocr, cache=cache, store_path=args.store, stats_report=args.stats_report,
+               templates=_load_templates(args), detect_scale=args.detect_scale, strip_height=args.strip_height,
+               tile_dedup=args.tile_dedup, outlier_filter=_outlier_filter(args))
+
+
+def run_watch(args):
+    from utils.watcher import watch_images
+    cache = _open_cache(args)
+    watch_images(args.image_dir, args.data_dir, interval=args.interval, group_ids=args.gids, store_path=args.store,
+                 analyze=args.analyze, once=args.once, batch_ocr=args.batch_ocr, cache=cache,
+                 templates=_load_templates(args), detect_scale=args.detect_scale, strip_height=args.strip_height,
+                 outlier_filter=_outlier_filter(args))
+
+
+def run_build_templates(args):
+    from utils.digit_classifier import build_templates
+    cache = _open_cache(args)
+    build_templates(args.image_dir, args.output, cache=cache)
+
+
+def run_analyze(args):
+    from utils.analyze_data import run_full_analysis, run_batch_analysis
+    # One day is plotted by default. Several days run as one batch, unless plots or
+    # streaming are asked for, which the batch doesn't do.
+    plot_mode = args.plots or ('sync' if len(args.days) == 1 else 'none')
+    if len(args.days) == 1 or plot_mode != 'none' or args.streaming:
+        for day in args.days:
+            run_full_analysis(day, store_path=args.store, plot_mode=plot_mode, streaming=args.streaming, k=args.k)
+    else:
+        run_batch_analysis(args.days, k=args.k, report=True, store_path=args.store)
+
+
+def run_serve(args):
+    from utils.service import serve
+    serve(args.host, args.port, data_dir=args.data_dir, store_path=args.store, k=args.k,
+          reload_interval=args.reload_interval)
+
+
+def run_backtest(args):
+    from utils.backtest import run_backtest as run_walk_forward_backtest, summarize_backtest
+    backtest = run_walk_forward_backtest(args.days or None, k=args.k, store_path=args.store,
+                                         data_dir=args.data_dir, max_workers=args.workers)
+    if args.output:
+        backtest.to_csv(args.output, index=False)
+        print(f"Backtest results saved to: {args.output}")
+    for name, value in summarize_backtest(backtest).items():
+        print(f"{name}: {value}")
+
+
+def run_refilter(args):
+    from utils.outlier_filter import refilter_history, restore_removed
+    if args.undo:
+        restore_removed(args.data_dir, store_path=args.store)
+    else:
+        refilter_history(args.data_dir, store_path=args.store, dry_run=args.dry_run, **_digit_rules(args))
+
+
+def run_build(args):
+    from utils.orchestrator import run_orchestrator
+    cache = _open_cache(args)
+    run_orchestrator(args.manifest, args.image_dir, args.data_dir, report_dir=args.report_dir,
+                     scrape_workers=args.scrape_workers, download_workers=args.download_workers,
+                     ocr_workers=args.ocr_workers, store_path=args.store, k=args.k, force=args.force,
+                     batch_ocr=args.batch_ocr, cache=cache, templates=_load_templates(args),
+                     detect_scale=args.detect_scale, strip_height=args.strip_height,
+                     outlier_filter=_outlier_filter(args))
+
+
+def run_pipeline(args):
+    from utils.pipeline import run_pipeline as run_streaming_pipeline
+    cache = _open_cache(args)
+    run_streaming_pipeline(args.url, args.gid, args.data_dir,
+                           image_dir=None if args.no_save_images else args.image_dir,
+                           download_workers=args.workers, ocr_workers=args.ocr_workers,
+                           batch_ocr=args.batch_ocr, cache=cache, store_path=args.store,
+                           templates=_load_templates(args), detect_scale=args.detect_scale,
+                           strip_height=args.strip_height, outlier_filter=_outlier_filter(args))
 
-    URL = 'https://www.inven.co.kr/board/maple/5974/5470567'
-    GID = 27
 
-    # scrape_images(URL, GID, IMG_DIR)
-    # create_csv(GID, IMG_DIR, CSV_DIR)
+def _digit_rules(args):
+    return {'digit_tolerance': args.digit_tolerance, 'short_digits': args.short_digits}
 
-    # run_full_analysis(28)
\ No newline at end of file
+
+def _outlier_filter(args):
+    return False if args.no_filter else _digit_rules(args)
+
+
+def _add_filter_arguments(parser):
+    parser.add_argument('--no-filter', action='store_true',
+                        help="Save the numbers without dropping outliers, e.g. to compare against the filtered data")
+    _add_digit_rule_arguments(parser)
+
+
+def _add_digit_rule_arguments(parser):
+    parser.add_argument('--digit-tolerance', type=int, default=2,
+                        help="Drop numbers with this many more digits than most of their group")
+    parser.add_argument('--short-digits', action='store_true',
+                        help="Also drop numbers with that many fewer digits, e.g. a dropped digit")
+
+
+def _add_detection_arguments(parser):
+    parser.add_argument('--detect-scale', type=float, default=1.0,
+                        help="Find rectangles on a copy downscaled by this factor, e.g. 0.25")
+    parser.add_argument('--strip-height', type=int, default=None,
+                        help="Process very tall screenshots in strips of this many rows")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Scrape, OCR and analyze Maple Vault result images.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    scrape = subparsers.add_parser('scrape', help="Download the result images of a post")
+    scrape.add_argument('url', help="The post URL")
+    scrape.add_argument('gid', type=int, help="The group ID (day) of the post")
+    scrape.add_argument('--image-dir', default=IMG_DIR)
+    scrape.add_argument('--concurrent', action='store_true', help="Download images concurrently")
+    scrape.add_argument('--workers', type=int, default=8, help="Concurrent downloads")
+    scrape.add_argument('--full', action='store_true', help="Ignore the download manifest and fetch everything")
+    scrape.set_defaults(func=run_scrape)
+
+    ocr = subparsers.add_parser('ocr', help="Extract the numbers of a group's images")
+    ocr.add_argument('gid', type=int, help="The group ID (day) to process")
+    ocr.add_argument('--image-dir', default=IMG_DIR)
+    ocr.add_argument('--data-dir', default=CSV_DIR)
+    ocr.add_argument('--parallel', action='store_true', help="OCR images on a process pool")
+    ocr.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count)")
+    ocr.add_argument('--batch-ocr', action='store_true', help="One Tesseract call per image and pass")
+    ocr.add_argument('--cache', metavar='PATH', nargs='?', const=True,
+                     help="SQLite OCR result cache (default: .cache/ocr_cache.sqlite)")
+    ocr.add_argument('--store', metavar='PATH', help="Write to this binary group store instead of CSV")
+    ocr.add_argument('--stats-report', metavar='PATH', help="Write OCR stage timings and counters (.json or .csv)")
+    ocr.add_argument('--templates', metavar='PATH', help="Glyph templates for the fast digit classifier")
+    ocr.add_argument('--tile-dedup', choices=('exact', 'perceptual'), default=None,
+                     help="OCR every distinct number tile once per run and reuse the result")
+    _add_detection_arguments(ocr)
+    _add_filter_arguments(ocr)
+    ocr.set_defaults(func=run_ocr)
+
+    watch = subparsers.add_parser('watch', help="OCR new or changed images as they appear and update their groups")
+    watch.add_argument('gids', type=int, nargs='*', help="Only watch these group IDs (default: all)")
+    watch.add_argument('--image-dir', default=IMG_DIR)
+    watch.add_argument('--data-dir', default=CSV_DIR)
+    watch.add_argument('--interval', type=float, default=2.0, help="Seconds between polls when inotify is unavailable")
+    watch.add_argument('--once', action='store_true', help="Process the current changes and exit")
+    watch.add_argument('--analyze', action='store_true', help="Re-run the analysis of the day each updated group feeds into")
+    watch.add_argument('--batch-ocr', action='store_true', help="One Tesseract call per image and pass")
+    watch.add_argument('--cache', metavar='PATH', nargs='?', const=True,
+                       help="SQLite OCR result cache (default: .cache/ocr_cache.sqlite)")
+    watch.add_argument('--store', metavar='PATH', help="Write to this binary group store instead of CSV")
+    watch.add_argument('--templates', metavar='PATH', help="Glyph templates for the fast digit classifier")
+    _add_detection_arguments(watch)
+    _add_filter_arguments(watch)
+    watch.set_defaults(func=run_watch)
+
+    templates = subparsers.add_parser('build-templates', help="Build digit classifier templates from OCR'd images")
+    templates.add_argument('--image-dir', default=IMG_DIR)
+    templates.add_argument('--output', default='glyph_templates.npz')
+    templates.add_argument('--cache', metavar='PATH', nargs='?', const=True,
+                           help="SQLite OCR result cache holding earlier results (default: .cache/ocr_cache.sqlite)")
+    templates.set_defaults(func=run_build_templates)
+
+    analyze = subparsers.add_parser('analyze', help="Recommend numbers for one or more target days")
+    analyze.add_argument('days', type=int, nargs='+', help="Target days. Several days run as one batch without plots")
+    analyze.add_argument('--plots', choices=('sync', 'deferred', 'none'),
+                         help="Default: sync for one day, none for several days")
+    analyze.add_argument('--k', type=int, default=5, help="Recommendations per day")
+    analyze.add_argument('--store', metavar='PATH', help="Read from this binary group store instead of CSV")
+    analyze.add_argument('--streaming', action='store_true', help="Read groups in chunks into bounded-size count arrays")
+    analyze.set_defaults(func=run_analyze)
+
+    serve = subparsers.add_parser('serve', help="Answer /recommend?day=N&k=5 over HTTP from data kept in memory")
+    serve.add_argument('--host', default='127.0.0.1')
+    serve.add_argument('--port', type=int, default=8000)
+    serve.add_argument('--data-dir', default=CSV_DIR)
+    serve.add_argument('--store', metavar='PATH', help="Read from this binary group store instead of CSV")
+    serve.add_argument('--k', type=int, default=5, help="Default recommendations per day")
+    serve.add_argument('--reload-interval', type=float, default=1.0, help="Seconds between checks for changed data")
+    serve.set_defaults(func=run_serve)
+
+    backtest = subparsers.add_parser('backtest', help="Score the recommendations against past days' actual results")
+    backtest.add_argument('days', type=int, nargs='*', help="Days to backtest (default: every group with data)")
+    backtest.add_argument('--k', type=int, default=5, help="Recommendations per day")
+    backtest.add_argument('--data-dir', default=CSV_DIR)
+    backtest.add_argument('--store', metavar='PATH', help="Read from this binary group store instead of CSV")
+    backtest.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count)")
+    backtest.add_argument('--output', metavar='PATH', help="Write the per-day results to this CSV file")
+    backtest.set_defaults(func=run_backtest)
+
+    refilter = subparsers.add_parser('refilter', help="Re-run the outlier filter over every saved group without OCR")
+    refilter.add_argument('--data-dir', default=CSV_DIR)
+    refilter.add_argument('--store', metavar='PATH', help="Re-filter this binary group store instead of CSV")
+    refilter.add_argument('--dry-run', action='store_true', help="Only list the outliers, don't rewrite any group")
+    refilter.add_argument('--undo', action='store_true', help="Put back the numbers removed by the last filter run")
+    _add_digit_rule_arguments(refilter)
+    refilter.set_defaults(func=run_refilter)
+
+    build = subparsers.add_parser('build', help="Scrape, OCR and analyze every group of a manifest, skipping up-to-date stages")
+    build.add_argument('manifest', help="A CSV (gid,url rows) or JSON file of the groups")
+    build.add_argument('--image-dir', default=IMG_DIR)
+    build.add_argument('--data-dir', default=CSV_DIR)
+    build.add_argument('--report-dir', default='reports/')
+    build.add_argument('--scrape-workers', type=int, default=4, help="Groups scraped at once")
+    build.add_argument('--download-workers', type=int, default=8, help="Concurrent downloads per group")
+    build.add_argument('--ocr-workers', type=int, default=None, help="OCR processes (default: CPU count)")
+    build.add_argument('--k', type=int, default=5, help="Recommendations per day")
+    build.add_argument('--force', action='store_true', help="Run every stage regardless of timestamps")
+    build.add_argument('--batch-ocr', action='store_true', help="One Tesseract call per image and pass")
+    build.add_argument('--cache', metavar='PATH', nargs='?', const=True,
+                       help="SQLite OCR result cache (default: .cache/ocr_cache.sqlite)")
+    build.add_argument('--store', metavar='PATH', help="Write to this binary group store instead of CSV")
+    build.add_argument('--templates', metavar='PATH', help="Glyph templates for the fast digit classifier")
+    _add_detection_arguments(build)
+    _add_filter_arguments(build)
+    build.set_defaults(func=run_build)
+
+    pipeline = subparsers.add_parser('pipeline', help="Scrape and OCR a post in one streaming pass")
+    pipeline.add_argument('url', help="The post URL")
+    pipeline.add_argument('gid', type=int, help="The group ID (day) of the post")
+    pipeline.add_argument('--image-dir', default=IMG_DIR)
+    pipeline.add_argument('--no-save-images', action='store_true', help="Keep downloaded images in memory only")
+    pipeline.add_argument('--data-dir', default=CSV_DIR)
+    pipeline.add_argument('--workers', type=int, default=8, help="Concurrent downloads")
+    pipeline.add_argument('--ocr-workers', type=int, default=None, help="OCR processes (default: CPU count)")
+    pipeline.add_argument('--batch-ocr', action='store_true', help="One Tesseract call per image and pass")
+    pipeline.add_argument('--cache', metavar='PATH', nargs='?', const=True,
+                          help="SQLite OCR result cache (default: .cache/ocr_cache.sqlite)")
+    pipeline.add_argument('--store', metavar='PATH', help="Write to this binary group store instead of CSV")
+    pipeline.add_argument('--templates', metavar='PATH', help="Glyph templates for the fast digit classifier")
+    _add_detection_arguments(pipeline)
+    _add_filter_arguments(pipeline)
+    pipeline.set_defaults(func=run_pipeline)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,2 @@
+def pytest_configure(config):
+    config.addinivalue_line('markers', "slow: runs subprocesses or large inputs; deselect with -m 'not slow'")
@@ -0,0 +1,99 @@
+import tracemalloc
+import numpy as np
+import pandas as pd
+import pytest
+from utils.analyze_data import recommend_from_stats, recommend_top_numbers, run_batch_analysis
+
+
+def test_batch_analysis_with_a_huge_misread(tmp_path):
+    rng = np.random.default_rng(0)
+    for group_id in range(1, 15):
+        numbers = rng.integers(1, 2000, 300)
+        if group_id == 3:
+            numbers[0] = 123456789
+        pd.DataFrame({'group_id': group_id, 'number': numbers}).to_csv(tmp_path / f"{group_id}.csv", index=False)
+
+    tracemalloc.start()
+    results = run_batch_analysis(list(range(8, 22)), data_dir=str(tmp_path))
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    assert sorted(results) == list(range(8, 22))
+    assert results[10]['quantiles']['q3'] < 2000
+    assert peak < 50_000_000
+
+
+def test_analyze_several_days_honours_plots_and_streaming(monkeypatch):
+    import main
+    from utils import analyze_data
+
+    calls = []
+    monkeypatch.setattr(analyze_data, 'run_full_analysis', lambda day, **options: calls.append(('full', day, options)))
+    monkeypatch.setattr(analyze_data, 'run_batch_analysis', lambda days, **options: calls.append(('batch', days, options)))
+
+    def analyze(*argv):
+        calls.clear()
+        args = main.build_parser().parse_args(['analyze', *argv])
+        args.func(args)
+        return calls
+
+    assert [call[0] for call in analyze('1', '2')] == ['batch']
+    assert [(kind, day, options['plot_mode']) for kind, day, options in analyze('1')] == [('full', 1, 'sync')]
+    assert [(day, options['streaming']) for _, day, options in analyze('1', '2', '--streaming')] == [(1, True), (2, True)]
+    assert [(day, options['plot_mode']) for _, day, options in analyze('1', '2', '--plots', 'deferred')] == [(1, 'deferred'), (2, 'deferred')]
+
+
+def _reference_recommendations(df, bucket_counts, last_digit_freq, medians_over_time, k):
+    # The scoring loop recommend_top_numbers had before it was vectorized, with [:5] made [:k]
+    q1 = df['number'].quantile(0.25)
+    q3 = df['number'].quantile(0.75)
+
+    trend_shift = 0
+    if len(medians_over_time) > 1:
+        last_two = medians_over_time.dropna().tail(2)
+        if len(last_two) == 2:
+            trend_shift = last_two.iloc[1] - last_two.iloc[0]
+
+    candidate_min = int(q1 + trend_shift / 2)
+    candidate_max = int(q3 + trend_shift / 2)
+
+    hot_last_digits = last_digit_freq.nlargest(3).index
+    recommendations = []
+    for number in range(candidate_min, candidate_max + 1):
+        score = 0
+        bucket = number // 100
+        if bucket in bucket_counts.index:
+            score += bucket_counts[bucket]
+        if number % 10 in hot_last_digits:
+            score += bucket_counts.mean()
+        if score > 0:
+            recommendations.append({'number': number, 'score': score})
+
+    return sorted(recommendations, key=lambda x: x['score'], reverse=True)[:k]
+
+
+def _tie_heavy_inputs():
+    rng = np.random.default_rng(3)
+    # Every bucket and every last digit equally frequent: almost every candidate ties
+    yield np.tile(np.arange(100, 1100), 3), [500.0, 520.0]
+    # Few distinct values, so bucket counts and last-digit counts tie in places
+    yield rng.choice([105, 117, 230, 248, 311, 399, 402, 486, 512, 640], size=400), [300.0, 260.0, float('nan')]
+    # A wide range with a downward trend
+    yield rng.integers(1, 5000, size=2000), [2600.0, 2400.0]
+
+
+@pytest.mark.parametrize('k', [1, 3, 5, 10, 40])
+def test_vectorized_scorer_matches_the_original_loop(k):
+    for numbers, medians in _tie_heavy_inputs():
+        df = pd.DataFrame({'group_id': 1, 'number': numbers})
+        bucket_counts = (df['number'] // 100).value_counts().sort_index()
+        last_digit_freq = (df['number'] % 10).value_counts().reindex(range(10), fill_value=0).sort_index()
+        medians_over_time = pd.Series(medians)
+
+        expected = [
+            {'number': r['number'], 'score': float(r['score'])}
+            for r in _reference_recommendations(df, bucket_counts, last_digit_freq, medians_over_time, k)
+        ]
+        assert recommend_top_numbers(df, bucket_counts, last_digit_freq, medians_over_time, k) == expected
+        quantiles = {'q1': df['number'].quantile(0.25), 'q3': df['number'].quantile(0.75)}
+        assert recommend_from_stats(quantiles, bucket_counts, last_digit_freq, medians_over_time, k) == expected
@@ -0,0 +1,60 @@
+import pytesseract
+import utils.extract_num_from_image as extract_num_from_image
+from benchmarks.synthetic import make_result_image
+from utils.extract_num_from_image import (
+    BATCH_TILE_GAP, TARGET_HEIGHT, find_number_rects, ocr_rois_cascade_batched, preprocess_roi
+)
+from utils.ocr_stats import OCRStats
+
+
+def _rois(numbers):
+    image = make_result_image(numbers)
+    return [preprocess_roi(image, rect) for rect in find_number_rects(image)]
+
+
+def _words(*tiles):
+    # image_to_data output with the given (left, text) words in each stacked tile
+    data = {'text': [], 'left': [], 'top': [], 'height': []}
+    for tile_index, words in enumerate(tiles):
+        for left, text in words:
+            data['text'].append(text)
+            data['left'].append(left)
+            data['top'].append(BATCH_TILE_GAP + tile_index * (TARGET_HEIGHT + BATCH_TILE_GAP) + 30)
+            data['height'].append(40)
+    return data
+
+
+def test_tile_read_as_two_words_goes_to_per_roi_ocr(monkeypatch):
+    monkeypatch.setattr(
+        pytesseract, 'image_to_data', lambda *args, **kwargs: _words([(10, '12')], [(10, '3'), (60, '4')])
+    )
+    per_roi = []
+    monkeypatch.setattr(extract_num_from_image, 'ocr_roi', lambda roi, stats=None: per_roi.append(roi) or '34')
+
+    stats = OCRStats()
+    assert ocr_rois_cascade_batched(_rois([12, 34]), stats) == ['12', '34']
+    assert len(per_roi) == 1
+    assert stats.counters['batch_split_tiles'] == 1
+    assert stats.counters['first_pass_success'] == 1
+
+
+def test_strip_mode_stats_match_full_image():
+    import cv2
+    import numpy as np
+    from benchmarks.synthetic import RECT_COLOR
+
+    rng = np.random.default_rng(0)
+    image = make_result_image(rng.integers(1, 99999, 150).tolist())
+    # Yellow specks below MIN_RECT_AREA, some of them across strip edges
+    for y in rng.integers(0, image.shape[0] - 4, 60):
+        x = int(rng.integers(0, 25))
+        cv2.rectangle(image, (x, int(y)), (x + 2, int(y) + 2), RECT_COLOR, -1)
+
+    for detect_scale in (1.0, 0.5, 0.25):
+        full = OCRStats()
+        full_rects = find_number_rects(image, full, detect_scale=detect_scale)
+        assert full.counters['rois_dropped_small'] > 0
+        for strip_height in (300, 482, 700, 1111):
+            strips = OCRStats()
+            assert find_number_rects(image, strips, detect_scale=detect_scale, strip_height=strip_height) == full_rects
+            assert strips.counters == full.counters
@@ -0,0 +1,58 @@
+import os
+import json
+import numpy as np
+import pytest
+import utils.group_store as group_store
+from utils.group_store import compact_store, data_path, index_path, read_groups, write_group
+
+
+def _read_all(store_path):
+    return {group_id: numbers.tolist() for group_id, numbers in read_groups(store_path, [1, 2, 3]).items()}
+
+
+def test_compaction_switches_to_a_new_data_file(tmp_path):
+    store_path = str(tmp_path / 'groups.bin')
+    write_group(store_path, 1, [1, 2, 3])
+    write_group(store_path, 2, [4, 5])
+    write_group(store_path, 1, [6])
+
+    compact_store(store_path)
+
+    assert _read_all(store_path) == {1: [6], 2: [4, 5]}
+    assert np.fromfile(data_path(store_path, 1), dtype=group_store.STORE_DTYPE).tolist() == [6, 4, 5]
+    write_group(store_path, 3, [7])
+    assert _read_all(store_path) == {1: [6], 2: [4, 5], 3: [7]}
+
+
+def test_crash_before_index_switch_keeps_old_store(tmp_path, monkeypatch):
+    store_path = str(tmp_path / 'groups.bin')
+    write_group(store_path, 1, [1, 2, 3])
+    write_group(store_path, 2, [4, 5])
+    write_group(store_path, 1, [6])
+
+    def crash(*args):
+        raise OSError("crash")
+    monkeypatch.setattr(group_store, '_save_index', crash)
+    with pytest.raises(OSError):
+        compact_store(store_path)
+    monkeypatch.undo()
+
+    assert _read_all(store_path) == {1: [6], 2: [4, 5]}
+    compact_store(store_path)
+    assert _read_all(store_path) == {1: [6], 2: [4, 5]}
+
+
+def test_index_without_generation_is_read(tmp_path):
+    store_path = str(tmp_path / 'groups.bin')
+    np.array([1, 2, 3, 4], dtype=group_store.STORE_DTYPE).tofile(store_path)
+    with open(index_path(store_path), 'w', encoding='utf-8') as f:
+        json.dump({'1': [0, 3], '2': [3, 1]}, f)
+
+    assert _read_all(store_path) == {1: [1, 2, 3], 2: [4]}
+
+
+def test_default_store_path_does_not_depend_on_the_working_directory(tmp_path, monkeypatch):
+    project_dir = os.path.dirname(os.path.dirname(os.path.abspath(group_store.__file__)))
+    monkeypatch.chdir(tmp_path)
+    assert os.path.isabs(group_store.DEFAULT_STORE_PATH)
+    assert group_store.DEFAULT_STORE_PATH == os.path.join(project_dir, 'data', 'groups.bin')
@@ -0,0 +1,25 @@
+import hashlib
+from utils.image_scraper import _is_entry_reusable
+
+URL = 'https://example.com/1.png'
+
+
+def _entry(content):
+    return {'url': URL, 'filename': '1_1.png', 'size': len(content), 'sha256': hashlib.sha256(content).hexdigest()}
+
+
+def test_intact_file_is_reused(tmp_path):
+    (tmp_path / '1_1.png').write_bytes(b'image-a')
+    assert _is_entry_reusable(_entry(b'image-a'), URL, str(tmp_path))
+
+
+def test_same_size_overwrite_is_not_reused(tmp_path):
+    (tmp_path / '1_1.png').write_bytes(b'image-b')
+    assert not _is_entry_reusable(_entry(b'image-a'), URL, str(tmp_path))
+
+
+def test_missing_file_url_change_or_hash_is_not_reused(tmp_path):
+    assert not _is_entry_reusable(_entry(b'image-a'), URL, str(tmp_path))
+    (tmp_path / '1_1.png').write_bytes(b'image-a')
+    assert not _is_entry_reusable(_entry(b'image-a'), 'https://example.com/other.png', str(tmp_path))
+    assert not _is_entry_reusable(dict(_entry(b'image-a'), sha256=None), URL, str(tmp_path))
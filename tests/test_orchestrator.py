@@ -0,0 +1,71 @@
+import os
+import time
+from utils.group_store import index_path, write_group
+from utils.orchestrator import _data_mtimes
+
+
+def test_store_mode_keeps_a_write_time_per_group(tmp_path):
+    store_path = str(tmp_path / 'groups.bin')
+    write_group(store_path, 1, [10, 20, 30])
+    time.sleep(0.01)
+    write_group(store_path, 2, [40, 50])
+
+    data_mtime = _data_mtimes(str(tmp_path), store_path)
+    # Writing group 2 must not make group 1 look newer than its images
+    assert data_mtime(1) < data_mtime(2)
+    assert data_mtime(3) is None
+
+
+def test_store_mode_old_index_falls_back_to_index_mtime(tmp_path):
+    store_path = str(tmp_path / 'groups.bin')
+    write_group(store_path, 1, [10, 20, 30])
+    with open(index_path(store_path), 'w', encoding='utf-8') as f:
+        f.write('{"1": [0, 3]}')
+
+    assert _data_mtimes(str(tmp_path), store_path)(1) == os.path.getmtime(index_path(store_path))
+
+
+def _build_tree(tmp_path, group_ids):
+    import json
+    import numpy as np
+    import cv2
+    from utils.scrape_manifest import save_manifest
+
+    image_dir, data_dir = tmp_path / 'images', tmp_path / 'data'
+    image_dir.mkdir()
+    manifest = tmp_path / 'groups.json'
+    manifest.write_text(json.dumps({str(group_id): f"http://example/{group_id}" for group_id in group_ids}))
+    time.sleep(0.01)
+    for group_id in group_ids:
+        # Blank images have no yellow rectangles, so they are read without Tesseract and give no numbers
+        for sub_id in (1, 2):
+            cv2.imwrite(str(image_dir / f"{group_id}_{sub_id}.png"), np.zeros((20, 20, 3), dtype=np.uint8))
+        save_manifest(str(image_dir), group_id, {'url': f"http://example/{group_id}", 'images': {}})
+    return str(manifest), str(image_dir), str(data_dir)
+
+
+def test_group_without_numbers_is_not_read_again(tmp_path):
+    from utils.orchestrator import run_orchestrator
+    manifest, image_dir, data_dir = _build_tree(tmp_path, [1])
+
+    assert run_orchestrator(manifest, image_dir, data_dir, report_dir=str(tmp_path / 'reports'), ocr_workers=1)['ocr']['run'] == 1
+    summary = run_orchestrator(manifest, image_dir, data_dir, report_dir=str(tmp_path / 'reports'), ocr_workers=1)
+    assert summary['ocr'] == {'run': 0, 'skipped': 1, 'failed': 0}
+
+    # Deleting an image changes the input set even though no image got newer
+    os.remove(os.path.join(image_dir, '1_2.png'))
+    assert run_orchestrator(manifest, image_dir, data_dir, report_dir=str(tmp_path / 'reports'), ocr_workers=1)['ocr']['run'] == 1
+
+
+def test_failed_scrape_is_not_ocrd(tmp_path, monkeypatch):
+    import utils.image_scraper as image_scraper
+    from utils.orchestrator import run_orchestrator
+    manifest, image_dir, data_dir = _build_tree(tmp_path, [1])
+
+    def failing_scrape(*args, **kwargs):
+        raise RuntimeError("1 of 2 images could not be downloaded")
+    monkeypatch.setattr(image_scraper, 'scrape_images', failing_scrape)
+
+    summary = run_orchestrator(manifest, image_dir, data_dir, report_dir=str(tmp_path / 'reports'), force=True)
+    assert summary['scrape'] == {'run': 0, 'skipped': 0, 'failed': 1}
+    assert summary['ocr'] == {'run': 0, 'skipped': 0, 'failed': 0}
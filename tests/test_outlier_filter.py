@@ -0,0 +1,155 @@
+import numpy as np
+import pandas as pd
+from utils.extract_csv import filter_outliers, save_group_numbers
+from utils.group_store import read_groups, write_group
+from utils.outlier_filter import (
+    MIN_GROUP_SIZE, outlier_masks, refilter_history, removed_log_path, restore_removed
+)
+
+
+def _two_digit_groups(n_groups=7, size=300, seed=0):
+    rng = np.random.default_rng(seed)
+    return {group_id: rng.integers(1, 101, size=size) for group_id in range(1, n_groups + 1)}
+
+
+def _write_csvs(data_dir, groups):
+    for group_id, numbers in groups.items():
+        pd.DataFrame({'group_id': group_id, 'number': numbers}).to_csv(data_dir / f"{group_id}.csv", index=False)
+
+
+def test_merged_number_in_two_digit_group_is_flagged():
+    groups = _two_digit_groups()
+    groups[4] = np.append(groups[4], 1234)
+
+    masks = outlier_masks(groups)
+
+    assert groups[4][masks[4]].tolist() == [1234]
+    assert not any(masks[group_id].any() for group_id in groups if group_id != 4)
+
+
+def test_merged_number_is_flagged_without_neighbours():
+    numbers = list(_two_digit_groups(1)[1]) + [1234]
+    assert 1234 not in filter_outliers(numbers)
+    assert len(filter_outliers(numbers)) == len(numbers) - 1
+
+
+def test_low_numbers_are_never_flagged():
+    groups = _two_digit_groups()
+    groups[4] = np.append(groups[4], [0, 1, 2])
+    assert not outlier_masks(groups)[4].any()
+
+
+def test_lognormal_tail_is_mostly_kept():
+    rng = np.random.default_rng(1)
+    groups = {group_id: rng.lognormal(6.5, 0.8, size=2000).astype(np.int64) for group_id in range(1, 31)}
+    flagged = sum(int(mask.sum()) for mask in outlier_masks(groups).values())
+    # The fence sits about 4 standard deviations out in log space
+    assert flagged <= 1e-4 * 30 * 2000
+
+
+def test_empty_groups():
+    assert outlier_masks({}) == {}
+
+    groups = _two_digit_groups(3)
+    groups[2] = np.array([], dtype=np.int64)
+    masks = outlier_masks(groups)
+    assert masks[2].shape == (0,)
+    assert not masks[1].any() and not masks[3].any()
+
+
+def test_zero_iqr_group_only_flags_far_values():
+    numbers = [500] * 100 + [501, 520, 700, 1500, 987654]
+    assert filter_outliers(numbers) == [500] * 100 + [501, 520, 700, 1500]
+
+
+def test_small_group_uses_neighbour_history():
+    groups = _two_digit_groups()
+    groups[4] = np.array([12, 40, 77, 5000])
+    assert len(groups[4]) < MIN_GROUP_SIZE
+
+    assert outlier_masks(groups)[4].tolist() == [False, False, False, True]
+
+
+def test_small_group_without_history_is_kept():
+    numbers = [12, 40, 77, 5000]
+    assert len(numbers) < MIN_GROUP_SIZE
+    assert filter_outliers(numbers) == numbers
+
+
+def test_save_group_numbers_filters_and_logs(tmp_path):
+    numbers = list(_two_digit_groups(1)[1])
+    save_group_numbers(1, numbers[:10] + [4321] + numbers[10:], str(tmp_path))
+
+    saved = pd.read_csv(tmp_path / '1.csv')['number'].tolist()
+    assert saved == numbers
+    log = pd.read_csv(removed_log_path(str(tmp_path)))
+    assert log[['group_id', 'position', 'number']].values.tolist() == [[1, 10, 4321]]
+
+    # A new OCR run replaces the group, so its old log entries are dropped
+    save_group_numbers(1, numbers, str(tmp_path))
+    assert pd.read_csv(removed_log_path(str(tmp_path))).empty
+
+
+def test_refilter_and_undo_csv(tmp_path):
+    groups = _two_digit_groups()
+    groups[3] = np.insert(groups[3], 7, 98765)
+    groups[5] = np.append(groups[5], 4444)
+    _write_csvs(tmp_path, groups)
+
+    assert refilter_history(str(tmp_path), dry_run=True) == {3: [98765], 5: [4444]}
+    assert pd.read_csv(tmp_path / '3.csv')['number'].tolist() == groups[3].tolist()
+
+    assert refilter_history(str(tmp_path)) == {3: [98765], 5: [4444]}
+    assert 98765 not in pd.read_csv(tmp_path / '3.csv')['number'].tolist()
+    assert refilter_history(str(tmp_path)) == {}
+
+    assert restore_removed(str(tmp_path)) == {3: [98765], 5: [4444]}
+    for group_id in (3, 5):
+        assert pd.read_csv(tmp_path / f"{group_id}.csv")['number'].tolist() == groups[group_id].tolist()
+    assert restore_removed(str(tmp_path)) == {}
+
+
+def test_refilter_and_undo_store(tmp_path):
+    store_path = str(tmp_path / 'groups.bin')
+    groups = _two_digit_groups()
+    groups[6] = np.insert(groups[6], 0, 55555)
+    for group_id, numbers in groups.items():
+        write_group(store_path, group_id, numbers)
+
+    assert refilter_history(str(tmp_path), store_path=store_path) == {6: [55555]}
+    assert read_groups(store_path, [6])[6].tolist() == groups[6][1:].tolist()
+
+    restore_removed(str(tmp_path), store_path=store_path)
+    assert read_groups(store_path, [6])[6].tolist() == groups[6].tolist()
+
+
+def test_history_follows_group_ids_not_positions():
+    groups = {group_id: numbers for group_id, numbers in zip(range(40, 47), _two_digit_groups().values())}
+    # Group 3 is next to group 40 in sorted order, but 37 IDs away from it
+    groups[3] = np.array([5000, 6000, 7000, 8000])
+    groups[41] = np.array([12, 40, 77, 5000])
+
+    masks = outlier_masks(groups)
+    assert not masks[3].any()
+    assert masks[41].tolist() == [False, False, False, True]
+
+
+def test_short_digits_is_opt_in():
+    rng = np.random.default_rng(2)
+    numbers = np.append(rng.integers(100, 1000, size=300), [7, 42, 4321])
+
+    assert numbers[outlier_masks({1: numbers})[1]].tolist() == []
+    assert numbers[outlier_masks({1: numbers}, short_digits=True)[1]].tolist() == [7]
+    assert numbers[outlier_masks({1: numbers}, digit_tolerance=1, short_digits=True)[1]].tolist() == [7, 42, 4321]
+
+
+def test_save_group_numbers_without_filter(tmp_path):
+    import main
+    numbers = list(_two_digit_groups(1)[1]) + [4321]
+    save_group_numbers(1, numbers, str(tmp_path), outlier_filter=False)
+    assert pd.read_csv(tmp_path / '1.csv')['number'].tolist() == numbers
+
+    args = main.build_parser().parse_args(['ocr', '1', '--no-filter'])
+    assert main._outlier_filter(args) is False
+    args = main.build_parser().parse_args(['build', 'groups.csv', '--short-digits'])
+    assert main._outlier_filter(args) == {'digit_tolerance': 2, 'short_digits': True}
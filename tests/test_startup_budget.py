@@ -0,0 +1,17 @@
+import pytest
+from benchmarks.startup_budget import CASES, best_of, check_case
+
+REPEAT = 3
+
+
+@pytest.fixture(scope='module')
+def baseline_packages():
+    return best_of(['-c', 'pass'], REPEAT)[1]
+
+
+@pytest.mark.slow
+@pytest.mark.parametrize('case', CASES, ids=[case[0] for case in CASES])
+def test_startup_budget(case, baseline_packages):
+    total_ms, budget_ms, leaked = check_case(case, baseline_packages, REPEAT)
+    assert not leaked, f"{case[0]} imported {', '.join(leaked)}"
+    assert total_ms <= budget_ms, f"{case[0]} spent {total_ms:.1f} ms on imports (budget {budget_ms:.0f} ms)"
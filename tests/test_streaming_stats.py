@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+from utils.backtest import lowest_unique_number
+from utils.streaming_stats import DENSE_LIMIT, NumberSketch
+
+
+def _sketch(numbers, parts=5):
+    sketch = NumberSketch()
+    for chunk in np.array_split(np.asarray(numbers), parts):
+        group_sketch = NumberSketch()
+        group_sketch.update(chunk)
+        sketch.merge(group_sketch)
+    return sketch
+
+
+def test_huge_number_stays_exact_and_small():
+    rng = np.random.default_rng(0)
+    numbers = np.r_[rng.integers(0, 20000, 5000), [123456789, 250000, 250000]]
+    sketch = _sketch(numbers)
+
+    assert len(sketch.value_counts) <= DENSE_LIMIT
+    assert sketch.total == len(numbers)
+    expected = pd.Series(numbers).quantile([0.25, 0.5, 0.75]).tolist()
+    assert np.allclose(list(sketch.quantiles().values()), expected)
+    assert sketch.bucket_counts().sort_index().equals(pd.Series(numbers // 100).value_counts().sort_index())
+    assert sketch.last_digit_freq().tolist() == pd.Series(numbers % 10).value_counts().sort_index().tolist()
+
+
+def test_quantiles_inside_the_sparse_part():
+    numbers = [5, 200000, 300000, 400000]
+    expected = pd.Series(numbers).quantile([0.25, 0.5, 0.75]).tolist()
+    assert list(_sketch(numbers, parts=2).quantiles().values()) == expected
+
+
+def test_initial_size_is_capped():
+    assert len(NumberSketch(123456790).value_counts) == DENSE_LIMIT
+
+
+def test_lowest_unique_number_with_huge_number():
+    assert lowest_unique_number([3, 3, 123456789, 7]) == 7
+    assert lowest_unique_number([3, 3, 123456789]) == 123456789
+
+
+def test_streaming_distribution_plot_includes_overflow(tmp_path, monkeypatch):
+    import utils.plotting as plotting
+
+    drawn = []
+    monkeypatch.setattr(plotting.sns, 'histplot', lambda x, weights, **kwargs: drawn.append(np.repeat(x, weights)))
+    numbers = np.r_[np.arange(1, 500), [DENSE_LIMIT + 5, 123456789, 123456789]]
+    sketch = _sketch(numbers)
+
+    plotting.plot_distribution_histogram(
+        sketch.value_counts, sketch.overflow_values, sketch.overflow_counts, 8, str(tmp_path / 'distribution.png')
+    )
+    assert sorted(drawn[0].tolist()) == sorted(numbers.tolist())
@@ -0,0 +1,95 @@
+import re
+import cv2
+import numpy as np
+import pandas as pd
+import pytest
+import utils.extract_num_from_image as extract_num_from_image
+from benchmarks.synthetic import make_result_image
+from utils.extract_csv import create_csv
+from utils.extract_num_from_image import extract_num_from_array, find_number_rects, preprocess_roi
+from utils.tile_cache import TileCache, tile_key
+
+NUMBERS = [12, 34, 56, 78, 123]
+
+
+def _roi(number):
+    image = make_result_image([number])
+    return preprocess_roi(image, find_number_rects(image)[0])
+
+
+# Tesseract isn't needed: every synthetic tile of a number binarizes to the same pixels
+TILE_TEXT = {_roi(number).tobytes(): str(number) for number in NUMBERS}
+
+
+@pytest.fixture
+def fake_ocr(monkeypatch):
+    calls = []
+
+    def ocr_roi(thresh_roi, stats=None):
+        calls.append(TILE_TEXT.get(thresh_roi.tobytes(), ""))
+        return calls[-1]
+    monkeypatch.setattr(extract_num_from_image, 'ocr_roi', ocr_roi)
+    return calls
+
+
+def test_repeated_tiles_are_read_once(fake_ocr):
+    tile_cache = TileCache('exact')
+    first = make_result_image([12, 34, 12, 12, 34])
+    second = make_result_image([34, 56, 12])
+
+    assert extract_num_from_array(first, 'first', tile_cache=tile_cache) == [12, 34, 12, 12, 34]
+    assert extract_num_from_array(second, 'second', tile_cache=tile_cache) == [34, 56, 12]
+    assert sorted(fake_ocr) == ['12', '34', '56']
+
+
+def test_failed_reads_are_retried_in_later_images(monkeypatch):
+    reads = []
+
+    def flaky_ocr(thresh_roi, stats=None):
+        reads.append(TILE_TEXT[thresh_roi.tobytes()])
+        # The first read of 12 fails
+        return "" if reads.count('12') == 1 and reads[-1] == '12' else reads[-1]
+    monkeypatch.setattr(extract_num_from_image, 'ocr_roi', flaky_ocr)
+
+    tile_cache = TileCache('perceptual')
+    assert extract_num_from_array(make_result_image([12, 34, 12]), 'first', tile_cache=tile_cache) == [34]
+    assert extract_num_from_array(make_result_image([12, 34]), 'second', tile_cache=tile_cache) == [12, 34]
+    assert reads == ['12', '34', '12']
+
+
+def test_perceptual_key_ignores_position_but_not_clipping():
+    image = make_result_image([123])
+    x, y, w, h = find_number_rects(image)[0]
+
+    shifted = np.full_like(image, image[0, 0])
+    shifted[3:, 2:] = image[:-3, :-2]
+    assert tile_key(_roi(123), 'perceptual') == tile_key(preprocess_roi(shifted, find_number_rects(shifted)[0]), 'perceptual')
+
+    clipped = preprocess_roi(image, (x + w // 2 - 5, y, w // 2 + 5, h))
+    assert tile_key(clipped, 'perceptual').startswith('e:')
+    assert tile_key(clipped, 'perceptual') != tile_key(_roi(3), 'perceptual')
+
+
+def test_perceptual_key_holds_the_aspect_ratio():
+    digits = _roi(12)
+    stretched = cv2.resize(digits, (digits.shape[1] * 2, digits.shape[0]), interpolation=cv2.INTER_NEAREST)
+    assert tile_key(digits, 'perceptual') != tile_key(stretched, 'perceptual')
+
+
+def test_workers_share_one_tile_table(tmp_path, fake_ocr, capsys):
+    image_dir, data_dir = tmp_path / 'images', tmp_path / 'data'
+    image_dir.mkdir()
+    rng = np.random.default_rng(0)
+    expected = []
+    for sub_id in range(1, 9):
+        numbers = rng.choice(NUMBERS, 15).tolist()
+        expected.extend(numbers)
+        cv2.imwrite(str(image_dir / f"1_{sub_id}.png"), make_result_image(numbers))
+
+    create_csv(1, str(image_dir), str(data_dir), parallel=True, max_workers=2, tile_dedup='exact')
+
+    assert pd.read_csv(data_dir / '1.csv')['number'].tolist() == expected
+    # Without a shared table each image reads its own tiles, 8 * 5 here. Two workers
+    # racing on a new tile may both read it, so at most twice the distinct tiles.
+    summary = re.search(r"(\d+) unique tiles were read", capsys.readouterr().out)
+    assert int(summary.group(1)) <= 2 * len(NUMBERS)
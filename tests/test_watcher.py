@@ -0,0 +1,41 @@
+import pandas as pd
+import utils.analyze_data as analyze_data
+from utils.group_store import load_index, write_group
+from utils.watcher import _save_watch_state, apply_changes, watch_images
+
+
+def _state(group_id, numbers):
+    return {f"{group_id}_1.png": {'mtime_ns': 1, 'size': 1, 'numbers': numbers}}
+
+
+def test_group_without_images_is_deleted(tmp_path):
+    data_dir = tmp_path / 'data'
+    data_dir.mkdir()
+    pd.DataFrame({'group_id': 3, 'number': [1, 2]}).to_csv(data_dir / '3.csv', index=False)
+    state = _state(3, [1, 2])
+
+    assert apply_changes(str(tmp_path), str(data_dir), state, {}, ['3_1.png']) == [3]
+    assert not (data_dir / '3.csv').exists()
+    assert state == {}
+
+
+def test_group_without_images_is_deleted_from_store(tmp_path):
+    store_path = str(tmp_path / 'groups.bin')
+    write_group(store_path, 3, [1, 2])
+    write_group(store_path, 4, [5])
+
+    apply_changes(str(tmp_path), str(tmp_path), _state(3, [1, 2]), {}, ['3_1.png'], store_path)
+    assert sorted(load_index(store_path)) == [4]
+
+
+def test_analyze_reads_the_watched_data_dir(tmp_path, monkeypatch):
+    image_dir, data_dir = tmp_path / 'images', tmp_path / 'custom'
+    image_dir.mkdir()
+    data_dir.mkdir()
+    _save_watch_state(str(data_dir), _state(3, [1, 2]))
+
+    calls = []
+    monkeypatch.setattr(analyze_data, 'run_full_analysis', lambda day, **kwargs: calls.append((day, kwargs)))
+    watch_images(str(image_dir), str(data_dir), analyze=True, once=True)
+
+    assert calls == [(10, {'store_path': None, 'plot_mode': 'none', 'data_dir': str(data_dir)})]
@@ -1,22 +1,42 @@
 import os
+import re
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
 import numpy as np
+from .group_store import read_groups_df, read_groups, load_index
+from .streaming_stats import NumberSketch, sketch_groups
 
 DATA_DIR = 'data/'
 PLOT_DIR = 'plots/'
 
+
+'''
+Args:
+    plot_mode(str): 'sync', 'deferred' or 'none'.
+    plot_name(str): The name of a plot function in utils.plotting.
+    save_path(str): Where the PNG is written.
+    args(tuple): The arguments of the plot function before save_path.
+'''
+def _submit_plot(plot_mode, plot_name, save_path, *args):
+    if plot_mode == 'none':
+        return
+
+    # matplotlib and seaborn are only imported when a plot is actually drawn
+    from . import plotting
+    plotting.submit_plot(plot_mode, getattr(plotting, plot_name), save_path, *args)
+
+
 '''
 Args:
     target_day(int): The day you want to predict.
     data_dir(str): The directory where the group CSV files are stored.
+    store_path(str): If given, read the groups from this binary group store
+                     instead of the CSV files.
 Returns:
     pd.DataFrame: A DataFrame containing the combined data of relevent days.
                   Returns an empty DataFrame if no data is found.
     list: A list of the group IDs that were used for analysis.
 '''
-def load_cyclical_data(target_day, data_dir):
+def load_cyclical_data(target_day, data_dir, store_path=None):
     print(f"--- Step 1: Loading historical data for predicting Day {target_day} ---")
 
     # Choose relevant days. e.g., 1, 8, 15, ...
@@ -29,6 +49,14 @@ def load_cyclical_data(target_day, data_dir):
     
     print(f"Relevant past data groups found: {relevant_group_ids}")
 
+    # Slice the relevant groups straight out of the memory-mapped store
+    if store_path is not None:
+        combined_df = read_groups_df(store_path, relevant_group_ids)
+        if combined_df.empty:
+            return pd.DataFrame(), []
+        print(f"Successfully loaded a total of {len(combined_df)} numbers for analysis")
+        return combined_df, relevant_group_ids
+
     # Read and concat relevant days into one dataframe
     df_list = []
     for group_id in relevant_group_ids:
@@ -56,43 +84,25 @@ Args:
     df(pd.DataFrame): The combined DataFrame containg all relevant historical data.
     target_day(int): The target day, used for titling plots and reports.
     plot_dir(str): The directory where generated plots will be saved.
+    plot_mode(str): 'sync' draws the plots before returning, 'deferred' draws them
+                    on a background worker pool and 'none' skips them.
 Returns:
     pd.Series: A pandas Series containing the frequency of each last digit(0-9).
     pd.Series: A pandas Series containing the frequency of each hundreds-bucket.
 '''
-def perform_core_pattern_analysis(df, target_day, plot_dir):
+def perform_core_pattern_analysis(df, target_day, plot_dir, plot_mode='sync'):
     print("--- Step 2: Performing Core Pattern Analysis ---")
 
     # Overall Distribution (Histogram + KDE)
-    plt.figure(figsize=(12, 7))
-    sns.histplot(df['number'], kde=True, bins=50)
-    plt.title(f"Overall Number Distribution(for Target Day {target_day})", fontsize=16)
-    plt.xlabel("Number", fontsize=12)
-    plt.ylabel("Frequency", fontsize=12)
-    plt.grid(True, linestyle='--', alpha=0.6)
-    
     save_path_dist = os.path.join(plot_dir, f"distribution_day_{target_day}.png")
-    plt.savefig(save_path_dist)
-    plt.close()
-    print(f"-> Overall distribution plot saved to: {save_path_dist}")
+    _submit_plot(plot_mode, 'plot_distribution', save_path_dist, df['number'], target_day)
 
     # Hundreds-Bucket Frequency
     hundreds_bucket = df['number'] // 100
     bucket_counts = hundreds_bucket.value_counts().sort_index()
-    x_labels = bucket_counts.index * 100
-
-    plt.figure(figsize=(24, 8))
-    sns.barplot(x=x_labels, y=bucket_counts.values, color="skyblue")
-    plt.title(f"Frequency by Hundreds-Bucket (for Target Day {target_day})", fontsize=16)
-    plt.xlabel("Hundreds Bucket", fontsize=12)
-    plt.ylabel("Frequency", fontsize=12)
-    plt.xticks(rotation=45, fontsize=8)
-    plt.tight_layout()
-    
+
     save_path_bucket = os.path.join(plot_dir, f"hundreds_bucket_day_{target_day}.png")
-    plt.savefig(save_path_bucket)
-    plt.close()
-    print(f"-> Hundreds-bucket frequency plot saved to: {save_path_bucket}")
+    _submit_plot(plot_mode, 'plot_bucket_counts', save_path_bucket, bucket_counts, target_day)
 
     # Last Digit Frequency
     last_digits = df['number'] % 10
@@ -109,49 +119,101 @@ Args:
     relevant_group_ids(list): A list of the past days used in the analysis.
     target_dat(int): The target day, used for titling the plot.
     plot_dir(str): The directory where the generated plot will be saved.
+    plot_mode(str): 'sync', 'deferred' or 'none', see perform_core_pattern_analysis.
 Returns:
     pd.Series: A pandas Series containing the median value for each historical day.
 '''
-def perform_trend_analysis(df, relevant_group_ids, target_day, plot_dir):
+def perform_trend_analysis(df, relevant_group_ids, target_day, plot_dir, plot_mode='sync'):
     print("--- Step 3: Performing Simple Trend Analysis ---")
 
     # Calculate the median for each past day in the cycle
     medians_over_time = df.groupby('group_id')['number'].median().reindex(relevant_group_ids)
 
-    plt.figure(figsize=(10, 6))
-    medians_over_time.plot(kind='line', marker='o', linestyle='-')
-    plt.title(f"Trend of Median Number for Cycle (Predicting Day {target_day})", fontsize=16)
-    plt.xlabel("Day Number", fontsize=12)
-    plt.ylabel("Median Number", fontsize=12)
-    plt.xticks(relevant_group_ids)
-    plt.grid(True, linestyle='--', alpha=0.6)
-
     save_path_trend = os.path.join(plot_dir, f"trend_analysis_day_{target_day}.png")
-    plt.savefig(save_path_trend)
-    plt.close()
-    print(f"-> Trend analysis plot saved to: {save_path_trend}")
+    _submit_plot(plot_mode, 'plot_trend', save_path_trend, medians_over_time, relevant_group_ids, target_day)
 
     return medians_over_time
 
 
 '''
+Scores every number in [candidate_min, candidate_max] with array operations and keeps the best k.
+
 Args:
-    df(pd.DataFrame): The combined DataFrame, used to define the candidate number pool.
+    candidate_min(int): The lowest candidate number.
+    candidate_max(int): The highest candidate number.
     bucket_counts(pd.Series): The frequency of each hundreds-bucket.
-    last_digit_freq(pd.Series): The frequency of each last digit.
-    medians_over_time(pd.Series): The trend data of median values.
+    hot_last_digits(list[int]): The last digits that earn the bonus score.
+    k(int): The number of recommendations to return.
+    extra_scores(list[callable]): Optional extra score terms. Each one takes the candidate
+                                  array and returns an array of scores to add.
 Returns:
-    list[dict]: A list of dictionaries, where each dictionary contains a
-                recommended 'number' and its calculated 'score'.
-                Returns an empty list if no recommendations can be made.
+    list[dict]: Up to k dictionaries with a 'number' and its 'score', best first.
+                Equal scores keep ascending number order.
 '''
-def recommend_top_numbers(df, bucket_counts, last_digit_freq, medians_over_time):
-    print("--- Step 4: Generating Top 5 Recommendations ---")
+def score_candidates(candidate_min, candidate_max, bucket_counts, hot_last_digits, k=5, extra_scores=None):
+    candidates = np.arange(candidate_min, candidate_max + 1)
+    if candidates.size == 0 or k <= 0:
+        return []
 
-    # Define the candidate pool: Focus on the core 50% of the data (between Q1 and Q3)
-    q1 = df['number'].quantile(0.25)
-    q3 = df['number'].quantile(0.75)
+    # How frequent is its hundreds-bucket
+    bucket_index = bucket_counts.index.to_numpy()
+    order = np.argsort(bucket_index)
+    sorted_buckets = bucket_index[order]
+    sorted_counts = bucket_counts.to_numpy(dtype=np.float64)[order]
+
+    buckets = candidates // 100
+    positions = np.minimum(np.searchsorted(sorted_buckets, buckets), len(sorted_buckets) - 1)
+    found = sorted_buckets[positions] == buckets
+    scores = np.where(found, sorted_counts[positions], 0.0)
+
+    # If it has a "hot" last digit
+    hot = np.isin(candidates % 10, np.asarray(list(hot_last_digits)))
+    scores = scores + np.where(hot, bucket_counts.mean(), 0.0)
+
+    for extra_score in extra_scores or []:
+        scores = scores + extra_score(candidates)
+
+    positive = scores > 0
+    candidates = candidates[positive]
+    scores = scores[positive]
+    if candidates.size == 0:
+        return []
+
+    # Keep every candidate that ties with the k-th best score, then break ties by number
+    if candidates.size > k:
+        kth_score = -np.partition(-scores, k - 1)[k - 1]
+        selected = np.flatnonzero(scores >= kth_score)
+        candidates = candidates[selected]
+        scores = scores[selected]
 
+    top = np.lexsort((candidates, -scores))[:k]
+    return [{'number': int(candidates[i]), 'score': float(scores[i])} for i in top]
+
+
+'''
+Args:
+    numbers(pd.Series): The numbers to summarize.
+Returns:
+    dict: The 'q1', 'median' and 'q3' of the numbers.
+'''
+def compute_quantiles(numbers):
+    return {
+        'q1': numbers.quantile(0.25),
+        'median': numbers.median(),
+        'q3': numbers.quantile(0.75),
+    }
+
+
+'''
+Args:
+    q1(float): The first quartile of the numbers.
+    q3(float): The third quartile of the numbers.
+    medians_over_time(pd.Series): The trend data of median values.
+Returns:
+    int: The lowest candidate number.
+    int: The highest candidate number.
+'''
+def candidate_range(q1, q3, medians_over_time):
     # Adjust candidate pool based on trend
     trend_shift = 0
     if len(medians_over_time) > 1:
@@ -162,36 +224,103 @@ def recommend_top_numbers(df, bucket_counts, last_digit_freq, medians_over_time)
     # Shift the core range slightly based on the recent trend
     candidate_min = int(q1 + trend_shift / 2)
     candidate_max = int(q3 + trend_shift / 2)
+    return candidate_min, candidate_max
+
+
+'''
+Args:
+    df(pd.DataFrame): The combined DataFrame, used to define the candidate number pool.
+    bucket_counts(pd.Series): The frequency of each hundreds-bucket.
+    last_digit_freq(pd.Series): The frequency of each last digit.
+    medians_over_time(pd.Series): The trend data of median values.
+    k(int): The number of recommendations to return.
+    extra_scores(list[callable]): Optional extra score terms, see score_candidates.
+    quantiles(dict): Precomputed 'q1' and 'q3' of the numbers. If None, they are computed from df.
+Returns:
+    list[dict]: A list of dictionaries, where each dictionary contains a
+                recommended 'number' and its calculated 'score'.
+                Returns an empty list if no recommendations can be made.
+'''
+def recommend_top_numbers(df, bucket_counts, last_digit_freq, medians_over_time, k=5, extra_scores=None, quantiles=None):
+    print(f"--- Step 4: Generating Top {k} Recommendations ---")
+
+    # Define the candidate pool: Focus on the core 50% of the data (between Q1 and Q3)
+    if quantiles is None:
+        quantiles = compute_quantiles(df['number'])
+    candidate_min, candidate_max = candidate_range(quantiles['q1'], quantiles['q3'], medians_over_time)
     print(f"-> Candidate numbers will be selected from the trend-adjusted range: {candidate_min} to {candidate_max}")
 
     # Score each candidate number
     hot_last_digits = last_digit_freq.nlargest(3).index
-    recommendations = []
-
-    for number in range(candidate_min, candidate_max + 1):
-        score = 0
-
-        # How frequent is its hundreds-bucket
-        bucket = number // 100
-        if bucket in bucket_counts.index:
-            score += bucket_counts[bucket]
-        
-        # If it has a "hot" last digit
-        if number % 10 in hot_last_digits:
-            score += bucket_counts.mean()
-        
-        if score > 0:
-            recommendations.append({'number': number, 'score': score})
-    
-    if not recommendations:
+    top_k = score_candidates(candidate_min, candidate_max, bucket_counts, hot_last_digits, k, extra_scores)
+
+    if not top_k:
         print("Warning: Could not generate recommendations. The candidate pool might be empty.")
         return []
     
-    # Sort by score and return the top 5
-    top_5 = sorted(recommendations, key=lambda x: x['score'], reverse=True)[:5]
     print("-> Scoring complete")
 
-    return top_5
+    return top_k
+
+
+'''
+The scoring step of recommend_top_numbers on precomputed statistics, without output.
+
+Args:
+    quantiles(dict): The 'q1' and 'q3' of the numbers.
+    bucket_counts(pd.Series): The frequency of each hundreds-bucket.
+    last_digit_freq(pd.Series): The frequency of each last digit.
+    medians_over_time(pd.Series): The trend data of median values.
+    k(int): The number of recommendations to return.
+    extra_scores(list[callable]): Optional extra score terms, see score_candidates.
+Returns:
+    list[dict]: Up to k recommendations, see score_candidates.
+'''
+def recommend_from_stats(quantiles, bucket_counts, last_digit_freq, medians_over_time, k=5, extra_scores=None):
+    candidate_min, candidate_max = candidate_range(quantiles['q1'], quantiles['q3'], medians_over_time)
+    hot_last_digits = _hot_last_digits(last_digit_freq)
+    return score_candidates(candidate_min, candidate_max, bucket_counts, hot_last_digits, k, extra_scores)
+
+
+def _hot_last_digits(last_digit_freq, n=3):
+    # Same digits and tie order as last_digit_freq.nlargest(n), without its per-call overhead
+    return np.argsort(-last_digit_freq.to_numpy(), kind='stable')[:n]
+
+
+'''
+The data generate_summary_report prints, as a JSON-ready dictionary.
+
+Args:
+    last_digit_freq(pd.Series): The last digit frequency data from the core analysis.
+    medians_over_time(pd.Series): The trend data from the trend analysis.
+    recommendations(list[dict]): The list of top recommended numbers with their scores.
+    target_day(int): The target day.
+    quantiles(dict): The 'q1', 'median' and 'q3' of the numbers.
+Returns:
+    dict: The 'day', 'quantiles', 'hot_last_digits' (digit and count), 'trend'
+          ('direction' and 'last_median', or None with fewer than two medians) and
+          'recommendations'.
+'''
+def summarize_analysis(last_digit_freq, medians_over_time, recommendations, target_day, quantiles):
+    hot_last_digits = _hot_last_digits(last_digit_freq)
+
+    trend = None
+    last_two_medians = medians_over_time.dropna().tail(2)
+    if len(last_two_medians) == 2:
+        trend = {
+            'direction': "UPWARD" if last_two_medians.iloc[1] > last_two_medians.iloc[0] else "DOWNWARD",
+            'last_median': float(last_two_medians.iloc[1]),
+        }
+
+    return {
+        'day': int(target_day),
+        'quantiles': {name: float(value) for name, value in quantiles.items()},
+        'hot_last_digits': [
+            {'digit': int(digit), 'count': int(last_digit_freq.iloc[digit])} for digit in hot_last_digits
+        ],
+        'trend': trend,
+        'recommendations': recommendations,
+    }
 
 
 '''
@@ -201,15 +330,16 @@ Args:
     medians_over_time(pd.Series): The trend data from the trend analysis.
     recommendations(list[dict]): The list of top recommended numbers with their scores.
     target_day(int): The target day, used for the report title.
+    quantiles(dict): Precomputed 'q1', 'median' and 'q3'. If None, they are computed from df.
 '''
-def generate_summary_report(df, last_digit_freq, medians_over_time, recommendations, target_day):
+def generate_summary_report(df, last_digit_freq, medians_over_time, recommendations, target_day, quantiles=None):
     print('=' * 20 + " ANALYSIS SUMMARY REPORT " + '=' * 20)
     print(f"STRATEGY FOR PREDICTING DAY: {target_day}")
 
     # Hot Spots from distribution
-    q1 = df['number'].quantile(0.25)
-    q3 = df['number'].quantile(0.75)
-    median = df['number'].median()
+    if quantiles is None:
+        quantiles = compute_quantiles(df['number'])
+    q1, median, q3 = quantiles['q1'], quantiles['median'], quantiles['q3']
     print(f"1. Core Number Range (Hot Spot):")
     print(f"  - 50% of numbers fall between {q1:.0f} and {q3:.0f}")
     print(f"  - The median (central point) is {median:.0f}")
@@ -231,7 +361,7 @@ def generate_summary_report(df, last_digit_freq, medians_over_time, recommendati
             print(f"  - The median has show a rect {trend_direction} trend")
             print(f"  - Recommendation: Consider adjusting your target range slightly in the {trend_direction.lower()} direction from the last median ({last_two_medians.iloc[1]:.0f})")
     
-    print(f"4. TOP 5 RECOMMENDED NUMBERS: ")
+    print(f"4. TOP {len(recommendations) or 5} RECOMMENDED NUMBERS: ")
     if recommendations:
         for i, rec in enumerate(recommendations):
             print(f"  {i+1}. Number: {rec['number']} (Score: {rec['score']:.2f})")
@@ -241,22 +371,238 @@ def generate_summary_report(df, last_digit_freq, medians_over_time, recommendati
     print('=' * 70)
 
 
+'''
+The streaming counterpart of steps 1 to 3. Groups are read in chunks and folded into
+a NumberSketch, so memory doesn't grow with the number of rows.
+
+Args:
+    target_day(int): The day you want to predict.
+    data_dir(str): The directory where the group CSV files are stored.
+    plot_dir(str): The directory where generated plots will be saved.
+    store_path(str): If given, read the groups from this binary group store instead.
+    plot_mode(str): 'sync', 'deferred' or 'none', see perform_core_pattern_analysis.
+Returns:
+    NumberSketch: The sketch of all relevant groups, or None if no data is found.
+    pd.Series: The median value for each historical day.
+'''
+def perform_streaming_analysis(target_day, data_dir, plot_dir, store_path=None, plot_mode='sync'):
+    print(f"--- Step 1: Streaming historical data for predicting Day {target_day} ---")
+
+    cycle_day = (target_day - 1) % 7 + 1
+    relevant_group_ids = [day for day in range(cycle_day, target_day, 7)]
+    if not relevant_group_ids:
+        print(f"Error: No past data available in the cycle for Day {target_day}")
+        return None, None
+
+    print(f"Relevant past data groups found: {relevant_group_ids}")
+    sketch, medians_over_time = sketch_groups(relevant_group_ids, data_dir, store_path)
+    if sketch.total == 0:
+        return None, None
+    print(f"Successfully summarized a total of {sketch.total} numbers for analysis")
+
+    print("--- Step 2: Performing Core Pattern Analysis ---")
+    save_path_dist = os.path.join(plot_dir, f"distribution_day_{target_day}.png")
+    _submit_plot(
+        plot_mode, 'plot_distribution_histogram', save_path_dist,
+        sketch.value_counts, sketch.overflow_values, sketch.overflow_counts, target_day
+    )
+
+    bucket_counts = sketch.bucket_counts()
+    save_path_bucket = os.path.join(plot_dir, f"hundreds_bucket_day_{target_day}.png")
+    _submit_plot(plot_mode, 'plot_bucket_counts', save_path_bucket, bucket_counts, target_day)
+
+    print("-> Last Digit Frequency Analysis:")
+    print(sketch.last_digit_freq().to_string())
+
+    print("--- Step 3: Performing Simple Trend Analysis ---")
+    save_path_trend = os.path.join(plot_dir, f"trend_analysis_day_{target_day}.png")
+    _submit_plot(plot_mode, 'plot_trend', save_path_trend, medians_over_time, relevant_group_ids, target_day)
+
+    return sketch, medians_over_time
+
+
 '''
 Args:
     target_day(int): The day for which you want to generate a prediction strategy.
+    store_path(str): If given, read the group data from this binary group store.
+    plot_mode(str): 'sync' draws the plots before the report, 'deferred' draws them on a
+                    background worker pool (see plotting.wait_for_plots) and 'none' skips them.
+    streaming(bool): If True, read the groups in chunks into bounded-size count arrays
+                     instead of one DataFrame. The report is the same.
+    data_dir(str): The directory where the group CSV files are stored.
+    k(int): The number of recommendations.
 '''
-def run_full_analysis(target_day):
-    os.makedirs(PLOT_DIR, exist_ok=True)
+def run_full_analysis(target_day, store_path=None, plot_mode='sync', streaming=False, data_dir=DATA_DIR, k=5):
+    if plot_mode != 'none':
+        os.makedirs(PLOT_DIR, exist_ok=True)
+
+    if streaming:
+        sketch, medians_over_time = perform_streaming_analysis(target_day, data_dir, PLOT_DIR, store_path, plot_mode)
+        if sketch is None:
+            return
+        df = None
+        last_digit_freq, bucket_counts = sketch.last_digit_freq(), sketch.bucket_counts()
+        quantiles = sketch.quantiles()
+    else:
+        # Load data
+        df, relevant_groups = load_cyclical_data(target_day, data_dir, store_path)
+        if df.empty:
+            return
 
-    # Load data
-    df, relevant_groups = load_cyclical_data(target_day, DATA_DIR)
-    if df.empty:
-        return
-    
-    # Perfome core and trend analysis
-    last_digit_freq, bucket_counts = perform_core_pattern_analysis(df, target_day, PLOT_DIR)
-    medians_over_time = perform_trend_analysis(df, relevant_groups, target_day, PLOT_DIR)
-    recommendations = recommend_top_numbers(df, bucket_counts, last_digit_freq, medians_over_time)
+        # Perfome core and trend analysis
+        last_digit_freq, bucket_counts = perform_core_pattern_analysis(df, target_day, PLOT_DIR, plot_mode)
+        medians_over_time = perform_trend_analysis(df, relevant_groups, target_day, PLOT_DIR, plot_mode)
+        quantiles = compute_quantiles(df['number'])
+
+    # The quantiles are computed once and shared by the recommendation and the report
+    recommendations = recommend_top_numbers(df, bucket_counts, last_digit_freq, medians_over_time, k, quantiles=quantiles)
 
     # Generate summary
-    generate_summary_report(df, last_digit_freq, medians_over_time, recommendations, target_day)
\ No newline at end of file
+    generate_summary_report(df, last_digit_freq, medians_over_time, recommendations, target_day, quantiles)
+
+
+'''
+Args:
+    data_dir(str): The directory where the group CSV files are stored.
+    store_path(str): If given, read the groups from this binary group store instead.
+Returns:
+    dict: {group_id(int): np.ndarray} of every non-empty group, each read exactly once.
+'''
+def load_all_groups(data_dir, store_path=None):
+    if store_path is not None:
+        groups = read_groups(store_path, sorted(load_index(store_path)))
+        return {group_id: np.asarray(numbers, dtype=np.int64) for group_id, numbers in groups.items() if len(numbers)}
+
+    groups = {}
+    if not os.path.isdir(data_dir):
+        return groups
+
+    for filename in os.listdir(data_dir):
+        match = re.fullmatch(r'(\d+)\.csv', filename)
+        if not match:
+            continue
+
+        file_path = os.path.join(data_dir, filename)
+        try:
+            df = pd.read_csv(file_path)
+        except pd.errors.EmptyDataError:
+            print(f"Warning: File '{file_path}' is empty and will be skipped")
+            continue
+        if not df.empty:
+            groups[int(match.group(1))] = df['number'].to_numpy(dtype=np.int64)
+
+    return groups
+
+
+'''
+Analyses the target days of one 7-day cycle residue. The groups cycle_day,
+cycle_day + 7, ... are folded into a running NumberSketch, so every day's statistics
+come from running sums instead of re-scanning its whole history. Module-level and
+silent, so it can run in a worker process.
+
+Args:
+    cycle_day(int): The first day of the cycle, 1 to 7.
+    days(list[int]): Sorted target days of this cycle.
+    groups(dict): {group_id: np.ndarray} holding at least the cycle's prior groups.
+    k(int): The number of recommendations per day.
+    extra_scores(list[callable]): Optional extra score terms, see score_candidates.
+    histogram_size(int): The initial sketch size, e.g. the largest number + 1. Capped at
+                         DENSE_LIMIT; larger numbers are counted sparsely.
+Returns:
+    dict: {target_day: result} for every day with data, see run_batch_analysis.
+'''
+def analyze_cycle(cycle_day, days, groups, k=5, extra_scores=None, histogram_size=0):
+    sketch = NumberSketch(histogram_size)
+    medians = {}
+    next_group = cycle_day
+
+    results = {}
+    for day in days:
+        while next_group < day:
+            if next_group in groups:
+                group_sketch = NumberSketch(histogram_size)
+                group_sketch.update(groups[next_group])
+                medians[next_group] = group_sketch.quantiles()['median'] if group_sketch.total else np.nan
+                sketch.merge(group_sketch)
+            next_group += 7
+
+        relevant_group_ids = list(range(cycle_day, day, 7))
+        if sketch.total == 0:
+            continue
+
+        bucket_counts = sketch.bucket_counts()
+        last_digit_freq = sketch.last_digit_freq()
+        medians_over_time = pd.Series(
+            [medians.get(group_id, np.nan) for group_id in relevant_group_ids],
+            index=relevant_group_ids, dtype=np.float64
+        )
+
+        quantiles = sketch.quantiles()
+        recommendations = recommend_from_stats(quantiles, bucket_counts, last_digit_freq, medians_over_time, k, extra_scores)
+
+        results[day] = {
+            'relevant_group_ids': relevant_group_ids,
+            'quantiles': quantiles,
+            'bucket_counts': bucket_counts,
+            'last_digit_freq': last_digit_freq,
+            'medians_over_time': medians_over_time,
+            'recommendations': recommendations,
+        }
+    return results
+
+
+'''
+Args:
+    target_days(list[int]): Target days.
+Returns:
+    dict: {cycle_day: sorted target days} for every 7-day cycle residue.
+'''
+def group_days_by_cycle(target_days):
+    days_by_cycle = {}
+    for day in sorted(set(int(day) for day in target_days)):
+        days_by_cycle.setdefault((day - 1) % 7 + 1, []).append(day)
+    return days_by_cycle
+
+
+'''
+Analyses many target days at once. Every group is loaded once and each 7-day cycle
+residue is walked once, see analyze_cycle. No plots are drawn.
+
+Args:
+    target_days(list[int]): The days for which you want to generate a prediction strategy.
+    k(int): The number of recommendations per day.
+    extra_scores(list[callable]): Optional extra score terms, see score_candidates.
+    report(bool): If True, print the summary report of every day.
+    store_path(str): If given, read the group data from this binary group store.
+    data_dir(str): The directory where the group CSV files are stored.
+Returns:
+    dict: {target_day: result} for every day with data. Each result holds the
+          'relevant_group_ids', the 'quantiles', 'bucket_counts', 'last_digit_freq',
+          'medians_over_time' and 'recommendations' of that day.
+'''
+def run_batch_analysis(target_days, k=5, extra_scores=None, report=False, store_path=None, data_dir=DATA_DIR):
+    days_by_cycle = group_days_by_cycle(target_days)
+    if not days_by_cycle:
+        return {}
+
+    groups = load_all_groups(data_dir, store_path)
+    if not groups:
+        print(f"Error: No group data found in '{data_dir}'")
+        return {}
+
+    # Size every sketch up front so no group has to grow it. The sketch caps the size,
+    # so a single huge misread doesn't make every histogram huge.
+    histogram_size = int(max(numbers.max() for numbers in groups.values())) + 1
+
+    results = {}
+    for cycle_day, days in days_by_cycle.items():
+        results.update(analyze_cycle(cycle_day, days, groups, k, extra_scores, histogram_size))
+
+    results = dict(sorted(results.items()))
+    if report:
+        for day, result in results.items():
+            generate_summary_report(
+                None, result['last_digit_freq'], result['medians_over_time'],
+                result['recommendations'], day, result['quantiles']
+            )
+    return results
@@ -0,0 +1,139 @@
+import os
+import numpy as np
+import pandas as pd
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
+from .analyze_data import DATA_DIR, load_all_groups, analyze_cycle, group_days_by_cycle
+from .streaming_stats import DENSE_LIMIT
+
+
+'''
+Args:
+    numbers(np.ndarray): The numbers of one group.
+Returns:
+    int: The smallest number that appears exactly once, or None if there is none.
+'''
+def lowest_unique_number(numbers):
+    numbers = np.asarray(numbers, dtype=np.int64)
+    numbers = numbers[numbers >= 0]
+    if numbers.size == 0:
+        return None
+
+    if numbers.max() >= DENSE_LIMIT:
+        # A huge misread would make the bincount huge; sorting costs the same at any size
+        values, counts = np.unique(numbers, return_counts=True)
+        unique_numbers = values[counts == 1]
+    else:
+        unique_numbers = np.flatnonzero(np.bincount(numbers) == 1)
+    return int(unique_numbers[0]) if unique_numbers.size else None
+
+
+'''
+Args:
+    day(int): The backtested day.
+    recommendations(list[dict]): The recommendations made for the day, best first.
+    actual(int): The day's actual lowest unique number.
+Returns:
+    dict: The 'hit_rank' (1-based, NaN on a miss), and the distance from the actual
+          number to the top recommendation ('top_distance') and to the nearest one
+          ('min_distance'), NaN without recommendations.
+'''
+def score_day(day, recommendations, actual):
+    numbers = np.array([rec['number'] for rec in recommendations], dtype=np.int64)
+    distances = np.abs(numbers - actual)
+    hits = np.flatnonzero(distances == 0)
+    return {
+        'day': day,
+        'actual': actual,
+        'recommendations': numbers.tolist(),
+        'hit': bool(hits.size),
+        'hit_rank': hits[0] + 1 if hits.size else np.nan,
+        'top_distance': distances[0] if distances.size else np.nan,
+        'min_distance': distances.min() if distances.size else np.nan,
+    }
+
+
+'''
+Backtests the days of one 7-day cycle residue. Module-level and silent, so it can run
+in a worker process.
+
+Returns:
+    list[dict]: A score_day row for every day that has an actual lowest unique number
+                and at least one prior group.
+'''
+def _backtest_cycle(cycle, groups, k=5, extra_scores=None, histogram_size=0):
+    cycle_day, days = cycle
+    results = analyze_cycle(cycle_day, days, groups, k, extra_scores, histogram_size)
+
+    rows = []
+    for day, result in results.items():
+        actual = lowest_unique_number(groups[day])
+        if actual is not None:
+            rows.append(score_day(day, result['recommendations'], actual))
+    return rows
+
+
+'''
+Walk-forward backtest of the recommendation strategy. Every day is recommended from
+only its prior same-cycle groups, exactly like run_batch_analysis, and compared with
+the day's actual lowest unique number. The 7 cycle residues run on a process pool.
+Nothing is plotted or printed.
+
+Args:
+    days(list[int]): The days to backtest. Defaults to every group with data.
+    k(int): The number of recommendations per day.
+    extra_scores(list[callable]): Optional extra score terms, see score_candidates.
+                                  They must be picklable, e.g. module-level functions.
+    store_path(str): If given, read the group data from this binary group store.
+    data_dir(str): The directory where the group CSV files are stored.
+    max_workers(int): The number of worker processes. 1 runs in this process.
+Returns:
+    pd.DataFrame: One score_day row per backtested day, sorted by day.
+'''
+def run_backtest(days=None, k=5, extra_scores=None, store_path=None, data_dir=DATA_DIR, max_workers=None):
+    groups = load_all_groups(data_dir, store_path)
+    columns = ['day', 'actual', 'recommendations', 'hit', 'hit_rank', 'top_distance', 'min_distance']
+    if not groups:
+        return pd.DataFrame(columns=columns)
+
+    # A day can only be scored if its own group is known
+    days_by_cycle = group_days_by_cycle(day for day in (groups if days is None else days) if day in groups)
+    histogram_size = int(max(numbers.max() for numbers in groups.values())) + 1
+
+    # Each worker only receives the groups of its own cycle
+    tasks = []
+    for cycle_day, cycle_days in days_by_cycle.items():
+        cycle_groups = {group_id: numbers for group_id, numbers in groups.items() if (group_id - 1) % 7 + 1 == cycle_day}
+        tasks.append(((cycle_day, cycle_days), cycle_groups))
+
+    backtest_cycle = partial(_backtest_cycle, k=k, extra_scores=extra_scores, histogram_size=histogram_size)
+    workers = min(max_workers or os.cpu_count() or 1, len(tasks))
+    if workers <= 1:
+        row_lists = [backtest_cycle(cycle, cycle_groups) for cycle, cycle_groups in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            row_lists = list(executor.map(backtest_cycle, *zip(*tasks)))
+
+    rows = [row for row_list in row_lists for row in row_list]
+    return pd.DataFrame(rows, columns=columns).sort_values('day', ignore_index=True)
+
+
+'''
+Args:
+    backtest(pd.DataFrame): The result of run_backtest.
+Returns:
+    dict: The number of 'days' and 'hits', the 'hit_rate', the 'mean_hit_rank' of the
+          hits, and the mean and median 'min_distance' and mean 'top_distance'.
+'''
+def summarize_backtest(backtest):
+    days = len(backtest)
+    hits = int(backtest['hit'].sum()) if days else 0
+    return {
+        'days': days,
+        'hits': hits,
+        'hit_rate': hits / days if days else np.nan,
+        'mean_hit_rank': float(backtest['hit_rank'].mean()) if hits else np.nan,
+        'mean_min_distance': float(backtest['min_distance'].mean()) if days else np.nan,
+        'median_min_distance': float(backtest['min_distance'].median()) if days else np.nan,
+        'mean_top_distance': float(backtest['top_distance'].mean()) if days else np.nan,
+    }
@@ -0,0 +1,232 @@
+import os
+import re
+import cv2
+import numpy as np
+from tqdm import tqdm
+
+DEFAULT_TEMPLATES_PATH = 'glyph_templates.npz'
+
+# Every glyph is scaled to this size (width, height) before matching
+GLYPH_SIZE = (16, 24)
+# A glyph shorter than this share of the tallest glyph in the ROI is noise
+MIN_GLYPH_HEIGHT_RATIO = 0.5
+MIN_GLYPH_AREA = 20
+
+# Below these the ROI goes to the Tesseract cascade instead
+MIN_SIMILARITY = 0.80
+MIN_MARGIN = 0.05
+# Digits with fewer labelled samples get no template
+MIN_SAMPLES_PER_DIGIT = 3
+
+
+'''
+Splits a binarized ROI into its digit glyphs with connected components.
+
+Args:
+    thresh_roi(np.ndarray): A binarized ROI (black digits on white) from preprocess_roi.
+Returns:
+    list[np.ndarray]: The glyphs from left to right, each GLYPH_SIZE, float32 in [0, 1]
+                      with 1 for ink.
+'''
+def segment_glyphs(thresh_roi):
+    ink = (thresh_roi < 128).astype(np.uint8)
+    n_labels, labels, component_stats, _ = cv2.connectedComponentsWithStats(ink, connectivity=8)
+
+    boxes = []
+    for label in range(1, n_labels):
+        x, y, w, h, area = component_stats[label]
+        # Ink touching the ROI border is the rectangle's edge, not a digit
+        if x == 0 or y == 0 or x + w == ink.shape[1] or y + h == ink.shape[0]:
+            continue
+        if area < MIN_GLYPH_AREA:
+            continue
+        boxes.append([x, y, x + w, y + h])
+
+    if not boxes:
+        return []
+
+    tallest = max(y2 - y1 for _, y1, _, y2 in boxes)
+    boxes = [box for box in boxes if box[3] - box[1] >= tallest * MIN_GLYPH_HEIGHT_RATIO]
+    boxes.sort()
+
+    # Merge components that overlap horizontally, e.g. a digit broken by thresholding
+    merged = [boxes[0]]
+    for x1, y1, x2, y2 in boxes[1:]:
+        last = merged[-1]
+        overlap = min(last[2], x2) - max(last[0], x1)
+        if overlap > 0.5 * min(last[2] - last[0], x2 - x1):
+            merged[-1] = [min(last[0], x1), min(last[1], y1), max(last[2], x2), max(last[3], y2)]
+        else:
+            merged.append([x1, y1, x2, y2])
+
+    glyphs = []
+    for x1, y1, x2, y2 in merged:
+        glyph = ink[y1:y2, x1:x2].astype(np.float32)
+        glyphs.append(cv2.resize(glyph, GLYPH_SIZE, interpolation=cv2.INTER_AREA))
+    return glyphs
+
+
+def _normalize(vectors):
+    vectors = vectors - vectors.mean(axis=1, keepdims=True)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+'''
+Nearest-template classification by normalized correlation.
+
+Args:
+    glyphs(list[np.ndarray]): Glyphs from segment_glyphs.
+    templates(np.ndarray): (10, H * W) templates from load_templates. Rows of
+                           digits without a template are NaN.
+Returns:
+    np.ndarray: The best digit of every glyph.
+    np.ndarray: The similarity of the best digit.
+    np.ndarray: The margin to the second best digit.
+'''
+def classify_glyphs(glyphs, templates):
+    vectors = _normalize(np.stack(glyphs).reshape(len(glyphs), -1))
+    similarities = vectors @ _normalize(np.nan_to_num(templates)).T
+    similarities[:, np.isnan(templates).any(axis=1)] = -np.inf
+
+    order = np.argsort(similarities, axis=1)
+    best = order[:, -1]
+    rows = np.arange(len(glyphs))
+    best_similarity = similarities[rows, best]
+    margin = best_similarity - similarities[rows, order[:, -2]]
+    return best, best_similarity, margin
+
+
+'''
+Args:
+    thresh_roi(np.ndarray): A binarized ROI from preprocess_roi.
+    templates(np.ndarray): Templates from load_templates.
+Returns:
+    str: The recognized digits, or "" if the classifier isn't confident about every glyph.
+'''
+def recognize_roi(thresh_roi, templates):
+    glyphs = segment_glyphs(thresh_roi)
+    if not glyphs:
+        return ""
+
+    digits, similarity, margin = classify_glyphs(glyphs, templates)
+    if similarity.min() < MIN_SIMILARITY or margin.min() < MIN_MARGIN:
+        return ""
+    return ''.join(str(digit) for digit in digits)
+
+
+'''
+Args:
+    path(str): A .npz file written by save_templates.
+Returns:
+    np.ndarray: (10, H * W) float32 templates, or None if the file doesn't exist.
+'''
+def load_templates(path=DEFAULT_TEMPLATES_PATH):
+    if not os.path.exists(path):
+        print(f"Error: Glyph template file not found at {path}")
+        return None
+
+    with np.load(path) as data:
+        return data['templates']
+
+
+'''
+Args:
+    path(str): Where the .npz file is written.
+    templates(np.ndarray): (10, H * W) templates.
+    counts(np.ndarray): The number of samples behind every template.
+'''
+def save_templates(path, templates, counts):
+    templates_dir = os.path.dirname(path)
+    if templates_dir:
+        os.makedirs(templates_dir, exist_ok=True)
+    np.savez_compressed(path, templates=templates.astype(np.float32), counts=counts)
+
+
+'''
+Args:
+    thresh_rois(list[np.ndarray]): The ROIs of one image.
+    numbers(list[int]): The known numbers of those ROIs, in the same order.
+Returns:
+    list[tuple]: (digit, glyph) of every ROI whose glyph count matches its number.
+'''
+def collect_glyph_samples(thresh_rois, numbers):
+    samples = []
+    for thresh_roi, number in zip(thresh_rois, numbers):
+        glyphs = segment_glyphs(thresh_roi)
+        text = str(number)
+        if len(glyphs) != len(text):
+            continue
+        samples.extend((int(digit), glyph) for digit, glyph in zip(text, glyphs))
+    return samples
+
+
+'''
+Args:
+    samples(list[tuple]): (digit, glyph) pairs.
+Returns:
+    np.ndarray: (10, H * W) mean glyph of every digit, NaN rows for digits with
+                fewer than MIN_SAMPLES_PER_DIGIT samples.
+    np.ndarray: The number of samples of every digit.
+'''
+def templates_from_samples(samples):
+    size = GLYPH_SIZE[0] * GLYPH_SIZE[1]
+    sums = np.zeros((10, size), dtype=np.float64)
+    counts = np.zeros(10, dtype=np.int64)
+    for digit, glyph in samples:
+        sums[digit] += glyph.reshape(-1)
+        counts[digit] += 1
+
+    templates = np.full((10, size), np.nan, dtype=np.float64)
+    enough = counts >= MIN_SAMPLES_PER_DIGIT
+    templates[enough] = sums[enough] / counts[enough, None]
+    return templates, counts
+
+
+'''
+Builds the glyph templates from images that were already OCR'd. The labels come
+from the Tesseract engine (cheap when the OCR cache holds them), and only images
+where every yellow rectangle was read are used, so each ROI lines up with its number.
+
+Args:
+    image_dir(str): A path to the directory containing images.
+    output_path(str): Where the templates are saved.
+    cache(OCRCache): An optional OCR result cache holding the earlier results.
+Returns:
+    np.ndarray: The samples per digit, or None if no image could be used.
+'''
+def build_templates(image_dir, output_path=DEFAULT_TEMPLATES_PATH, cache=None):
+    from .extract_num_from_image import extract_num_from_img, find_number_rects, preprocess_roi
+
+    filenames = sorted(
+        f for f in os.listdir(image_dir)
+        if f.lower().endswith(('.png', '.jpg', '.jpeg')) and re.match(r'\d+_\d+', f)
+    )
+
+    samples = []
+    used_images = 0
+    for filename in tqdm(filenames, desc="Collecting glyphs"):
+        image_path = os.path.join(image_dir, filename)
+        numbers = extract_num_from_img(image_path, cache=cache)
+
+        image = cv2.imread(image_path)
+        if image is None:
+            continue
+        thresh_rois = [preprocess_roi(image, rect) for rect in find_number_rects(image)]
+        thresh_rois = [roi for roi in thresh_rois if roi is not None]
+
+        # A failed ROI shifts every later number, so only fully read images are usable
+        if len(thresh_rois) != len(numbers):
+            continue
+        samples.extend(collect_glyph_samples(thresh_rois, numbers))
+        used_images += 1
+
+    if not samples:
+        print("Error: No labelled glyphs could be collected")
+        return None
+
+    templates, counts = templates_from_samples(samples)
+    save_templates(output_path, templates, counts)
+    print(f"Glyph templates built from {used_images} images and {len(samples)} glyphs, saved to: {output_path}")
+    print(f"-> Samples per digit: {counts.tolist()}")
+    return counts
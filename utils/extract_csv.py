@@ -1,10 +1,48 @@
 import os
 import re
+import time
+from functools import partial
+from multiprocessing import Manager
+import numpy as np
 import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
 from .extract_num_from_image import extract_num_from_img
+from .group_store import write_group, delete_group
+from .ocr_stats import OCRStats, export_report
+from .outlier_filter import group_outlier_mask, load_neighbour_groups, log_removed, removed_log_path
+from .tile_cache import TileCache
+
+'''
+Args:
+    num_list(list[int]): The numbers of a group.
+    group_id(int): The group ID of the numbers.
+    neighbours(dict): {group_id: np.ndarray} of the neighbouring groups, whose quartiles
+                      form the rolling history the numbers are also checked against.
+Returns:
+    list[int]: num_list without the outliers, see outlier_filter.outlier_mask.
+'''
+def filter_outliers(num_list, group_id=0, neighbours=None):
+    mask = group_outlier_mask(num_list, group_id, neighbours)
+    return [number for number, outlier in zip(num_list, mask) if not outlier]
 
-def filter_outliers(num_list):
-    return num_list
+
+def image_sort_key(filename):
+    parts = re.findall(r'\d+', filename)
+    return [int(p) for p in parts]
+
+
+'''
+Runs extract_num_from_img with instrumentation enabled. Module-level, so it can run
+in a worker process.
+
+Returns:
+    list[int]: The extracted numbers.
+    dict: The OCRStats of the image, as a dict.
+'''
+def _extract_with_stats(image_path, **options):
+    stats = OCRStats()
+    numbers = extract_num_from_img(image_path, stats=stats, **options)
+    return numbers, stats.to_dict()
 
 
 '''
@@ -12,8 +50,28 @@ Args:
     process_group_id(int): The group ID of the images.
     image_dir(str): A path to the directory containing images.
     output_group_dir(str): A directory where CSV file will be saved.
+    parallel(bool): If True, OCR the images on a process pool instead of one by one.
+    max_workers(int): The number of worker processes in parallel mode.
+                      Defaults to the CPU count.
+    batch_ocr(bool): If True, recognize all ROIs of an image with one Tesseract call per pass.
+    cache(OCRCache): An optional OCR result cache. Images that haven't changed since
+                     the last run are not OCR'd again.
+    store_path(str): If given, write the numbers to this binary group store instead of a CSV file.
+    stats_report(str): If given, instrument the OCR engine and write per-image and
+                       per-group stage timings and counters to this .json or .csv file.
+    templates(np.ndarray): Optional digit classifier templates. ROIs the classifier is
+                           confident about skip Tesseract.
+    detect_scale(float): Find the yellow rectangles on a copy downscaled by this factor.
+    strip_height(int): If given, process very tall images in horizontal strips of this many rows.
+    tile_dedup(str): 'exact' or 'perceptual' to OCR every distinct ROI tile only once per
+                     run and reuse its text for repeated tiles, see TileCache. The
+                     dedup ratio is printed.
+    outlier_filter(bool | dict): False writes the numbers unfiltered. A dict sets the
+                                 digit rules, see outlier_filter.outlier_mask.
 '''
-def create_csv(process_group_id, image_dir, output_group_dir):
+def create_csv(process_group_id, image_dir, output_group_dir, parallel=False, max_workers=None, batch_ocr=False, cache=None,
+               store_path=None, stats_report=None, templates=None, detect_scale=1.0, strip_height=None, tile_dedup=None,
+               outlier_filter=True):
     try:
         process_group_id = int(process_group_id)
     except (ValueError, TypeError):
@@ -37,36 +95,150 @@ def create_csv(process_group_id, image_dir, output_group_dir):
         return
     
     # Sort files into '1_1.png', '1_2.png', ..., '1_10.png'
-    def sort_key(filename):
-        parts = re.findall(r'\d+', filename)
-        return [int(p) for p in parts]
-    target_filenames.sort(key=sort_key)
+    target_filenames.sort(key=image_sort_key)
 
     # Extract numbers from all target images
-    all_new_numbers = []
-    for filename in target_filenames:
-        image_path = os.path.join(image_dir, filename)
-        num_list = extract_num_from_img(image_path)
+    image_paths = [os.path.join(image_dir, filename) for filename in target_filenames]
+    options = dict(batch_ocr=batch_ocr, cache=cache, templates=templates, detect_scale=detect_scale, strip_height=strip_height)
+    # Worker processes share one tile table through a manager process
+    manager = Manager() if tile_dedup and parallel else None
+    if tile_dedup:
+        options['tile_cache'] = TileCache(tile_dedup, manager.dict() if manager else None)
+
+    # The dedup counters come back with the per-image stats
+    collect_stats = bool(stats_report or tile_dedup)
+    extract = partial(_extract_with_stats if collect_stats else extract_num_from_img, **options)
+    start_time = time.perf_counter()
 
+    try:
+        if parallel:
+            workers = max_workers or os.cpu_count() or 1
+            # map() yields results in submission order, so the output matches the serial path
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(extract, image_paths))
+        else:
+            results = [extract(image_path) for image_path in image_paths]
+    finally:
+        if manager is not None:
+            manager.shutdown()
+
+    elapsed = time.perf_counter() - start_time
+    mode = f"parallel, {workers} workers" if parallel else "serial"
+    print(f"OCR of {len(image_paths)} images took {elapsed:.2f}s "
+          f"({len(image_paths) / elapsed if elapsed > 0 else 0:.2f} images/sec, {mode})")
+
+    if collect_stats:
+        per_image = {filename: OCRStats.from_dict(stats) for filename, (_, stats) in zip(target_filenames, results)}
+        if stats_report:
+            export_report(stats_report, process_group_id, per_image)
+        if tile_dedup:
+            print_dedup_ratio(per_image.values())
+        results = [num_list for num_list, _ in results]
+
+    all_new_numbers = []
+    for num_list in results:
         if num_list:
             all_new_numbers.extend(num_list)
     
-    if not all_new_numbers:
-        print(f"Warning: No numbers were extracted for group {process_group_id}.")
+    save_group_numbers(process_group_id, all_new_numbers, output_group_dir, store_path, outlier_filter)
+
+
+'''
+Args:
+    stats(list[OCRStats]): The stats of every image of a run with tile dedup.
+'''
+def print_dedup_ratio(stats):
+    total = OCRStats()
+    for image_stats in stats:
+        total.merge(image_stats)
+
+    hits, misses = total.counters['tile_cache_hits'], total.counters['tile_cache_misses']
+    if hits + misses:
+        print(f"Tile dedup: {hits} of {hits + misses} ROIs reused an earlier result "
+              f"({hits / (hits + misses):.1%}), {misses} unique tiles were read")
+
+
+'''
+Writes a group's numbers as they are, replacing its saved data.
+
+Args:
+    process_group_id(int): The group ID of the numbers.
+    numbers(list[int]): The numbers of the group.
+    output_group_dir(str): A directory where CSV file will be saved.
+    store_path(str): If given, write the numbers to this binary group store instead of a CSV file.
+'''
+def write_group_numbers(process_group_id, numbers, output_group_dir, store_path=None):
+    if store_path is not None:
+        write_group(store_path, process_group_id, numbers)
+        print(f"Group {process_group_id} data has been successfully saved to {store_path}")
         return
-    
-    # Filter outliers
-    filtered_numbers = filter_outliers(all_new_numbers)
 
     new_data_df = pd.DataFrame({
-        'group_id': [process_group_id] * len(filtered_numbers),
-        'number': filtered_numbers
+        'group_id': [process_group_id] * len(numbers),
+        'number': numbers
     })
 
     # The output path is now specific to the group
+    os.makedirs(output_group_dir, exist_ok=True)
     output_file_path = os.path.join(output_group_dir, f"{process_group_id}.csv")
 
-    # Always use write mode, which creates or overwrites the file
-    new_data_df.to_csv(output_file_path, index=False)
+    # Write a temporary file and rename it, so readers never see a half-written CSV
+    tmp_path = output_file_path + '.tmp'
+    new_data_df.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, output_file_path)
+
+    print(f"Group {process_group_id} data has been successfully saved to {output_file_path}")
+
+
+'''
+Removes a group's saved data, e.g. after all its images were deleted.
+
+Args:
+    process_group_id(int): The group to remove.
+    output_group_dir(str): The directory where the group CSV files are saved.
+    store_path(str): If given, remove the group from this binary group store instead.
+'''
+def delete_group_numbers(process_group_id, output_group_dir, store_path=None):
+    if store_path is not None:
+        delete_group(store_path, process_group_id)
+    else:
+        try:
+            os.remove(os.path.join(output_group_dir, f"{process_group_id}.csv"))
+        except FileNotFoundError:
+            pass
+    # Nothing is left to restore the group's removed outliers into
+    log_removed(removed_log_path(output_group_dir, store_path), {}, replaced_groups=[process_group_id])
+    print(f"Group {process_group_id} data has been removed")
+
+
+'''
+Args:
+    process_group_id(int): The group ID of the numbers.
+    numbers(list[int]): The numbers extracted from the group's images, in image order.
+    output_group_dir(str): A directory where CSV file will be saved.
+    store_path(str): If given, write the numbers to this binary group store instead of a CSV file.
+    outlier_filter(bool | dict): False writes the numbers unfiltered. A dict sets the
+                                 digit rules, see outlier_filter.outlier_mask.
+'''
+def save_group_numbers(process_group_id, numbers, output_group_dir, store_path=None, outlier_filter=True):
+    if not numbers:
+        print(f"Warning: No numbers were extracted for group {process_group_id}.")
+        return
+
+    if outlier_filter is False:
+        mask = np.zeros(len(numbers), dtype=bool)
+    else:
+        # Filter outliers, against the group itself and the saved groups around it
+        neighbours = load_neighbour_groups(process_group_id, output_group_dir, store_path)
+        digit_rules = outlier_filter if isinstance(outlier_filter, dict) else {}
+        mask = group_outlier_mask(numbers, process_group_id, neighbours, **digit_rules)
+    filtered_numbers = [number for number, outlier in zip(numbers, mask) if not outlier]
+
+    # The group is replaced as a whole, so only this run's removals can be restored
+    removed = {process_group_id: (np.flatnonzero(mask), np.asarray(numbers)[mask])} if mask.any() else {}
+    log_removed(removed_log_path(output_group_dir, store_path), removed, replaced_groups=[process_group_id])
+    if removed:
+        print(f"Removed {len(removed[process_group_id][1])} outliers from group {process_group_id}: "
+              f"{removed[process_group_id][1].tolist()}")
 
-    print(f"Group {process_group_id} data has been successfully saved to {output_file_path}")
\ No newline at end of file
+    write_group_numbers(process_group_id, filtered_numbers, output_group_dir, store_path)
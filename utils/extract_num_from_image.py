@@ -1,116 +1,505 @@
 import cv2
 import pytesseract
+import hashlib
 import numpy as np
 from tqdm import tqdm
+from .ocr_cache import make_cache_key
+from .ocr_stats import stage
+from .digit_classifier import recognize_roi
+
+# lower_yellow and upper_yellow are based on HSV
+# Hue 20~30, Saturation 40~255, Value 150~255
+LOWER_YELLOW = np.array([20, 40, 150])
+UPPER_YELLOW = np.array([30, 255, 255])
+MIN_RECT_AREA = 100
+
+# ROI preprocessing
+PADDING = 5
+TARGET_HEIGHT = 100
+BLACKHAT_KERNEL_SIZE = (20, 20)
+SQUARE_DILATE_SIZE = (3, 3)
+CROSS_DILATE_SIZE = (5, 5)
+
+TESSERACT_CONFIG = r'--oem 3 --psm 7 -c tessedit_char_whitelist=0123456789'
+# Batched mode reads a stack of ROIs, so Tesseract has to treat it as a block of lines
+BATCH_TESSERACT_CONFIG = r'--oem 3 --psm 6 -c tessedit_char_whitelist=0123456789'
+# White space between two ROIs in the batched composite
+BATCH_TILE_GAP = 40
+
+# Rows shared by two neighbouring strips in strip mode; must exceed the tallest rectangle
+STRIP_OVERLAP = 256
+
+
+def _is_inside(rect, others):
+    x, y, w, h = rect
+    return any(ox <= x and oy <= y and x + w <= ox + ow and y + h <= oy + oh for ox, oy, ow, oh in others)
+
 
 '''
 Args:
-    image_path(str): A path of the analyzed image file
+    region(np.ndarray): A BGR image or a part of one.
+    min_area(float): Contours smaller than this are noise.
+    stats(OCRStats): Optional instrumentation.
+    owned_rows(tuple): (start, end) rows of the region whose dropped contours are
+                       counted, so overlapping strips don't count them twice.
+    cut_edges(tuple): (top, bottom), True for an edge of the region that cuts through the
+                      image. Dropped contours cut by such an edge, or freed by cutting a
+                      bigger one, are not counted; the neighbouring strip sees them whole.
 Returns:
-    list[int]: A list of the extracted numbers
-               Returns an empty list on failure
+    list[tuple]: (x, y, w, h) of every yellow rectangle in region coordinates.
 '''
-def extract_num_from_img(image_path):
-    # 1. Load the image
-    try:
-        image = cv2.imread(image_path)
-        if image is None:
-            print(f"Error: Could not load the image. FILE: {image_path}")
-            return []
-    except Exception as e:
-        print(f"Error: {e}")
-        return []
-
-    # 2. Find yellow rectangles
-    # lower_yellow and upper_yellow are based on HSV
-    # Hue 20~30, Saturation 40~255, Value 150~255
-    hsv_image = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
-    lower_yellow = np.array([20, 40, 150])
-    upper_yellow = np.array([30, 255, 255])
-    mask = cv2.inRange(hsv_image, lower_yellow, upper_yellow)
+def _mask_rects(region, min_area, stats=None, owned_rows=None, cut_edges=(False, False)):
+    with stage(stats, 'hsv_mask'):
+        hsv_image = cv2.cvtColor(region, cv2.COLOR_BGR2HSV)
+        mask = cv2.inRange(hsv_image, LOWER_YELLOW, UPPER_YELLOW)
 
-    # 3. Detect and sort contours
-    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    with stage(stats, 'find_contours'):
+        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    bounding_rects = [cv2.boundingRect(contour) for contour in contours]
+    cut_rects = [
+        (x, y, w, h) for x, y, w, h in bounding_rects
+        if (cut_edges[0] and y == 0) or (cut_edges[1] and y + h == mask.shape[0])
+    ]
     number_rects = []
 
-    for contour in contours:
+    for contour, (x, y, w, h) in zip(contours, bounding_rects):
         # Filter out small noise
-        if cv2.contourArea(contour) < 100:
+        if cv2.contourArea(contour) < min_area:
+            # A contour starting on the first row of the next strip touches its cut edge there
+            # and is skipped, so it's counted here
+            counted = owned_rows is None or owned_rows[0] <= y < owned_rows[1] or (cut_edges[1] and y == owned_rows[1])
+            if stats is not None and counted and not _is_inside((x, y, w, h), cut_rects):
+                stats.count('rois_dropped_small')
             continue
 
-        x, y, w, h = cv2.boundingRect(contour)
         number_rects.append((x, y, w, h))
 
+    return number_rects
+
+
+'''
+Args:
+    band(np.ndarray): A thin BGR band across one edge of a rectangle.
+    axis(int): 1 to look for yellow rows, 0 to look for yellow columns.
+Returns:
+    np.ndarray: The indices of the rows or columns of the band that contain yellow.
+'''
+def _yellow_lines(band, axis):
+    if band.size == 0:
+        return np.empty(0, dtype=np.int64)
+    mask = cv2.inRange(cv2.cvtColor(band, cv2.COLOR_BGR2HSV), LOWER_YELLOW, UPPER_YELLOW)
+    return np.flatnonzero(mask.any(axis=axis))
+
+
+'''
+Finds the rectangles on a downscaled copy, then measures each edge exactly on the
+full-resolution image. Only thin bands across the middle of each edge are converted
+to HSV, never the whole rectangle.
+
+Args:
+    region(np.ndarray): A BGR image or a part of one.
+    detect_scale(float): The downscale factor, e.g. 0.25.
+    stats(OCRStats): Optional instrumentation.
+    owned_rows(tuple): See _mask_rects, in region coordinates.
+    cut_edges(tuple): See _mask_rects.
+Returns:
+    list[tuple]: (x, y, w, h) of every yellow rectangle in region coordinates.
+'''
+def _find_rects_downscaled(region, detect_scale, stats=None, owned_rows=None, cut_edges=(False, False)):
+    # Nearest-neighbour sampling is enough to find rectangles and far cheaper than averaging
+    with stage(stats, 'resize'):
+        small = cv2.resize(region, None, fx=detect_scale, fy=detect_scale, interpolation=cv2.INTER_NEAREST)
+    small_owned_rows = None
+    if owned_rows is not None:
+        small_owned_rows = (owned_rows[0] * detect_scale, owned_rows[1] * detect_scale)
+    coarse_rects = _mask_rects(small, MIN_RECT_AREA * detect_scale ** 2, stats, small_owned_rows, cut_edges)
+
+    # Every edge is within this many full-resolution pixels of its scaled-up position
+    margin = int(np.ceil(1 / detect_scale)) + 1
+    height, width = region.shape[:2]
+    number_rects = []
+
+    for x, y, w, h in coarse_rects:
+        x_start, y_start = int(x / detect_scale), int(y / detect_scale)
+        x_end, y_end = int(np.ceil((x + w) / detect_scale)), int(np.ceil((y + h) / detect_scale))
+
+        # Probe the middle half of each edge, away from corners and neighbouring rectangles
+        x_mid_start, x_mid_end = x_start + (x_end - x_start) // 4, x_end - (x_end - x_start) // 4
+        y_mid_start, y_mid_end = y_start + (y_end - y_start) // 4, y_end - (y_end - y_start) // 4
+
+        top_band = max(0, y_start - margin)
+        top_rows = _yellow_lines(region[top_band:y_start + margin, x_mid_start:x_mid_end], 1)
+        bottom_band = max(0, y_end - margin)
+        bottom_rows = _yellow_lines(region[bottom_band:min(height, y_end + margin), x_mid_start:x_mid_end], 1)
+        left_band = max(0, x_start - margin)
+        left_columns = _yellow_lines(region[y_mid_start:y_mid_end, left_band:x_start + margin], 0)
+        right_band = max(0, x_end - margin)
+        right_columns = _yellow_lines(region[y_mid_start:y_mid_end, right_band:min(width, x_end + margin)], 0)
+
+        if len(top_rows) and len(bottom_rows) and len(left_columns) and len(right_columns):
+            x_start, y_start = left_band + left_columns[0], top_band + top_rows[0]
+            x_end, y_end = right_band + right_columns[-1] + 1, bottom_band + bottom_rows[-1] + 1
+
+        number_rects.append((int(x_start), int(y_start), int(x_end - x_start), int(y_end - y_start)))
+
+    return number_rects
+
+
+def _find_rects_in_region(region, detect_scale, stats=None, owned_rows=None, cut_edges=(False, False)):
+    if detect_scale < 1:
+        return _find_rects_downscaled(region, detect_scale, stats, owned_rows, cut_edges)
+    return _mask_rects(region, MIN_RECT_AREA, stats, owned_rows, cut_edges)
+
+
+'''
+Args:
+    image(np.ndarray): The BGR image.
+    stats(OCRStats): Optional instrumentation.
+    detect_scale(float): If below 1, find the rectangles on a copy downscaled by this
+                         factor and measure them on the full-resolution image.
+    strip_height(int): If given and the image is taller, process it in overlapping
+                       horizontal strips of this height, so the HSV image and mask never
+                       cover the whole image. Rectangles taller than STRIP_OVERLAP are
+                       not supported in this mode.
+Returns:
+    list[tuple]: (x, y, w, h) of every yellow rectangle, sorted by (y, x).
+'''
+def find_number_rects(image, stats=None, detect_scale=1.0, strip_height=None):
+    height = image.shape[0]
+
+    if not strip_height or height <= strip_height:
+        number_rects = _find_rects_in_region(image, detect_scale, stats)
+    else:
+        step = strip_height - STRIP_OVERLAP
+        if detect_scale < 1:
+            # Nearest-neighbour downscaling samples every (1 / detect_scale)th row, so strips
+            # starting on that grid sample the same rows as the whole image would
+            step -= step % max(1, round(1 / detect_scale))
+        if step <= 0:
+            raise ValueError(f"strip_height must be larger than STRIP_OVERLAP ({STRIP_OVERLAP}). Got: {strip_height}")
+
+        found = set()
+        for strip_start in range(0, height, step):
+            strip_end = min(height, strip_start + strip_height)
+            strip = image[strip_start:strip_end]
+            owned_rows = (0, step if strip_end < height else strip.shape[0])
+            cut_edges = (strip_start > 0, strip_end < height)
+            strip_rects = _find_rects_in_region(strip, detect_scale, stats, owned_rows, cut_edges)
+
+            # A rectangle cut by an inner strip edge is found whole in the neighbouring strip
+            cut_rects = [
+                (x, y, w, h) for x, y, w, h in strip_rects
+                if (cut_edges[0] and y == 0) or (cut_edges[1] and y + h == strip.shape[0])
+            ]
+            for x, y, w, h in strip_rects:
+                # Cutting a rectangle also frees the yellow inside its digits (e.g. the loop of an 8)
+                if _is_inside((x, y, w, h), cut_rects):
+                    continue
+                found.add((x, strip_start + y, w, h))
+
+            if strip_end == height:
+                break
+        number_rects = list(found)
+
     number_rects.sort(key=lambda x: (x[1], x[0]))
+    if stats is not None:
+        stats.count('rois_found', len(number_rects))
+    return number_rects
 
-    # 4. Perform OCR on each number area
-    extracted_numbers = []
-    
-    # Loop through each rectange to process and visualize
-    for i, (x, y, w, h) in tqdm(enumerate(number_rects), total=len(number_rects), desc=f"Processing Numbers of '{image_path}'"):
-        padding = 5
-        y_start, y_end = max(0, y - padding), min(image.shape[0], y + h + padding)
-        x_start, x_end = max(0, x - padding), min(image.shape[1], x + w + padding)
-        roi = image[y_start:y_end, x_start:x_end]
-
-        if roi.size == 0:
-            print(f"Image: {image_path}, #{i} is empty.")
-            continue
 
-        # Resize ROI for optimizing OCR
-        target_height = 100
+'''
+Args:
+    image(np.ndarray): The BGR image.
+    rect(tuple): (x, y, w, h) of a yellow rectangle.
+    stats(OCRStats): Optional instrumentation.
+Returns:
+    np.ndarray: The binarized ROI (black digits on white), or None if the ROI is empty.
+'''
+def preprocess_roi(image, rect, stats=None):
+    x, y, w, h = rect
+    y_start, y_end = max(0, y - PADDING), min(image.shape[0], y + h + PADDING)
+    x_start, x_end = max(0, x - PADDING), min(image.shape[1], x + w + PADDING)
+    roi = image[y_start:y_end, x_start:x_end]
+
+    if roi.size == 0:
+        return None
+
+    # Resize ROI for optimizing OCR
+    with stage(stats, 'resize'):
         aspect_ratio = roi.shape[1] / roi.shape[0]
-        target_width = int(target_height * aspect_ratio)
-        resized_roi = cv2.resize(roi, (target_width, target_height), interpolation=cv2.INTER_CUBIC)
-        
-        # Preprocessing
+        target_width = int(TARGET_HEIGHT * aspect_ratio)
+        resized_roi = cv2.resize(roi, (target_width, TARGET_HEIGHT), interpolation=cv2.INTER_CUBIC)
+
+    # Preprocessing
+    with stage(stats, 'morphology'):
         gray_roi = cv2.cvtColor(resized_roi, cv2.COLOR_BGR2GRAY)
-        kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (20, 20))
+        kernel = cv2.getStructuringElement(cv2.MORPH_RECT, BLACKHAT_KERNEL_SIZE)
         blackhat = cv2.morphologyEx(gray_roi, cv2.MORPH_BLACKHAT, kernel)
         _, thresh_blackhat = cv2.threshold(blackhat, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-        thresh_roi = cv2.bitwise_not(thresh_blackhat)
-
-        # blurred_roi = cv2.medianBlur(gray_roi, 3)
-        # _, thresh_roi = cv2.threshold(blurred_roi, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-
-        cleaned_number = ""
-        custom_config = r'--oem 3 --psm 7 -c tessedit_char_whitelist=0123456789'
-
-        # Detect most numbers
-        text1 = pytesseract.image_to_string(thresh_roi, config=custom_config).strip()
-
-        if text1.isdigit():
-            cleaned_number = text1
-        else:
-            # Try using square dilation
-            kernel_v1 = np.ones((3, 3), np.uint8)
-            thinned_roi_v1 = cv2.dilate(thresh_roi, kernel_v1, iterations=1)
-            text2 = pytesseract.image_to_string(thinned_roi_v1, config=custom_config).strip()
-            if text2.isdigit():
-                cleaned_number = text2
+        return cv2.bitwise_not(thresh_blackhat)
+
+
+def _dilate_square(thresh_roi):
+    kernel_v1 = np.ones(SQUARE_DILATE_SIZE, np.uint8)
+    return cv2.dilate(thresh_roi, kernel_v1, iterations=1)
+
+
+def _dilate_cross(thresh_roi):
+    kernel_v2 = cv2.getStructuringElement(cv2.MORPH_CROSS, CROSS_DILATE_SIZE)
+    return cv2.dilate(thresh_roi, kernel_v2, iterations=1)
+
+
+'''
+Args:
+    thresh_roi(np.ndarray): A binarized ROI.
+    stats(OCRStats): Optional instrumentation.
+Returns:
+    str: The recognized digits, or "" if every pass failed.
+'''
+def ocr_roi(thresh_roi, stats=None):
+    # Detect most numbers
+    with stage(stats, 'ocr_pass1'):
+        text1 = pytesseract.image_to_string(thresh_roi, config=TESSERACT_CONFIG).strip()
+    if text1.isdigit():
+        if stats is not None:
+            stats.count('first_pass_success')
+        return text1
+
+    # Try using square dilation
+    with stage(stats, 'ocr_pass2'):
+        text2 = pytesseract.image_to_string(_dilate_square(thresh_roi), config=TESSERACT_CONFIG).strip()
+    if text2.isdigit():
+        if stats is not None:
+            stats.count('fallback1_success')
+        return text2
+
+    # Try using Cross dilation
+    with stage(stats, 'ocr_pass3'):
+        text3 = pytesseract.image_to_string(_dilate_cross(thresh_roi), config=TESSERACT_CONFIG).strip()
+    if text3.isdigit():
+        if stats is not None:
+            stats.count('fallback2_success')
+        return text3
+
+    if stats is not None:
+        stats.count('failures')
+    return ""
+
+
+'''
+Stacks the ROIs vertically into one white composite and recognizes them with a single
+Tesseract call. Each recognized word is mapped back to its ROI by its vertical position.
+
+Args:
+    rois(list[np.ndarray]): Binarized ROIs, all TARGET_HEIGHT pixels tall.
+Returns:
+    list[str]: The text recognized in each ROI, in the same order as rois. None where
+               the ROI was read as several words, which joined would be one wrong number.
+'''
+def ocr_rois_batched(rois):
+    if not rois:
+        return []
+
+    max_width = max(roi.shape[1] for roi in rois)
+    total_height = BATCH_TILE_GAP + sum(roi.shape[0] + BATCH_TILE_GAP for roi in rois)
+    composite = np.full((total_height, max_width + 2 * BATCH_TILE_GAP), 255, dtype=np.uint8)
+
+    # Top edge of each tile, used to map words back to ROIs
+    tile_tops = []
+    y = BATCH_TILE_GAP
+    for roi in rois:
+        composite[y:y + roi.shape[0], BATCH_TILE_GAP:BATCH_TILE_GAP + roi.shape[1]] = roi
+        tile_tops.append(y)
+        y += roi.shape[0] + BATCH_TILE_GAP
+    tile_tops = np.array(tile_tops)
+
+    data = pytesseract.image_to_data(composite, config=BATCH_TESSERACT_CONFIG, output_type=pytesseract.Output.DICT)
+
+    words_per_tile = [[] for _ in rois]
+    for text, left, top, height in zip(data['text'], data['left'], data['top'], data['height']):
+        text = text.strip()
+        if not text:
+            continue
+
+        center_y = top + height / 2
+        tile_index = int(np.searchsorted(tile_tops, center_y, side='right')) - 1
+        if tile_index < 0:
+            continue
+        # Words whose center falls in the gap below a tile do not belong to any ROI
+        if center_y > tile_tops[tile_index] + rois[tile_index].shape[0]:
+            continue
+        words_per_tile[tile_index].append((left, text))
+
+    return [None if len(words) > 1 else (words[0][1] if words else '') for words in words_per_tile]
+
+
+'''
+Runs the same cascade as ocr_roi, but every pass is a single Tesseract call over all
+ROIs that are still unresolved. ROIs a pass reads as several words go through ocr_roi,
+which reads each ROI as a single line.
+
+Args:
+    rois(list[np.ndarray]): Binarized ROIs.
+    stats(OCRStats): Optional instrumentation.
+Returns:
+    list[str]: The recognized digits of each ROI, "" where every pass failed.
+'''
+def ocr_rois_cascade_batched(rois, stats=None):
+    results = [""] * len(rois)
+    pending = list(range(len(rois)))
+    split = []
+
+    passes = (
+        (None, 'ocr_pass1', 'first_pass_success'),
+        (_dilate_square, 'ocr_pass2', 'fallback1_success'),
+        (_dilate_cross, 'ocr_pass3', 'fallback2_success'),
+    )
+    for transform, timer_name, counter_name in passes:
+        if not pending:
+            break
+
+        batch = [rois[i] if transform is None else transform(rois[i]) for i in pending]
+        with stage(stats, timer_name):
+            texts = ocr_rois_batched(batch)
+
+        still_pending = []
+        for i, text in zip(pending, texts):
+            if text is None:
+                split.append(i)
+            elif text.isdigit():
+                results[i] = text
             else:
-                # Try using Cross dilation
-                kernel_v2 = cv2.getStructuringElement(cv2.MORPH_CROSS, (5, 5))
-                thinned_roi_v2 = cv2.dilate(thresh_roi, kernel_v2,iterations=1)
-                text3 = pytesseract.image_to_string(thinned_roi_v2, config=custom_config).strip()
-                if text3.isdigit():
-                    cleaned_number = text3
-
-        # kernel_v1 = np.ones((3, 3), np.uint8)
-        # thinned_roi_v1 = cv2.dilate(thresh_roi, kernel_v1, iterations=1)
-        # number_text_v1 = pytesseract.image_to_string(thinned_roi_v1, config=custom_config)
-
-        # if number_text_v1.strip().isdigit():
-        #     cleaned_number = number_text_v1.strip()
-        # else:
-        #     # Detect other numbers to using cross kernel
-        #     kernel_v2 = cv2.getStructuringElement(cv2.MORPH_CROSS, (5, 5))
-        #     thinned_roi_v2 = cv2.dilate(thresh_roi, kernel_v2, iterations=1)
-        #     number_text_v2 = pytesseract.image_to_string(thinned_roi_v2, config=custom_config)
-
-        #     if number_text_v2.strip().isdigit():
-        #         cleaned_number = number_text_v2.strip()
+                still_pending.append(i)
+        if stats is not None:
+            stats.count(counter_name, sum(1 for i in pending if results[i]))
+        pending = still_pending
+
+    if stats is not None:
+        stats.count('failures', len(pending))
+        stats.count('batch_split_tiles', len(split))
+    # ocr_roi counts its own successes and failures
+    for i in split:
+        results[i] = ocr_roi(rois[i], stats)
+    return results
+
+
+'''
+Args:
+    batch_ocr(bool): Whether the batched OCR mode is used.
+    templates(np.ndarray): The digit classifier templates, if the classifier is used.
+    detect_scale(float): The rectangle detection downscale factor.
+    strip_height(int): The strip height of strip mode, or None.
+    tile_dedup(str): The TileCache mode, or None.
+Returns:
+    dict: Every parameter that can change the OCR result, used to key the OCR cache.
+'''
+def ocr_params(batch_ocr=False, templates=None, detect_scale=1.0, strip_height=None, tile_dedup=None):
+    params = {
+        'lower_yellow': LOWER_YELLOW.tolist(),
+        'upper_yellow': UPPER_YELLOW.tolist(),
+        'min_rect_area': MIN_RECT_AREA,
+        'padding': PADDING,
+        'target_height': TARGET_HEIGHT,
+        'blackhat_kernel_size': BLACKHAT_KERNEL_SIZE,
+        'square_dilate_size': SQUARE_DILATE_SIZE,
+        'cross_dilate_size': CROSS_DILATE_SIZE,
+        'tesseract_config': BATCH_TESSERACT_CONFIG if batch_ocr else TESSERACT_CONFIG,
+        'batch_ocr': batch_ocr,
+        'detect_scale': detect_scale,
+        'strip_height': strip_height,
+        'strip_overlap': STRIP_OVERLAP if strip_height else None,
+        'templates': hashlib.sha256(templates.tobytes()).hexdigest() if templates is not None else None,
+    }
+    # Batched reads of several words per ROI used to be joined into one number
+    if batch_ocr:
+        params['batch_split_words'] = 'per_roi'
+    # Exact dedup returns what OCR would, so only perceptual dedup gets its own cache entries
+    if tile_dedup == 'perceptual':
+        params['tile_dedup'] = tile_dedup
+    return params
+
+
+'''
+Args:
+    image(np.ndarray): The decoded BGR image.
+    label(str): A name of the image, used in log messages.
+    batch_ocr(bool): If True, recognize all ROIs of the image with one Tesseract call
+                     per pass instead of up to three calls per ROI.
+    stats(OCRStats): Optional instrumentation.
+    templates(np.ndarray): If given, every ROI is first read by the template digit
+                           classifier, and only ROIs it isn't confident about go
+                           through the Tesseract cascade.
+    detect_scale(float): If below 1, find the rectangles on a downscaled copy.
+    strip_height(int): If given, find the rectangles of tall images strip by strip.
+    tile_cache(TileCache): If given, ROI tiles that were already read in this run reuse
+                           their text, and repeated tiles of the image are read once.
+Returns:
+    list[int]: A list of the extracted numbers
+'''
+def extract_num_from_array(image, label, batch_ocr=False, stats=None, templates=None, detect_scale=1.0, strip_height=None,
+                           tile_cache=None):
+    # 1. Find yellow rectangles, sorted by (y, x)
+    number_rects = find_number_rects(image, stats, detect_scale, strip_height)
 
+    # 2. Preprocess each number area
+    rois = []
+    for i, rect in enumerate(number_rects):
+        thresh_roi = preprocess_roi(image, rect, stats)
+        if thresh_roi is None:
+            print(f"Image: {label}, #{i} is empty.")
+            if stats is not None:
+                stats.count('rois_empty')
+            continue
+        rois.append(thresh_roi)
+
+    # 3. Reuse the text of tiles already read in this run, and read each new tile once
+    texts = [""] * len(rois)
+    unique = list(range(len(rois)))
+    if tile_cache is not None:
+        with stage(stats, 'tile_dedup'):
+            keys = [tile_cache.key(thresh_roi) for thresh_roi in rois]
+            representatives = {}
+            unique = []
+            for i, key in enumerate(keys):
+                cached_text = tile_cache.get(key)
+                if cached_text is not None:
+                    texts[i] = cached_text
+                elif key not in representatives:
+                    representatives[key] = i
+                    unique.append(i)
+        if stats is not None:
+            stats.count('tile_cache_hits', len(rois) - len(unique))
+            stats.count('tile_cache_misses', len(unique))
+
+    # 4. Read the glyphs directly where the classifier is confident
+    pending = unique
+    if templates is not None:
+        with stage(stats, 'classifier'):
+            for i in unique:
+                texts[i] = recognize_roi(rois[i], templates)
+        if stats is not None:
+            stats.count('classifier_success', sum(bool(texts[i]) for i in unique))
+        pending = [i for i in unique if not texts[i]]
+
+    # 5. Perform OCR on each remaining number area
+    if batch_ocr:
+        pending_texts = ocr_rois_cascade_batched([rois[i] for i in pending], stats)
+    else:
+        pending_texts = [ocr_roi(rois[i], stats) for i in tqdm(pending, desc=f"Processing Numbers of '{label}'")]
+    for i, text in zip(pending, pending_texts):
+        texts[i] = text
+
+    # 6. Fan the new results out to the repeated tiles of this image and to later images.
+    #    A failed read is only shared within this image; TileCache doesn't store it.
+    if tile_cache is not None:
+        for i in unique:
+            tile_cache.put(keys[i], texts[i])
+        for i, key in enumerate(keys):
+            if key in representatives:
+                texts[i] = texts[representatives[key]]
+
+    extracted_numbers = []
+    for cleaned_number in texts:
         if cleaned_number:
             try:
                 num = int(cleaned_number)
@@ -119,4 +508,91 @@ def extract_num_from_img(image_path):
             except ValueError:
                 print(f"Warning: Could not convert {cleaned_number} to an integer.")
 
-    return extracted_numbers
\ No newline at end of file
+    return extracted_numbers
+
+
+'''
+Args:
+    image_bytes(bytes): The encoded image (PNG, JPEG, ...).
+    label(str): A name of the image, used in log messages.
+    batch_ocr(bool): If True, use the batched OCR mode.
+    cache(OCRCache): An optional OCR result cache, keyed by the image content and OCR parameters.
+    stats(OCRStats): Optional instrumentation.
+    templates(np.ndarray): Optional digit classifier templates, see extract_num_from_array.
+    detect_scale(float): Rectangle detection downscale factor, see find_number_rects.
+    strip_height(int): Strip height for tall images, see find_number_rects.
+    tile_cache(TileCache): Optional run-wide ROI tile results, see extract_num_from_array.
+Returns:
+    list[int]: A list of the extracted numbers
+               Returns an empty list on failure
+'''
+def extract_num_from_bytes(image_bytes, label, batch_ocr=False, cache=None, stats=None, templates=None,
+                           detect_scale=1.0, strip_height=None, tile_cache=None):
+    if stats is not None:
+        stats.count('images')
+
+    cache_key = None
+    if cache is not None:
+        tile_dedup = tile_cache.mode if tile_cache is not None else None
+        cache_key = make_cache_key(image_bytes, ocr_params(batch_ocr, templates, detect_scale, strip_height, tile_dedup))
+        cached_numbers = cache.get(cache_key)
+        if cached_numbers is not None:
+            if stats is not None:
+                stats.count('cache_hits')
+            return cached_numbers
+
+    try:
+        with stage(stats, 'decode'):
+            image = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_COLOR)
+        if image is None:
+            print(f"Error: Could not load the image. FILE: {label}")
+            return []
+    except Exception as e:
+        print(f"Error: {e}")
+        return []
+
+    extracted_numbers = extract_num_from_array(
+        image, label, batch_ocr=batch_ocr, stats=stats, templates=templates,
+        detect_scale=detect_scale, strip_height=strip_height, tile_cache=tile_cache
+    )
+
+    if cache is not None:
+        cache.put(cache_key, extracted_numbers)
+
+    return extracted_numbers
+
+
+'''
+Args:
+    image_path(str): A path of the analyzed image file
+    batch_ocr(bool): If True, recognize all ROIs of the image with one Tesseract call
+                     per pass instead of up to three calls per ROI.
+    cache(OCRCache): An optional OCR result cache. Unchanged images are returned from it
+                     without running OCR.
+    stats(OCRStats): Optional per-stage timers and counters. Disabled when None.
+    templates(np.ndarray): Optional digit classifier templates from
+                           digit_classifier.load_templates. Confident ROIs skip Tesseract.
+    detect_scale(float): If below 1 (e.g. 0.25), find the yellow rectangles on a downscaled
+                         copy and crop the ROIs from the full-resolution image.
+    strip_height(int): If given, process taller images in overlapping horizontal strips
+                       of this many rows to bound the memory of the HSV image and mask.
+    tile_cache(TileCache): Optional table of ROI tiles already read in this run. Repeated
+                           tiles skip OCR and get the text of their first occurrence.
+Returns:
+    list[int]: A list of the extracted numbers
+               Returns an empty list on failure
+'''
+def extract_num_from_img(image_path, batch_ocr=False, cache=None, stats=None, templates=None, detect_scale=1.0, strip_height=None,
+                        tile_cache=None):
+    # Load the image
+    try:
+        with open(image_path, 'rb') as f:
+            image_bytes = f.read()
+    except OSError as e:
+        print(f"Error: Could not load the image. FILE: {image_path} ({e})")
+        return []
+
+    return extract_num_from_bytes(
+        image_bytes, image_path, batch_ocr=batch_ocr, cache=cache, stats=stats, templates=templates,
+        detect_scale=detect_scale, strip_height=strip_height, tile_cache=tile_cache
+    )
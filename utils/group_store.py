@@ -0,0 +1,266 @@
+import os
+import re
+import json
+import time
+import numpy as np
+import pandas as pd
+
+# Under the project directory, like ocr_cache.DEFAULT_CACHE_PATH, so the store doesn't depend on where a command is run from
+DEFAULT_STORE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'groups.bin')
+STORE_DTYPE = np.int32
+# Rewrite the store once more than this share of it belongs to replaced groups
+COMPACT_THRESHOLD = 0.5
+
+
+'''
+Args:
+    store_path(str): The path of the store's data file.
+Returns:
+    str: The path of the store's group-id offset index.
+'''
+def index_path(store_path):
+    return store_path + '.index.json'
+
+
+'''
+Compaction writes the numbers to a new data file and then switches the index to it,
+so the index never points at a data file that doesn't match it.
+
+Args:
+    store_path(str): The path of the store's data file.
+    generation(int): The number of compactions so far.
+Returns:
+    str: The data file of that generation. Generation 0 is store_path itself.
+'''
+def data_path(store_path, generation=0):
+    return store_path if generation == 0 else f"{store_path}.{generation}"
+
+
+'''
+Returns:
+    int: The generation of the data file the index points at.
+    dict: The index, see load_index.
+'''
+def _load_index_with_generation(store_path):
+    path = index_path(store_path)
+    if not os.path.exists(path):
+        return 0, {}
+
+    with open(path, 'r', encoding='utf-8') as f:
+        raw_index = json.load(f)
+    # Indexes written before compaction generations are a plain {group_id: span} dict
+    generation, groups = (raw_index['generation'], raw_index['groups']) if 'groups' in raw_index else (0, raw_index)
+    return generation, {int(group_id): tuple(span) for group_id, span in groups.items()}
+
+
+'''
+Args:
+    store_path(str): The path of the store's data file.
+Returns:
+    dict: {group_id(int): (offset, length, written_at)}, offset and length in numbers,
+          not bytes, and written_at the time the group was written. Entries of stores
+          written before write times were recorded only have (offset, length).
+          Returns an empty dict if the store doesn't exist yet.
+'''
+def load_index(store_path):
+    return _load_index_with_generation(store_path)[1]
+
+
+'''
+Args:
+    store_path(str): The path of the store's data file.
+Returns:
+    dict: {group_id(int): written_at} of every stored group, in seconds since the
+          epoch. Groups without a recorded time get the mtime of the index.
+'''
+def load_write_times(store_path):
+    index = load_index(store_path)
+    if not index:
+        return {}
+    index_mtime = os.path.getmtime(index_path(store_path))
+    return {group_id: span[2] if len(span) > 2 else index_mtime for group_id, span in index.items()}
+
+
+def _save_index(store_path, index, generation):
+    path = index_path(store_path)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'generation': generation,
+            'groups': {str(group_id): list(span) for group_id, span in sorted(index.items())},
+        }, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+'''
+Args:
+    store_path(str): The path of the store's data file.
+    generation(int): The generation of the data file. Defaults to the one the index points at.
+Returns:
+    np.ndarray: A read-only memory map over every number in the store.
+'''
+def open_store(store_path, generation=None):
+    if generation is None:
+        generation = _load_index_with_generation(store_path)[0]
+    path = data_path(store_path, generation)
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return np.empty(0, dtype=STORE_DTYPE)
+    return np.memmap(path, dtype=STORE_DTYPE, mode='r')
+
+
+'''
+Appends a group's numbers to the store and points the index at them.
+A group that is written again replaces its old numbers.
+
+Args:
+    store_path(str): The path of the store's data file.
+    group_id(int): The group ID of the numbers.
+    numbers(list[int]): The numbers of the group, in image order.
+'''
+def write_group(store_path, group_id, numbers):
+    store_dir = os.path.dirname(store_path)
+    if store_dir:
+        os.makedirs(store_dir, exist_ok=True)
+
+    generation, index = _load_index_with_generation(store_path)
+    values = np.asarray(numbers, dtype=STORE_DTYPE)
+
+    path = data_path(store_path, generation)
+    offset = os.path.getsize(path) // STORE_DTYPE().itemsize if os.path.exists(path) else 0
+    with open(path, 'ab') as f:
+        f.write(values.tobytes())
+
+    # The index is only updated after the numbers are on disk
+    index[int(group_id)] = (offset, len(values), time.time())
+    _save_index(store_path, index, generation)
+
+    live = sum(span[1] for span in index.values())
+    total = offset + len(values)
+    if total and (total - live) / total > COMPACT_THRESHOLD:
+        compact_store(store_path)
+
+
+'''
+Removes a group from the store. Its numbers are dropped at the next compaction.
+
+Args:
+    store_path(str): The path of the store's data file.
+    group_id(int): The group to remove.
+'''
+def delete_group(store_path, group_id):
+    generation, index = _load_index_with_generation(store_path)
+    if index.pop(int(group_id), None) is not None:
+        _save_index(store_path, index, generation)
+
+
+'''
+Rewrites the store with only the numbers the index points at, in group order, into
+the data file of the next generation. Writing the index that points at it is the
+switch; until then readers and a crashed compaction keep using the old file.
+
+Args:
+    store_path(str): The path of the store's data file.
+'''
+def compact_store(store_path):
+    generation, index = _load_index_with_generation(store_path)
+    store = open_store(store_path, generation)
+
+    new_index = {}
+    parts = []
+    offset = 0
+    for group_id in sorted(index):
+        start, length = index[group_id][:2]
+        parts.append(np.array(store[start:start + length]))
+        # Moving the numbers doesn't change them, so the write time is kept
+        new_index[group_id] = (offset, length, *index[group_id][2:])
+        offset += length
+    del store
+
+    new_path = data_path(store_path, generation + 1)
+    with open(new_path, 'wb') as f:
+        for part in parts:
+            f.write(part.tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+    _save_index(store_path, new_index, generation + 1)
+
+    try:
+        os.remove(data_path(store_path, generation))
+    except OSError:
+        # E.g. still mapped on Windows; the next compaction's files don't collide with it
+        pass
+
+
+'''
+Args:
+    store_path(str): The path of the store's data file.
+    group_ids(list[int]): The groups to read.
+Returns:
+    dict: {group_id(int): np.ndarray} for every requested group in the store.
+          The arrays are views into the memory map, nothing is parsed or copied.
+'''
+def read_groups(store_path, group_ids):
+    generation, index = _load_index_with_generation(store_path)
+    store = open_store(store_path, generation)
+
+    groups = {}
+    for group_id in group_ids:
+        if group_id in index:
+            start, length = index[group_id][:2]
+            groups[group_id] = store[start:start + length]
+    return groups
+
+
+'''
+Args:
+    store_path(str): The path of the store's data file.
+    group_ids(list[int]): The groups to read.
+Returns:
+    pd.DataFrame: A DataFrame with 'group_id' and 'number' columns in the same
+                  layout the per-group CSV files produce.
+'''
+def read_groups_df(store_path, group_ids):
+    groups = read_groups(store_path, group_ids)
+    if not groups:
+        return pd.DataFrame(columns=['group_id', 'number'])
+
+    numbers = np.concatenate([groups[group_id] for group_id in group_ids if group_id in groups]).astype(np.int64)
+    group_column = np.repeat(
+        [group_id for group_id in group_ids if group_id in groups],
+        [len(groups[group_id]) for group_id in group_ids if group_id in groups]
+    )
+    return pd.DataFrame({'group_id': group_column, 'number': numbers})
+
+
+'''
+One-shot importer of the existing per-group CSV files into the store.
+
+Args:
+    data_dir(str): The directory where the group CSV files are stored.
+    store_path(str): The path of the store's data file.
+Returns:
+    list[int]: The imported group IDs.
+'''
+def import_csv_dir(data_dir, store_path=DEFAULT_STORE_PATH):
+    group_ids = sorted(
+        int(match.group(1))
+        for match in (re.fullmatch(r'(\d+)\.csv', f) for f in os.listdir(data_dir))
+        if match
+    )
+
+    imported = []
+    for group_id in group_ids:
+        file_path = os.path.join(data_dir, f"{group_id}.csv")
+        try:
+            df = pd.read_csv(file_path)
+        except pd.errors.EmptyDataError:
+            print(f"Warning: File '{file_path}' is empty and will be skipped")
+            continue
+
+        write_group(store_path, group_id, df['number'].to_numpy())
+        imported.append(group_id)
+
+    print(f"Imported {len(imported)} groups into {store_path}")
+    return imported
@@ -1,101 +1,359 @@
 import os
+import hashlib
+import threading
 import requests
 from bs4 import BeautifulSoup
 from tqdm import tqdm
-from urllib.parse import urljoin
+from urllib.parse import urljoin, urlsplit
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from .scrape_manifest import load_manifest, save_manifest, conditional_headers
+
+# Set header to mimic real browser
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+DOWNLOAD_CHUNK_SIZE = 256 * 1024
+DEFAULT_MAX_WORKERS = 8
+DEFAULT_PER_HOST_LIMIT = 4
+MAX_RETRIES = 3
+# Retries wait BACKOFF_FACTOR * 2 ** (retry - 1) seconds
+BACKOFF_FACTOR = 0.5
+
+
+'''
+Args:
+    pool_size(int): The number of connections kept alive per host.
+Returns:
+    requests.Session: A session with pooled connections and retry with backoff.
+'''
+def create_session(pool_size=DEFAULT_MAX_WORKERS):
+    retry = Retry(
+        total=MAX_RETRIES,
+        backoff_factor=BACKOFF_FACTOR,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(['GET', 'HEAD']),
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+
+    session = requests.Session()
+    session.headers.update(HEADERS)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+'''
+Limits how many downloads run against the same host at once.
+
+Args:
+    per_host_limit(int): The maximum number of concurrent requests per host.
+'''
+class HostLimiter:
+    def __init__(self, per_host_limit=DEFAULT_PER_HOST_LIMIT):
+        self.per_host_limit = per_host_limit
+        self._semaphores = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, url):
+        host = urlsplit(url).netloc
+        with self._lock:
+            if host not in self._semaphores:
+                self._semaphores[host] = threading.BoundedSemaphore(self.per_host_limit)
+            return self._semaphores[host]
+
+
+'''
+Args:
+    session(requests.Session)
+    url(str): The post URL.
+    manifest(dict): An optional download manifest. If it holds validators for this URL,
+                    the page is fetched conditionally and the image list of the last run
+                    is reused when the page hasn't changed. The manifest is updated in place.
+Returns:
+    list[tuple]: (sub_id, image URL) of every image in the post, numbered from 1 in page order.
+                 Returns None if the page can't be fetched or parsed.
+'''
+def find_image_urls(session, url, manifest=None):
+    headers = {}
+    if manifest is not None and manifest.get('url') == url:
+        headers = conditional_headers(manifest.get('page', {}))
+
+    try:
+        # 1. Fetch and parse the webpage
+        response = session.get(url, headers=headers, timeout=10)
+        response.raise_for_status()
+    except requests.exceptions.RequestException as e:
+        print(f"Error fetching the webpage {url}: {e}")
+        return None
+
+    if response.status_code == 304:
+        print(f"Info: Page {url} has not changed since the last scrape.")
+        return [tuple(pair) for pair in manifest['image_urls']]
+
+    # 2. Find the div tag that include specific images.
+    soup = BeautifulSoup(response.text, 'html.parser')
+    target_div = soup.find('div', id='powerbbsContent')
+
+    if not target_div:
+        print(f"Error: Could not find a <div id='powerbbsContent'> ont the page: {url}")
+        return None
+
+    # 3. Find all img tags
+    image_tags = target_div.find_all('img')
+    if not image_tags:
+        print(f"Info: No <img> tags found inside the <div id='powerbbsContent'>.")
+        return []
+
+    image_urls = []
+    for sub_id, img_tag in enumerate(image_tags, 1):
+        # Get the image source URL from the 'src' attribute
+        img_src = img_tag.get('src')
+
+        if not img_src:
+            print(f"Warning: Skipping an image tag with no 'src' attribute (Image #{sub_id})")
+            continue
+
+        # Convert relative URL to absolute URL
+        # If img_src is absolute URL, urljoin() doesn't convert to new URL
+        image_urls.append((sub_id, urljoin(url, img_src)))
+
+    if manifest is not None:
+        manifest['url'] = url
+        manifest['page'] = {
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+        }
+        manifest['image_urls'] = image_urls
+
+    return image_urls
+
+
+'''
+Args:
+    img_url(str): The image URL.
+    content_type(str): The Content-Type header of the image response.
+Returns:
+    str: The file extension, taken from the URL or guessed from the content type.
+'''
+def guess_extension(img_url, content_type):
+    # Remove URL query
+    clean_img_url = img_url.split('?')[0]
+    file_extension = os.path.splitext(clean_img_url)[1]
+
+    # If no extension in URL, try to guess
+    if not file_extension:
+        content_type = content_type.lower()
+        if 'jpeg' in content_type or 'jpg' in content_type:
+            file_extension = '.jpg'
+        elif 'png' in content_type:
+            file_extension = '.png'
+        elif 'gif' in content_type:
+            file_extension = '.gif'
+        else:
+            file_extension = '.jpg'
+
+    return file_extension
+
+
+'''
+Args:
+    session(requests.Session)
+    img_url(str): The image URL.
+    group_id(int): The group ID from this page.
+    sub_id(int): The position of the image in the post.
+    save_directory(str): A directory where the image will be saved.
+    host_limiter(HostLimiter): An optional per-host concurrency limit.
+    entry(dict): The manifest entry from the last run. If its file is still on disk,
+                 the image is requested conditionally and skipped when unchanged.
+Returns:
+    dict: The manifest entry of the saved image, with its 'filename', or None on failure.
+'''
+def download_image(session, img_url, group_id, sub_id, save_directory, host_limiter=None, entry=None):
+    try:
+        if host_limiter is not None:
+            with host_limiter(img_url):
+                return _download_image(session, img_url, group_id, sub_id, save_directory, entry)
+        return _download_image(session, img_url, group_id, sub_id, save_directory, entry)
+
+    except requests.exceptions.RequestException as e:
+        print(f"Error downloading {img_url}: {e}")
+    except Exception as e:
+        print(f"An unexpected error occurred for image {img_url}: {e}")
+    return None
+
+
+'''
+Args:
+    entry(dict): A manifest entry of an image.
+    img_url(str): The image URL found on the page now.
+    save_directory(str): The directory where the image was saved.
+Returns:
+    bool: True if the entry describes the same URL and its file is intact on disk,
+          i.e. has the recorded size and SHA-256.
+'''
+def _is_entry_reusable(entry, img_url, save_directory):
+    if not entry or entry.get('url') != img_url or not entry.get('sha256'):
+        return False
+
+    save_path = os.path.join(save_directory, entry['filename'])
+    if not os.path.exists(save_path) or os.path.getsize(save_path) != entry.get('size'):
+        return False
+
+    # A file overwritten or corrupted in place can keep its size
+    sha256 = hashlib.sha256()
+    with open(save_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(DOWNLOAD_CHUNK_SIZE), b''):
+            sha256.update(chunk)
+    return sha256.hexdigest() == entry['sha256']
+
+
+def _download_image(session, img_url, group_id, sub_id, save_directory, entry=None):
+    headers = {}
+    if _is_entry_reusable(entry, img_url, save_directory):
+        headers = conditional_headers(entry)
+
+    # Download the image
+    with session.get(img_url, headers=headers, stream=True, timeout=10) as img_response:
+        img_response.raise_for_status()
+
+        if img_response.status_code == 304:
+            return entry
+
+        # Construct the filename
+        file_extension = guess_extension(img_url, img_response.headers.get('content-type', ''))
+        filename = f"{group_id}_{sub_id}{file_extension}"
+        save_path = os.path.join(save_directory, filename)
+
+        # Save the image under a temporary name, so an interrupted download is never mistaken for a complete one
+        tmp_path = save_path + '.part'
+        sha256 = hashlib.sha256()
+        size = 0
+        with open(tmp_path, 'wb') as f:
+            for chunk in img_response.iter_content(DOWNLOAD_CHUNK_SIZE):
+                f.write(chunk)
+                sha256.update(chunk)
+                size += len(chunk)
+        os.replace(tmp_path, save_path)
+
+    return {
+        'url': img_url,
+        'filename': filename,
+        'etag': img_response.headers.get('ETag'),
+        'last_modified': img_response.headers.get('Last-Modified'),
+        'size': size,
+        'sha256': sha256.hexdigest(),
+    }
+
+
+'''
+Downloads an image into memory without touching the disk.
+
+Args:
+    session(requests.Session)
+    img_url(str): The image URL.
+    host_limiter(HostLimiter): An optional per-host concurrency limit.
+Returns:
+    tuple: (image bytes, file extension), or (None, None) on failure.
+'''
+def fetch_image_bytes(session, img_url, host_limiter=None):
+    try:
+        if host_limiter is not None:
+            with host_limiter(img_url):
+                img_response = session.get(img_url, timeout=10)
+        else:
+            img_response = session.get(img_url, timeout=10)
+        img_response.raise_for_status()
+
+        file_extension = guess_extension(img_url, img_response.headers.get('content-type', ''))
+        return img_response.content, file_extension
+
+    except requests.exceptions.RequestException as e:
+        print(f"Error downloading {img_url}: {e}")
+    except Exception as e:
+        print(f"An unexpected error occurred for image {img_url}: {e}")
+    return None, None
+
 
 '''
 Args:
     url(str)
     group_id(int): The group ID from this page
     save_directory(str): A directory where images will be saved
+    concurrent(bool): If True, download the images on a thread pool sharing one pooled session.
+    max_workers(int): The number of concurrent downloads in concurrent mode.
+    per_host_limit(int): The maximum number of concurrent downloads from a single host.
+    incremental(bool): If True, keep a per-group download manifest and send conditional
+                       requests, so unchanged images are skipped and an interrupted run
+                       resumes where it stopped.
+    strict(bool): If True, raise instead of printing when the page can't be read or an
+                  image can't be downloaded, so the caller can tell a partial scrape apart.
+Returns:
+    list[str]: The paths of the saved images.
 '''
-def scrape_images(url, group_id, save_directory):
-    # Set header to mimic real browser
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-    }
-
+def scrape_images(url, group_id, save_directory, concurrent=False, max_workers=DEFAULT_MAX_WORKERS, per_host_limit=DEFAULT_PER_HOST_LIMIT, incremental=True,
+                  strict=False):
     try:
         group_id = int(group_id)
     except (ValueError, TypeError):
         print(f"Error: group_id must be a number-like value. Got: {group_id}")
-        return
+        return []
+
+    workers = max_workers if concurrent else 1
+    saved_paths = {}
 
     try:
-        # 1. Fetch and parse the webpage
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
+        with create_session(pool_size=workers) as session:
+            manifest = load_manifest(save_directory, group_id) if incremental else None
+            image_urls = find_image_urls(session, url, manifest)
+            if image_urls is None and strict:
+                raise RuntimeError(f"The image list of {url} could not be read")
+            if not image_urls:
+                return []
 
-        # 2. Find the div tag that include specific images.
-        soup = BeautifulSoup(response.text, 'html.parser')
-        target_div = soup.find('div', id='powerbbsContent')
-
-        if not target_div:
-            print(f"Error: Could not find a <div id='powerbbsContent'> ont the page: {url}")
-            return
-
-        # 3. Find all img tags
-        image_tags = target_div.find_all('img')
-        if not image_tags:
-            print(f"Info: No <img> tags found inside the <div id='powerbbsContent'>.")
-            return
-        
-        # 4. Create the save directory if it doesn't exist
-        os.makedirs(save_directory, exist_ok=True)
-        print(f"Found {len(image_tags)} images. Saving to '{save_directory}'...")
-
-        # 5. Loop through each image tag to download and save
-        for sub_id, img_tag in tqdm(enumerate(image_tags, 1), total=len(image_tags), desc=f"Downloading Group {group_id}"):
-            # Get the image source URL from the 'src' attribute
-            img_src = img_tag.get('src')
-
-            if not img_src:
-                print(f"Warning: Skipping an image tag with no 'src' attribute (Image #{sub_id})")
-                continue
-
-            # Convert relative URL to absolute URL
-            # If img_src is absolute URL, urljoin() doesn't convert to new URL
-            full_img_url = urljoin(url, img_src)
-
-            try:
-                # Remove URL query
-                clean_img_url = full_img_url.split('?')[0]
-
-                # Download the image
-                img_response = requests.get(full_img_url, headers=headers, stream=True, timeout=10)
-                img_response.raise_for_status()
-
-                # Determine the file extension
-                file_extension = os.path.splitext(clean_img_url)[1]
-
-                # If no extension in URL, try to guess
-                if not file_extension:
-                    content_type = img_response.headers.get('content-type', '').lower()
-                    if 'jpeg' in content_type or 'jpg' in content_type:
-                        file_extension = '.jpg'
-                    elif 'png' in content_type:
-                        file_extension = '.png'
-                    elif 'gif' in content_type:
-                        file_extension = '.gif'
-                    else:
-                        file_extension = '.jpg'
-                
-                # Construct the filename
-                filename = f"{group_id}_{sub_id}{file_extension}"
-                save_path = os.path.join(save_directory, filename)
-
-                # Save the image
-                with open(save_path, 'wb') as f:
-                    for chunk in img_response.iter_content(1024):
-                        f.write(chunk)
-            
-            except requests.exceptions.RequestException as e:
-                print(f"Error downloading {full_img_url}: {e}")
-            except Exception as e:
-                print(f"An unexpected error occurred for image {full_img_url}: {e}")
+            # 4. Create the save directory if it doesn't exist
+            os.makedirs(save_directory, exist_ok=True)
+            print(f"Found {len(image_urls)} images. Saving to '{save_directory}'...")
+
+            # 5. Download and save every image
+            # The filename only depends on (group_id, sub_id), so completion order doesn't matter
+            host_limiter = HostLimiter(per_host_limit)
+            previous_entries = manifest['images'] if incremental else {}
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = {
+                    executor.submit(
+                        download_image, session, img_url, group_id, sub_id, save_directory,
+                        host_limiter, previous_entries.get(str(sub_id))
+                    ): sub_id
+                    for sub_id, img_url in image_urls
+                }
+                skipped = 0
+                for future in tqdm(as_completed(futures), total=len(futures), desc=f"Downloading Group {group_id}"):
+                    sub_id = futures[future]
+                    entry = future.result()
+                    if not entry:
+                        continue
+
+                    saved_paths[sub_id] = os.path.join(save_directory, entry['filename'])
+                    if entry is previous_entries.get(str(sub_id)):
+                        skipped += 1
+                    elif incremental:
+                        # Save after every image, so an interrupted run keeps what it finished
+                        manifest['images'][str(sub_id)] = entry
+                        save_manifest(save_directory, group_id, manifest)
+
+            if incremental:
+                save_manifest(save_directory, group_id, manifest)
+                print(f"{skipped} unchanged images skipped, {len(saved_paths) - skipped} downloaded")
+
+            if strict and len(saved_paths) < len(image_urls):
+                raise RuntimeError(f"{len(image_urls) - len(saved_paths)} of {len(image_urls)} images could not be downloaded")
 
-    except requests.exceptions.RequestException as e:
-        print(f"Error fetching the webpage {url}: {e}")
     except Exception as e:
-        print(f"An unexpected error occurred: {e}")
\ No newline at end of file
+        if strict:
+            raise
+        print(f"An unexpected error occurred: {e}")
+
+    return [saved_paths[sub_id] for sub_id in sorted(saved_paths)]
@@ -0,0 +1,120 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+
+# Under the project directory, so the cache doesn't depend on where a command is run from
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.cache', 'ocr_cache.sqlite')
+DEFAULT_MAX_ENTRIES = 100_000
+
+
+'''
+Args:
+    image_bytes(bytes): The raw content of the image file.
+    params(dict): Every parameter that can change the OCR result.
+Returns:
+    str: A key that changes whenever the image content or any OCR parameter changes.
+'''
+def make_cache_key(image_bytes, params):
+    content_hash = hashlib.sha256(image_bytes).hexdigest()
+    params_hash = hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()
+    return f"{content_hash}:{params_hash[:16]}"
+
+
+'''
+A persistent, content-addressed store of OCR results backed by a SQLite file.
+The least recently used entries are evicted once max_entries is exceeded.
+The connection is opened lazily, so the cache can be handed to worker processes.
+
+Args:
+    path(str): The SQLite file.
+    max_entries(int): The maximum number of cached images.
+'''
+class OCRCache:
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._conn = None
+
+    def __getstate__(self):
+        return {'path': self.path, 'max_entries': self.max_entries}
+
+    def __setstate__(self, state):
+        self.__init__(state['path'], state['max_entries'])
+
+    def _connect(self):
+        if self._conn is None:
+            cache_dir = os.path.dirname(self.path)
+            if cache_dir:
+                os.makedirs(cache_dir, exist_ok=True)
+
+            # Worker processes share the file, so wait on locks instead of failing
+            self._conn = sqlite3.connect(self.path, timeout=30)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS ocr_results ("
+                "key TEXT PRIMARY KEY, numbers TEXT NOT NULL, last_access REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON ocr_results (last_access)")
+            self._conn.commit()
+        return self._conn
+
+    '''
+    Args:
+        key(str): A key from make_cache_key.
+    Returns:
+        list[int]: The cached numbers, or None on a miss.
+    '''
+    def get(self, key):
+        conn = self._connect()
+        row = conn.execute("SELECT numbers FROM ocr_results WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+
+        conn.execute("UPDATE ocr_results SET last_access = ? WHERE key = ?", (time.time(), key))
+        conn.commit()
+        return json.loads(row[0])
+
+    '''
+    Args:
+        key(str): A key from make_cache_key.
+        numbers(list[int]): The numbers extracted from the image.
+    '''
+    def put(self, key, numbers):
+        conn = self._connect()
+        conn.execute(
+            "INSERT OR REPLACE INTO ocr_results (key, numbers, last_access) VALUES (?, ?, ?)",
+            (key, json.dumps([int(n) for n in numbers]), time.time())
+        )
+        self.evict()
+        conn.commit()
+
+    '''
+    Deletes the least recently used entries until at most max_entries remain.
+    '''
+    def evict(self):
+        conn = self._connect()
+        (count,) = conn.execute("SELECT COUNT(*) FROM ocr_results").fetchone()
+        excess = count - self.max_entries
+        if excess > 0:
+            conn.execute(
+                "DELETE FROM ocr_results WHERE key IN "
+                "(SELECT key FROM ocr_results ORDER BY last_access ASC LIMIT ?)",
+                (excess,)
+            )
+            conn.commit()
+
+    def clear(self):
+        conn = self._connect()
+        conn.execute("DELETE FROM ocr_results")
+        conn.commit()
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def __len__(self):
+        (count,) = self._connect().execute("SELECT COUNT(*) FROM ocr_results").fetchone()
+        return count
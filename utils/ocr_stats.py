@@ -0,0 +1,116 @@
+import os
+import csv
+import json
+import time
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+
+# Returned instead of a timer when instrumentation is disabled, so a disabled stage costs one `with`
+_NO_STAGE = nullcontext()
+
+TIMERS = (
+    'decode', 'hsv_mask', 'find_contours', 'resize', 'morphology', 'tile_dedup', 'classifier',
+    'ocr_pass1', 'ocr_pass2', 'ocr_pass3',
+)
+COUNTERS = (
+    'images', 'cache_hits', 'rois_found', 'rois_dropped_small', 'rois_empty', 'tile_cache_hits', 'tile_cache_misses',
+    'classifier_success', 'batch_split_tiles', 'first_pass_success', 'fallback1_success', 'fallback2_success',
+    'failures',
+)
+
+
+'''
+Per-stage timers (seconds) and event counters of the OCR engine.
+'''
+class OCRStats:
+    def __init__(self):
+        self.timings = defaultdict(float)
+        self.counters = defaultdict(int)
+
+    @contextmanager
+    def _timer(self, name):
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] += time.perf_counter() - start_time
+
+    def count(self, name, n=1):
+        self.counters[name] += n
+
+    '''
+    Args:
+        other(OCRStats | dict): Stats to add to these, e.g. from a worker process.
+    '''
+    def merge(self, other):
+        if isinstance(other, OCRStats):
+            other = other.to_dict()
+        for name, seconds in other['timings'].items():
+            self.timings[name] += seconds
+        for name, n in other['counters'].items():
+            self.counters[name] += n
+
+    def to_dict(self):
+        return {
+            'timings': {name: self.timings.get(name, 0.0) for name in TIMERS},
+            'counters': {name: self.counters.get(name, 0) for name in COUNTERS},
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        stats = cls()
+        stats.merge(data)
+        return stats
+
+
+'''
+Args:
+    stats(OCRStats): The stats to record into, or None when instrumentation is disabled.
+    name(str): The stage name.
+Returns:
+    A context manager that times the stage, or a shared no-op when stats is None.
+'''
+def stage(stats, name):
+    if stats is None:
+        return _NO_STAGE
+    return stats._timer(name)
+
+
+'''
+Writes the per-image and total stats of a group. A .csv path gets one row per
+image plus a TOTAL row; any other path gets JSON.
+
+Args:
+    path(str): The report file.
+    group_id(int): The group ID of the images.
+    per_image(dict): {image name: OCRStats} in processing order.
+'''
+def export_report(path, group_id, per_image):
+    total = OCRStats()
+    for stats in per_image.values():
+        total.merge(stats)
+
+    report_dir = os.path.dirname(path)
+    if report_dir:
+        os.makedirs(report_dir, exist_ok=True)
+
+    if path.lower().endswith('.csv'):
+        fieldnames = ['group_id', 'image'] + [f"{name}_sec" for name in TIMERS] + list(COUNTERS)
+        with open(path, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=fieldnames)
+            writer.writeheader()
+            for image, stats in [*per_image.items(), ('TOTAL', total)]:
+                data = stats.to_dict()
+                row = {'group_id': group_id, 'image': image}
+                row.update({f"{name}_sec": seconds for name, seconds in data['timings'].items()})
+                row.update(data['counters'])
+                writer.writerow(row)
+    else:
+        with open(path, 'w') as f:
+            json.dump({
+                'group_id': group_id,
+                'total': total.to_dict(),
+                'images': {image: stats.to_dict() for image, stats in per_image.items()},
+            }, f, indent=2)
+
+    print(f"OCR stats report for group {group_id} saved to: {path}")
@@ -0,0 +1,340 @@
+import os
+import re
+import csv
+import json
+import time
+from multiprocessing import get_context
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+from .scrape_manifest import manifest_path
+
+DEFAULT_SCRAPE_WORKERS = 4
+DEFAULT_DOWNLOAD_WORKERS = 8
+REPORT_DIR = 'reports/'
+# {group_id: {filename: mtime}} of the images each group's data was read from
+INPUT_STAMPS_FILE = '.ocr_inputs.json'
+
+IMAGE_NAME_PATTERN = re.compile(r'(\d+)_\d+\.(png|jpe?g)', re.IGNORECASE)
+
+# The heavy modules (requests, OpenCV, pandas) are only imported by stages that
+# actually run, so a no-op build is just a few stat calls.
+
+
+'''
+Args:
+    path(str): A .json file ({"gid": "url"} or [[gid, "url"], ...]) or a CSV file
+               with one "gid,url" row per group and an optional header.
+Returns:
+    list[tuple]: (group_id, url) pairs sorted by group ID.
+'''
+def load_group_manifest(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        if path.lower().endswith('.json'):
+            data = json.load(f)
+            pairs = data.items() if isinstance(data, dict) else data
+        else:
+            pairs = [row for row in csv.reader(f) if row and row[0].strip().isdigit()]
+    return sorted((int(group_id), url.strip()) for group_id, url in pairs)
+
+
+'''
+Args:
+    image_dir(str): A path to the directory containing images.
+    group_id(int): If given, only list this group's images.
+Returns:
+    dict: {group_id: {filename: mtime}} of every image in the directory.
+'''
+def scan_group_images(image_dir, group_id=None):
+    images = {}
+    if not os.path.isdir(image_dir):
+        return images
+
+    with os.scandir(image_dir) as entries:
+        for entry in entries:
+            match = IMAGE_NAME_PATTERN.fullmatch(entry.name)
+            if not match or (group_id is not None and int(match.group(1)) != group_id):
+                continue
+            images.setdefault(int(match.group(1)), {})[entry.name] = entry.stat().st_mtime
+    return images
+
+
+def _mtime(path):
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return None
+
+
+'''
+The scrape stage is up to date when the group's download manifest is for the same
+URL and newer than the group manifest. The network isn't checked; use force for that.
+'''
+def _scrape_is_current(image_dir, group_id, url, group_manifest_mtime):
+    path = manifest_path(image_dir, group_id)
+    mtime = _mtime(path)
+    if mtime is None or mtime < group_manifest_mtime:
+        return False
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f).get('url') == url
+    except (OSError, json.JSONDecodeError):
+        return False
+
+
+'''
+Args:
+    data_dir(str): The directory where the group CSV files are stored.
+    store_path(str): If given, the binary group store holding the data instead.
+Returns:
+    callable: Maps a group ID to the modification time of its data, or None if it has none.
+'''
+def _data_mtimes(data_dir, store_path=None):
+    if store_path is None:
+        return lambda group_id: _mtime(os.path.join(data_dir, f"{group_id}.csv"))
+
+    # The store has one file for all groups, so each group's write time is kept in the index
+    from .group_store import load_write_times
+    return load_write_times(store_path).get
+
+
+'''
+Args:
+    data_dir(str): The directory where the group CSV files are stored.
+    store_path(str): If given, the binary group store holding the data instead.
+Returns:
+    str: The path of the stamps of the images every group's data was read from.
+'''
+def input_stamps_path(data_dir, store_path=None):
+    if store_path is not None:
+        return store_path + INPUT_STAMPS_FILE
+    return os.path.join(data_dir, INPUT_STAMPS_FILE)
+
+
+'''
+Returns:
+    dict: {group_id(int): {filename: mtime}}, empty if no stamps were saved yet.
+'''
+def load_input_stamps(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return {int(group_id): images for group_id, images in json.load(f).items()}
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
+def save_input_stamps(path, stamps):
+    stamps_dir = os.path.dirname(path)
+    if stamps_dir:
+        os.makedirs(stamps_dir, exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({str(group_id): images for group_id, images in sorted(stamps.items())}, f)
+    os.replace(tmp_path, path)
+
+
+def _report_path(report_dir, day):
+    return os.path.join(report_dir, f"day_{day}.json")
+
+
+'''
+Writes the batch analysis result of a day as JSON, through a temporary file.
+
+Args:
+    report_dir(str): The directory of the reports.
+    day(int): The target day.
+    result(dict): The day's result from run_batch_analysis.
+'''
+def write_day_report(report_dir, day, result):
+    os.makedirs(report_dir, exist_ok=True)
+    report = {
+        'day': day,
+        'relevant_group_ids': result['relevant_group_ids'],
+        'quantiles': result['quantiles'],
+        'last_digit_freq': [int(count) for count in result['last_digit_freq']],
+        'medians_over_time': {
+            str(group_id): None if median != median else float(median)
+            for group_id, median in result['medians_over_time'].items()
+        },
+        'recommendations': result['recommendations'],
+    }
+
+    path = _report_path(report_dir, day)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+'''
+Runs scrape → OCR → data → analysis for every group of a manifest, make-style: a
+stage only runs when its outputs are missing or older than its inputs. A group's
+data is up to date when the names and mtimes of its images match the ones it was
+read from, which are stamped even when no numbers were found. A group whose images
+are all gone loses its data.
+
+Groups are scraped on a thread pool (scrape_workers groups at once, each with
+download_workers downloads) and every image goes to one shared OCR process pool as
+soon as its group is scraped, so many groups are in flight at once. A group's data
+is written once all its images are read; a group whose scrape failed is not OCR'd.
+Finally every day a group feeds into (gid + 7) whose report is older than its data,
+or that lost a group, is analysed in one batch and written to report_dir/day_{day}.json.
+
+Args:
+    group_manifest(str): The (gid, url) manifest, see load_group_manifest.
+    image_dir(str): A path to the directory containing images.
+    data_dir(str): A directory where the group CSV files are saved.
+    report_dir(str): A directory where the analysis reports are saved.
+    scrape_workers(int): The number of groups scraped at once.
+    download_workers(int): The number of concurrent downloads per group.
+    ocr_workers(int): The number of OCR worker processes. Defaults to the CPU count.
+    store_path(str): If given, use this binary group store instead of CSV files.
+    k(int): The number of recommendations per day.
+    force(bool): If True, run every stage regardless of timestamps.
+    outlier_filter(bool | dict): False writes the numbers unfiltered. A dict sets the
+                                 digit rules, see outlier_filter.outlier_mask.
+    ocr_options(dict): Keyword arguments for extract_num_from_img, e.g. batch_ocr or cache.
+Returns:
+    dict: {stage: {'run': n, 'skipped': n, 'failed': n}} for 'scrape', 'ocr' and 'analysis'.
+'''
+def run_orchestrator(group_manifest, image_dir, data_dir, report_dir=REPORT_DIR, scrape_workers=DEFAULT_SCRAPE_WORKERS,
+                     download_workers=DEFAULT_DOWNLOAD_WORKERS, ocr_workers=None, store_path=None, k=5, force=False,
+                     outlier_filter=True, **ocr_options):
+    start_time = time.perf_counter()
+    summary = {stage: {'run': 0, 'skipped': 0, 'failed': 0} for stage in ('scrape', 'ocr', 'analysis')}
+
+    groups = load_group_manifest(group_manifest)
+    group_manifest_mtime = _mtime(group_manifest)
+    images = scan_group_images(image_dir)
+    stamps_path = input_stamps_path(data_dir, store_path)
+    stamps = load_input_stamps(stamps_path)
+    stamps_changed = False
+    data_mtime = _data_mtimes(data_dir, store_path)
+
+    executors = {}
+    pending = {}
+    ocr_results = {}
+    ocr_inputs = {}
+    deleted_groups = set()
+
+    def executor(kind):
+        # Pools are only started for stages that have work
+        if kind not in executors:
+            if kind == 'scrape':
+                executors[kind] = ThreadPoolExecutor(max_workers=scrape_workers)
+            else:
+                # Scrape threads may hold locks (requests, tqdm, logging) by now, which a
+                # forked worker would inherit locked, so the workers start from scratch
+                executors[kind] = ProcessPoolExecutor(max_workers=ocr_workers or os.cpu_count() or 1,
+                                                      mp_context=get_context('spawn'))
+        return executors[kind]
+
+    def is_current(group_id, group_images):
+        nonlocal stamps_changed
+        if group_id in stamps:
+            return stamps[group_id] == group_images
+
+        # Data written before stamps were kept is current if it's newer than every image
+        mtime = data_mtime(group_id)
+        if mtime is None or mtime < max(group_images.values()):
+            return False
+        stamps[group_id] = group_images
+        stamps_changed = True
+        return True
+
+    def start_ocr(group_id):
+        nonlocal stamps_changed
+        group_images = images.get(group_id, {})
+        if not group_images:
+            if group_id in stamps:
+                from .extract_csv import delete_group_numbers
+                delete_group_numbers(group_id, data_dir, store_path)
+                del stamps[group_id]
+                stamps_changed = True
+                deleted_groups.add(group_id)
+                summary['ocr']['run'] += 1
+            return
+        if not force and is_current(group_id, group_images):
+            summary['ocr']['skipped'] += 1
+            return
+
+        from .extract_csv import image_sort_key
+        from .extract_num_from_image import extract_num_from_img
+        filenames = sorted(group_images, key=image_sort_key)
+        ocr_results[group_id] = [None] * len(filenames)
+        ocr_inputs[group_id] = dict(group_images)
+        for position, filename in enumerate(filenames):
+            future = executor('ocr').submit(extract_num_from_img, os.path.join(image_dir, filename), **ocr_options)
+            pending[future] = ('ocr', group_id, position)
+
+    try:
+        for group_id, url in groups:
+            if force or not _scrape_is_current(image_dir, group_id, url, group_manifest_mtime):
+                from .image_scraper import scrape_images
+                future = executor('scrape').submit(
+                    scrape_images, url, group_id, image_dir, concurrent=True, max_workers=download_workers, strict=True
+                )
+                pending[future] = ('scrape', group_id, None)
+            else:
+                summary['scrape']['skipped'] += 1
+                start_ocr(group_id)
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                kind, group_id, position = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    # A failed scrape may have left a partial image set, so its group isn't OCR'd
+                    print(f"Error: {kind} of group {group_id} failed: {e}")
+                    if kind == 'scrape' or ocr_results.pop(group_id, None) is not None:
+                        summary[kind]['failed'] += 1
+                    continue
+
+                if kind == 'scrape':
+                    summary['scrape']['run'] += 1
+                    images.pop(group_id, None)
+                    images.update(scan_group_images(image_dir, group_id))
+                    start_ocr(group_id)
+                elif group_id in ocr_results:
+                    ocr_results[group_id][position] = result
+                    if all(num_list is not None for num_list in ocr_results[group_id]):
+                        from .extract_csv import save_group_numbers
+                        numbers = [number for num_list in ocr_results.pop(group_id) for number in num_list]
+                        save_group_numbers(group_id, numbers, data_dir, store_path, outlier_filter)
+                        # Stamped after the data is written, so a crash in between only costs a re-read
+                        stamps[group_id] = ocr_inputs.pop(group_id)
+                        save_input_stamps(stamps_path, stamps)
+                        summary['ocr']['run'] += 1
+    finally:
+        for pool in executors.values():
+            pool.shutdown(cancel_futures=True)
+        if stamps_changed:
+            save_input_stamps(stamps_path, stamps)
+
+    # Analysis: a day is stale if its report is older than the data of any group it reads
+    data_mtime = _data_mtimes(data_dir, store_path)
+    stale_days = []
+    for day in sorted({group_id + 7 for group_id, _ in groups}):
+        input_groups = range((day - 1) % 7 + 1, day, 7)
+        input_mtimes = [mtime for mtime in map(data_mtime, input_groups) if mtime is not None]
+        if not input_mtimes:
+            continue
+        report_mtime = _mtime(_report_path(report_dir, day))
+        lost_input = not deleted_groups.isdisjoint(input_groups)
+        if force or lost_input or report_mtime is None or report_mtime < max(input_mtimes):
+            stale_days.append(day)
+        else:
+            summary['analysis']['skipped'] += 1
+
+    if stale_days:
+        from .analyze_data import run_batch_analysis
+        results = run_batch_analysis(stale_days, k=k, store_path=store_path, data_dir=data_dir)
+        for day, result in results.items():
+            write_day_report(report_dir, day, result)
+        summary['analysis']['run'] += len(results)
+
+    elapsed = time.perf_counter() - start_time
+    print(f"Build of {len(groups)} groups finished in {elapsed:.2f}s")
+    for stage, counts in summary.items():
+        print(f"-> {stage}: {counts['run']} run, {counts['skipped']} up to date, {counts['failed']} failed")
+    return summary
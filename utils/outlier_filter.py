@@ -0,0 +1,344 @@
+import os
+import time
+import warnings
+import numpy as np
+import pandas as pd
+from .group_store import read_groups
+
+# Fences are FENCE_K interquartile ranges above Q3, on log1p(number) because the
+# numbers are heavily right-skewed
+FENCE_K = 2.5
+# The smallest log-IQR a fence is built from, so a group of mostly equal numbers
+# doesn't flag everything above them
+MIN_LOG_IQR = 0.5
+# Group IDs on each side whose quartiles form the rolling history
+HISTORY_WINDOW = 3
+# Groups with fewer numbers are only judged against their history
+MIN_GROUP_SIZE = 20
+# The digit-count check only applies when this share of a group has the same digit
+# count. A group spread over several lengths has a tail that really is longer.
+DIGIT_MAJORITY = 0.75
+# Numbers with at least this many digits more than the majority are misreads, e.g.
+# two numbers read as one. One extra digit is still the normal tail of the distribution.
+DIGIT_TOLERANCE = 2
+
+# Every removed number is logged here (next to the store in store mode), so a filter
+# run can be undone with restore_removed
+REMOVED_LOG_FILE = '.removed_outliers.csv'
+REMOVED_LOG_COLUMNS = ['run', 'group_id', 'position', 'number']
+
+# By default only misreads on the high side are flagged: low numbers are the whole
+# point of the game, and a dropped digit can't be told apart from a real low pick.
+# short_digits=True flags numbers that are too short as well.
+
+
+def _digit_counts(values):
+    return np.floor(np.log10(np.maximum(values, 1))).astype(np.int64) + 1
+
+
+'''
+Args:
+    sorted_values(np.ndarray): The values sorted by group, then by value.
+    starts(np.ndarray): The offset of every group in sorted_values.
+    counts(np.ndarray): The number of values of every group.
+    q(float): The quantile.
+Returns:
+    np.ndarray: The q-quantile of every group with pandas' linear interpolation,
+                NaN for empty groups.
+'''
+def _group_quantiles(sorted_values, starts, counts, q):
+    nonempty = counts > 0
+    position = starts + q * np.maximum(counts - 1, 0)
+    lower = np.floor(position).astype(np.int64)
+    upper = np.minimum(lower + 1, starts + counts - 1)
+    lower, upper = np.where(nonempty, lower, 0), np.where(nonempty, upper, 0)
+
+    quantiles = sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+    return np.where(nonempty, quantiles, np.nan)
+
+
+'''
+Rolling median over the neighbouring groups, excluding the group itself.
+
+Args:
+    per_group(np.ndarray): One value per group, in group order. NaN for no data.
+    group_ids(np.ndarray): The sorted, unique group ID of every group.
+Returns:
+    np.ndarray: The median over the groups at most HISTORY_WINDOW IDs away, NaN if
+                none has data. Groups across a gap in the IDs are not each other's history.
+'''
+def _neighbour_median(per_group, group_ids):
+    positions = np.arange(len(group_ids))
+    first = np.searchsorted(group_ids, group_ids - HISTORY_WINDOW, side='left')
+    end = np.searchsorted(group_ids, group_ids + HISTORY_WINDOW, side='right')
+
+    # The IDs are unique, so at most 2 * HISTORY_WINDOW + 1 groups fall within the window
+    candidates = first[:, None] + np.arange(2 * HISTORY_WINDOW + 1)
+    in_window = (candidates < end[:, None]) & (candidates != positions[:, None])
+    windows = np.where(in_window, per_group[np.minimum(candidates, len(per_group) - 1)], np.nan)
+    with warnings.catch_warnings():
+        # Groups without any neighbour data give all-NaN windows
+        warnings.simplefilter('ignore', RuntimeWarning)
+        return np.nanmedian(windows, axis=1)
+
+
+'''
+Flags OCR misreads in many groups at once.
+
+A number is an outlier if it is above the FENCE_K log-IQR fence of its own group and
+above the fence built from the median quartiles of its neighbouring groups, or if it
+has at least digit_tolerance digits more than the digit count shared by at least
+DIGIT_MAJORITY of its group, e.g. two numbers read as one. With short_digits, at
+least digit_tolerance digits fewer counts too, e.g. a dropped digit.
+
+Args:
+    values(np.ndarray): The numbers of all groups.
+    group_index(np.ndarray): The position of each number's group in group_ids.
+    group_ids(np.ndarray): The sorted, unique group IDs. The history of a group is
+                           taken from the IDs within HISTORY_WINDOW of its own.
+    digit_tolerance(int): The digit count difference from the majority that is a misread.
+    short_digits(bool): If True, also flag numbers with too few digits.
+Returns:
+    np.ndarray: A boolean mask, True for outliers.
+'''
+def outlier_mask(values, group_index, group_ids, digit_tolerance=DIGIT_TOLERANCE, short_digits=False):
+    values = np.asarray(values, dtype=np.int64)
+    group_index = np.asarray(group_index, dtype=np.int64)
+    group_ids = np.asarray(group_ids, dtype=np.int64)
+    n_groups = len(group_ids)
+    if values.size == 0:
+        return np.zeros(0, dtype=bool)
+
+    counts = np.bincount(group_index, minlength=n_groups)
+    starts = np.cumsum(counts) - counts
+
+    # One sort over (group, value) gives the quartiles of every group
+    order = np.argsort((group_index << 32) | np.clip(values, 0, 2 ** 31 - 1), kind='stable')
+    sorted_log = np.log1p(np.maximum(values[order], 0))
+    q1 = _group_quantiles(sorted_log, starts, counts, 0.25)
+    q3 = _group_quantiles(sorted_log, starts, counts, 0.75)
+
+    group_fence = q3 + FENCE_K * np.fmax(q3 - q1, MIN_LOG_IQR)
+    history_q1, history_q3 = _neighbour_median(q1, group_ids), _neighbour_median(q3, group_ids)
+    history_fence = history_q3 + FENCE_K * np.fmax(history_q3 - history_q1, MIN_LOG_IQR)
+
+    # Above both fences; a small group or one without neighbours uses the fence it has
+    has_group_fence = counts >= MIN_GROUP_SIZE
+    has_history_fence = ~np.isnan(history_fence)
+    fence = np.where(
+        has_group_fence & has_history_fence, np.fmax(group_fence, history_fence),
+        np.where(has_group_fence, group_fence, np.where(has_history_fence, history_fence, np.inf))
+    )
+    high = np.log1p(np.maximum(values, 0)) > fence[group_index]
+
+    digits = np.minimum(_digit_counts(values), 19)
+    digit_table = np.bincount(group_index * 20 + digits, minlength=n_groups * 20).reshape(n_groups, 20)
+    typical_digits = digit_table.argmax(axis=1)
+    majority = digit_table.max(axis=1) >= DIGIT_MAJORITY * np.maximum(counts, 1)
+    checked = majority & has_group_fence
+    digit_difference = digits - typical_digits[group_index]
+    wrong_length = digit_difference >= digit_tolerance
+    if short_digits:
+        wrong_length |= digit_difference <= -digit_tolerance
+
+    return high | (checked[group_index] & wrong_length)
+
+
+'''
+Args:
+    groups(dict): {group_id: np.ndarray} of the numbers of every group.
+    digit_rules: digit_tolerance and short_digits, see outlier_mask.
+Returns:
+    dict: {group_id: np.ndarray} boolean outlier mask of every group.
+'''
+def outlier_masks(groups, **digit_rules):
+    group_ids = sorted(groups)
+    arrays = [np.asarray(groups[group_id], dtype=np.int64) for group_id in group_ids]
+    lengths = [len(array) for array in arrays]
+    if not arrays:
+        return {}
+
+    values = np.concatenate(arrays)
+    group_index = np.repeat(np.arange(len(group_ids)), lengths)
+    mask = outlier_mask(values, group_index, group_ids, **digit_rules)
+    return dict(zip(group_ids, np.split(mask, np.cumsum(lengths)[:-1])))
+
+
+'''
+Args:
+    num_list(list[int]): The numbers of one group.
+    group_id(int): The group ID of the numbers.
+    neighbours(dict): {group_id: np.ndarray} of the neighbouring groups, or None.
+    digit_rules: digit_tolerance and short_digits, see outlier_mask.
+Returns:
+    np.ndarray: The boolean outlier mask of num_list.
+'''
+def group_outlier_mask(num_list, group_id=0, neighbours=None, **digit_rules):
+    return outlier_masks({**(neighbours or {}), group_id: num_list}, **digit_rules)[group_id]
+
+
+'''
+Args:
+    group_ids(list[int]): The groups to read.
+    data_dir(str): The directory where the group CSV files are stored.
+    store_path(str): If given, read the groups from this binary group store instead.
+Returns:
+    dict: {group_id: np.ndarray} of the requested groups that have saved data.
+'''
+def load_groups(group_ids, data_dir, store_path=None):
+    if store_path is not None:
+        return {g: np.asarray(numbers, dtype=np.int64) for g, numbers in read_groups(store_path, group_ids).items()}
+
+    groups = {}
+    for group_id in group_ids:
+        file_path = os.path.join(data_dir, f"{group_id}.csv")
+        if not os.path.exists(file_path):
+            continue
+        try:
+            groups[group_id] = pd.read_csv(file_path, usecols=['number'])['number'].to_numpy(dtype=np.int64)
+        except pd.errors.EmptyDataError:
+            continue
+    return groups
+
+
+'''
+Args:
+    group_id(int): The group whose neighbours are read.
+    data_dir(str): The directory where the group CSV files are stored.
+    store_path(str): If given, read the groups from this binary group store instead.
+Returns:
+    dict: {group_id: np.ndarray} of the saved groups within HISTORY_WINDOW of group_id.
+'''
+def load_neighbour_groups(group_id, data_dir, store_path=None):
+    neighbour_ids = [g for g in range(group_id - HISTORY_WINDOW, group_id + HISTORY_WINDOW + 1) if g != group_id]
+    return load_groups(neighbour_ids, data_dir, store_path)
+
+
+'''
+Args:
+    data_dir(str): The directory where the group CSV files are stored.
+    store_path(str): If given, the binary group store holding the data instead.
+Returns:
+    str: The path of the log of removed outliers.
+'''
+def removed_log_path(data_dir, store_path=None):
+    if store_path is not None:
+        return store_path + REMOVED_LOG_FILE
+    return os.path.join(data_dir, REMOVED_LOG_FILE)
+
+
+def _read_removed_log(path):
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=REMOVED_LOG_COLUMNS, dtype=np.int64)
+    return pd.read_csv(path, dtype=np.int64)
+
+
+def _save_removed_log(path, log):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = path + '.tmp'
+    log.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+
+'''
+Records the removed numbers of one filter run, so the run can be undone.
+
+Args:
+    path(str): The log path from removed_log_path.
+    removed(dict): {group_id: (positions, numbers)}, the positions being the indices
+                   of the removed numbers in the group before filtering.
+    replaced_groups(list[int]): Groups whose data was replaced as a whole, e.g. by a
+                                new OCR run. Their older entries no longer apply.
+'''
+def log_removed(path, removed, replaced_groups=()):
+    if not removed and not os.path.exists(path):
+        return
+
+    log = _read_removed_log(path)
+    if len(replaced_groups):
+        log = log[~log['group_id'].isin(list(replaced_groups))]
+    run = int(log['run'].max()) + 1 if len(log) else 1
+    new_rows = [
+        pd.DataFrame({'run': run, 'group_id': group_id, 'position': positions, 'number': numbers}, dtype=np.int64)
+        for group_id, (positions, numbers) in removed.items()
+    ]
+    _save_removed_log(path, pd.concat([log, *new_rows], ignore_index=True) if new_rows else log)
+
+
+'''
+Re-filters every saved group in one vectorized pass, without OCR, and rewrites the
+groups that lose numbers. The removed numbers are logged, see restore_removed.
+
+Args:
+    data_dir(str): The directory where the group CSV files are stored.
+    store_path(str): If given, re-filter this binary group store instead.
+    dry_run(bool): If True, only report what would be removed.
+    digit_rules: digit_tolerance and short_digits, see outlier_mask.
+Returns:
+    dict: {group_id: [removed numbers]} of every group with outliers.
+'''
+def refilter_history(data_dir, store_path=None, dry_run=False, **digit_rules):
+    from .analyze_data import load_all_groups
+    from .extract_csv import write_group_numbers
+    groups = load_all_groups(data_dir, store_path)
+    total_rows = sum(len(numbers) for numbers in groups.values())
+
+    start_time = time.perf_counter()
+    masks = outlier_masks(groups, **digit_rules)
+    elapsed = time.perf_counter() - start_time
+
+    removed = {group_id: (np.flatnonzero(mask), groups[group_id][mask]) for group_id, mask in masks.items() if mask.any()}
+    if not dry_run and removed:
+        # Logged first, so an interrupted run can still be undone
+        log_removed(removed_log_path(data_dir, store_path), removed)
+        for group_id in removed:
+            write_group_numbers(group_id, groups[group_id][~masks[group_id]], data_dir, store_path)
+
+    print(f"Filtered {total_rows} numbers of {len(groups)} groups in {elapsed:.3f}s "
+          f"({total_rows / elapsed if elapsed > 0 else 0:,.0f} rows/sec)")
+    action = "Would remove" if dry_run else "Removed"
+    print(f"-> {action} {sum(len(numbers) for _, numbers in removed.values())} outliers from {len(removed)} groups")
+    for group_id, (_, numbers) in removed.items():
+        print(f"  - Group {group_id}: {numbers.tolist()}")
+    return {group_id: numbers.tolist() for group_id, (_, numbers) in removed.items()}
+
+
+'''
+Undoes the last logged filter run: puts its removed numbers back at their old
+positions and drops the run from the log.
+
+Args:
+    data_dir(str): The directory where the group CSV files are stored.
+    store_path(str): If given, restore into this binary group store instead.
+Returns:
+    dict: {group_id: [restored numbers]} of every restored group.
+'''
+def restore_removed(data_dir, store_path=None):
+    from .extract_csv import write_group_numbers
+    path = removed_log_path(data_dir, store_path)
+    log = _read_removed_log(path)
+    if log.empty:
+        print("No removed outliers to restore")
+        return {}
+
+    run = log['run'].max()
+    last_run = log[log['run'] == run]
+    current = load_groups(sorted(last_run['group_id'].unique()), data_dir, store_path)
+
+    restored = {}
+    for group_id, rows in last_run.groupby('group_id'):
+        kept = current.get(group_id, np.empty(0, dtype=np.int64))
+        numbers = np.empty(len(kept) + len(rows), dtype=np.int64)
+        if rows['position'].max() >= len(numbers):
+            print(f"Warning: Group {group_id} changed since its outliers were removed and is not restored")
+            continue
+        is_restored = np.zeros(len(numbers), dtype=bool)
+        is_restored[rows['position'].to_numpy()] = True
+        numbers[is_restored] = rows.sort_values('position')['number'].to_numpy()
+        numbers[~is_restored] = kept
+        write_group_numbers(group_id, numbers, data_dir, store_path)
+        restored[int(group_id)] = rows['number'].tolist()
+
+    _save_removed_log(path, log[log['run'] != run])
+    print(f"Restored {len(last_run)} outliers to {len(restored)} groups")
+    return restored
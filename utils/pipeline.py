@@ -0,0 +1,103 @@
+import os
+import time
+from multiprocessing import get_context
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from .image_scraper import (
+    create_session, find_image_urls, fetch_image_bytes, HostLimiter,
+    DEFAULT_MAX_WORKERS, DEFAULT_PER_HOST_LIMIT
+)
+from .extract_num_from_image import extract_num_from_bytes
+from .extract_csv import save_group_numbers
+
+
+'''
+Scrapes a post and OCRs its images in one streaming pass. Every image is decoded
+from the downloaded bytes and sent to the OCR pool as soon as it arrives, so
+downloads and OCR overlap. The CSV is written once all images are done.
+
+Args:
+    url(str): The post URL.
+    group_id(int): The group ID from this page.
+    output_group_dir(str): A directory where CSV file will be saved.
+    image_dir(str): If given, the downloaded images are also saved here as
+                    {group_id}_{sub_id}{ext}. If None, images never touch the disk.
+    download_workers(int): The number of concurrent downloads.
+    ocr_workers(int): The number of OCR worker processes. Defaults to the CPU count.
+    per_host_limit(int): The maximum number of concurrent downloads from a single host.
+    batch_ocr(bool): If True, use the batched OCR mode.
+    cache(OCRCache): An optional OCR result cache.
+    store_path(str): If given, write the numbers to this binary group store instead of a CSV file.
+    templates(np.ndarray): Optional digit classifier templates.
+    detect_scale(float): Find the yellow rectangles on a copy downscaled by this factor.
+    strip_height(int): If given, process very tall images in horizontal strips of this many rows.
+    outlier_filter(bool | dict): False writes the numbers unfiltered. A dict sets the
+                                 digit rules, see outlier_filter.outlier_mask.
+Returns:
+    list[int]: The extracted numbers in image order, before outlier filtering.
+'''
+def run_pipeline(url, group_id, output_group_dir, image_dir=None, download_workers=DEFAULT_MAX_WORKERS,
+                 ocr_workers=None, per_host_limit=DEFAULT_PER_HOST_LIMIT, batch_ocr=False, cache=None, store_path=None, templates=None,
+                 detect_scale=1.0, strip_height=None, outlier_filter=True):
+    try:
+        group_id = int(group_id)
+    except (ValueError, TypeError):
+        print(f"Error: group_id must be a number-like value. Got: {group_id}")
+        return []
+
+    start_time = time.perf_counter()
+
+    with create_session(pool_size=download_workers) as session:
+        image_urls = find_image_urls(session, url)
+        if not image_urls:
+            return []
+
+        if image_dir:
+            os.makedirs(image_dir, exist_ok=True)
+        print(f"Found {len(image_urls)} images. Streaming them into OCR...")
+
+        host_limiter = HostLimiter(per_host_limit)
+        ocr_futures = {}
+
+        # The OCR workers are only started at the first submit, when the download threads may
+        # hold locks (requests, logging) that a forked worker would inherit locked, so they
+        # start from scratch instead
+        with ThreadPoolExecutor(max_workers=download_workers) as download_executor, \
+             ProcessPoolExecutor(max_workers=ocr_workers or os.cpu_count() or 1, mp_context=get_context('spawn')) as ocr_executor:
+            download_futures = {
+                download_executor.submit(fetch_image_bytes, session, img_url, host_limiter): sub_id
+                for sub_id, img_url in image_urls
+            }
+
+            # Hand each image to OCR as soon as its download finishes
+            for future in as_completed(download_futures):
+                sub_id = download_futures[future]
+                image_bytes, file_extension = future.result()
+                if image_bytes is None:
+                    continue
+
+                filename = f"{group_id}_{sub_id}{file_extension}"
+                if image_dir:
+                    # Written under a temporary name, so an interrupted run never leaves a truncated image to OCR
+                    save_path = os.path.join(image_dir, filename)
+                    tmp_path = save_path + '.part'
+                    with open(tmp_path, 'wb') as f:
+                        f.write(image_bytes)
+                    os.replace(tmp_path, save_path)
+
+                ocr_futures[sub_id] = ocr_executor.submit(
+                    extract_num_from_bytes, image_bytes, filename, batch_ocr=batch_ocr, cache=cache, templates=templates,
+                    detect_scale=detect_scale, strip_height=strip_height
+                )
+
+            # Merge in sub_id order, which is the order create_csv reads the files in
+            all_new_numbers = []
+            for sub_id in sorted(ocr_futures):
+                num_list = ocr_futures[sub_id].result()
+                if num_list:
+                    all_new_numbers.extend(num_list)
+
+    elapsed = time.perf_counter() - start_time
+    print(f"Pipeline for group {group_id} processed {len(ocr_futures)} images in {elapsed:.2f}s")
+
+    save_group_numbers(group_id, all_new_numbers, output_group_dir, store_path, outlier_filter)
+    return all_new_numbers
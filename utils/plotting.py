@@ -0,0 +1,207 @@
+import os
+import atexit
+import hashlib
+import matplotlib
+import matplotlib.pyplot as plt
+import seaborn as sns
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, wait
+
+PLOT_MODES = ('none', 'sync', 'deferred')
+PLOT_WORKERS = 2
+
+_plot_executor = None
+_pending_plots = []
+
+
+'''
+Args:
+    numbers(pd.Series): All numbers of the relevant days.
+    target_day(int): The target day, used for the title.
+    save_path(str): Where the PNG is written.
+'''
+def plot_distribution(numbers, target_day, save_path):
+    # Overall Distribution (Histogram + KDE)
+    plt.figure(figsize=(12, 7))
+    sns.histplot(numbers, kde=True, bins=50)
+    plt.title(f"Overall Number Distribution(for Target Day {target_day})", fontsize=16)
+    plt.xlabel("Number", fontsize=12)
+    plt.ylabel("Frequency", fontsize=12)
+    plt.grid(True, linestyle='--', alpha=0.6)
+
+    plt.savefig(save_path)
+    plt.close()
+    print(f"-> Overall distribution plot saved to: {save_path}")
+
+
+'''
+Draws the same plot as plot_distribution from a value histogram, so streaming mode
+never materializes the numbers.
+
+Args:
+    value_counts(np.ndarray): The value histogram (index = number).
+    overflow_values(np.ndarray): The values above the histogram, see NumberSketch.
+    overflow_counts(np.ndarray): The counts of overflow_values.
+    target_day(int): The target day, used for the title.
+    save_path(str): Where the PNG is written.
+'''
+def plot_distribution_histogram(value_counts, overflow_values, overflow_counts, target_day, save_path):
+    dense_values = np.flatnonzero(value_counts)
+    values = np.concatenate([dense_values, overflow_values])
+    weights = np.concatenate([value_counts[dense_values], overflow_counts])
+    plt.figure(figsize=(12, 7))
+    sns.histplot(x=values, weights=weights, kde=True, bins=50)
+    plt.title(f"Overall Number Distribution(for Target Day {target_day})", fontsize=16)
+    plt.xlabel("Number", fontsize=12)
+    plt.ylabel("Frequency", fontsize=12)
+    plt.grid(True, linestyle='--', alpha=0.6)
+
+    plt.savefig(save_path)
+    plt.close()
+    print(f"-> Overall distribution plot saved to: {save_path}")
+
+
+'''
+Args:
+    bucket_counts(pd.Series): The frequency of each hundreds-bucket.
+    target_day(int): The target day, used for the title.
+    save_path(str): Where the PNG is written.
+'''
+def plot_bucket_counts(bucket_counts, target_day, save_path):
+    # Hundreds-Bucket Frequency
+    x_labels = bucket_counts.index * 100
+
+    plt.figure(figsize=(24, 8))
+    sns.barplot(x=x_labels, y=bucket_counts.values, color="skyblue")
+    plt.title(f"Frequency by Hundreds-Bucket (for Target Day {target_day})", fontsize=16)
+    plt.xlabel("Hundreds Bucket", fontsize=12)
+    plt.ylabel("Frequency", fontsize=12)
+    plt.xticks(rotation=45, fontsize=8)
+    plt.tight_layout()
+
+    plt.savefig(save_path)
+    plt.close()
+    print(f"-> Hundreds-bucket frequency plot saved to: {save_path}")
+
+
+'''
+Args:
+    medians_over_time(pd.Series): The median value for each historical day.
+    relevant_group_ids(list): A list of the past days used in the analysis.
+    target_day(int): The target day, used for the title.
+    save_path(str): Where the PNG is written.
+'''
+def plot_trend(medians_over_time, relevant_group_ids, target_day, save_path):
+    plt.figure(figsize=(10, 6))
+    medians_over_time.plot(kind='line', marker='o', linestyle='-')
+    plt.title(f"Trend of Median Number for Cycle (Predicting Day {target_day})", fontsize=16)
+    plt.xlabel("Day Number", fontsize=12)
+    plt.ylabel("Median Number", fontsize=12)
+    plt.xticks(relevant_group_ids)
+    plt.grid(True, linestyle='--', alpha=0.6)
+
+    plt.savefig(save_path)
+    plt.close()
+    print(f"-> Trend analysis plot saved to: {save_path}")
+
+
+'''
+Args:
+    plot_func(callable): The plot function.
+    args(tuple): The data the plot is drawn from.
+Returns:
+    str: A hash of the plot function and its input data.
+'''
+def _fingerprint(plot_func, args):
+    digest = hashlib.sha256(plot_func.__name__.encode())
+    for arg in args:
+        if isinstance(arg, pd.Series):
+            digest.update(arg.index.to_numpy().tobytes())
+            arg = arg.to_numpy()
+        if isinstance(arg, np.ndarray):
+            digest.update(str((arg.dtype, arg.shape)).encode())
+            digest.update(np.ascontiguousarray(arg).tobytes())
+        else:
+            digest.update(repr(arg).encode())
+    return digest.hexdigest()
+
+
+'''
+Draws a plot unless the PNG on disk was already drawn from the same data.
+The hash of the input data is kept next to the PNG in a .sha256 file.
+
+Args:
+    plot_func(callable): One of the plot functions above.
+    save_path(str): Where the PNG is written.
+    args(tuple): The arguments of plot_func before save_path.
+Returns:
+    bool: True if the plot was drawn, False if it was up to date.
+'''
+def render_plot(plot_func, save_path, *args):
+    fingerprint = _fingerprint(plot_func, args)
+    fingerprint_path = save_path + '.sha256'
+
+    if os.path.exists(save_path) and os.path.exists(fingerprint_path):
+        with open(fingerprint_path, 'r') as f:
+            if f.read() == fingerprint:
+                print(f"-> Plot is up to date: {save_path}")
+                return False
+
+    plot_func(*args, save_path)
+    with open(fingerprint_path, 'w') as f:
+        f.write(fingerprint)
+    return True
+
+
+def _init_plot_worker():
+    # Workers never show windows, so use the headless backend
+    matplotlib.use('Agg')
+
+
+def _get_plot_executor():
+    global _plot_executor
+    if _plot_executor is None:
+        _plot_executor = ProcessPoolExecutor(max_workers=PLOT_WORKERS, initializer=_init_plot_worker)
+        atexit.register(wait_for_plots)
+    return _plot_executor
+
+
+'''
+Args:
+    plot_mode(str): 'none' skips the plot, 'sync' draws it before returning and
+                    'deferred' draws it on a background worker pool.
+    plot_func(callable): One of the plot functions above.
+    save_path(str): Where the PNG is written.
+    args(tuple): The arguments of plot_func before save_path.
+'''
+def submit_plot(plot_mode, plot_func, save_path, *args):
+    if plot_mode not in PLOT_MODES:
+        raise ValueError(f"plot_mode must be one of {PLOT_MODES}. Got: {plot_mode}")
+
+    if plot_mode == 'sync':
+        render_plot(plot_func, save_path, *args)
+    elif plot_mode == 'deferred':
+        _pending_plots.append(_get_plot_executor().submit(render_plot, plot_func, save_path, *args))
+
+
+'''
+Blocks until every deferred plot is written.
+
+Returns:
+    int: The number of plots that were drawn (not skipped as up to date).
+'''
+def wait_for_plots():
+    futures = list(_pending_plots)
+    _pending_plots.clear()
+    if not futures:
+        return 0
+
+    wait(futures)
+    rendered = 0
+    for future in futures:
+        try:
+            rendered += bool(future.result())
+        except Exception as e:
+            print(f"Error: A deferred plot failed: {e}")
+    return rendered
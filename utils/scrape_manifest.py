@@ -0,0 +1,75 @@
+import os
+import json
+
+MANIFEST_DIR_NAME = '.manifest'
+
+
+'''
+Args:
+    save_directory(str): The directory where the group's images are saved.
+    group_id(int): The group ID.
+Returns:
+    str: The path of the group's download manifest.
+'''
+def manifest_path(save_directory, group_id):
+    return os.path.join(save_directory, MANIFEST_DIR_NAME, f"{group_id}.json")
+
+
+'''
+Args:
+    save_directory(str): The directory where the group's images are saved.
+    group_id(int): The group ID.
+Returns:
+    dict: The manifest of the group, or an empty manifest if none was saved yet.
+          'url' is the post URL, 'page' holds the validators of the post page,
+          'image_urls' the (sub_id, URL) pairs found on the page and
+          'images' one entry per saved image keyed by str(sub_id), with its
+          'url', 'filename', 'etag', 'last_modified', 'size' and 'sha256'.
+'''
+def load_manifest(save_directory, group_id):
+    path = manifest_path(save_directory, group_id)
+    empty_manifest = {'url': None, 'page': {}, 'image_urls': [], 'images': {}}
+
+    if not os.path.exists(path):
+        return empty_manifest
+
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"Warning: Manifest '{path}' could not be read and will be rebuilt: {e}")
+        return empty_manifest
+
+
+'''
+Writes the manifest to a temporary file and renames it, so an interrupted run
+never leaves a half-written manifest behind.
+
+Args:
+    save_directory(str): The directory where the group's images are saved.
+    group_id(int): The group ID.
+    manifest(dict): The manifest to save.
+'''
+def save_manifest(save_directory, group_id, manifest):
+    path = manifest_path(save_directory, group_id)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+'''
+Args:
+    entry(dict): A manifest entry of an image or page.
+Returns:
+    dict: The conditional request headers built from the entry's validators.
+'''
+def conditional_headers(entry):
+    headers = {}
+    if entry.get('etag'):
+        headers['If-None-Match'] = entry['etag']
+    if entry.get('last_modified'):
+        headers['If-Modified-Since'] = entry['last_modified']
+    return headers
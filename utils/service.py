@@ -0,0 +1,209 @@
+import os
+import json
+import time
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+from .analyze_data import (
+    DATA_DIR, load_all_groups, analyze_cycle, group_days_by_cycle, recommend_from_stats, summarize_analysis
+)
+from .group_store import index_path
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8000
+DEFAULT_RELOAD_INTERVAL = 1.0
+MAX_K = 100
+
+
+'''
+Args:
+    data_dir(str): The directory where the group CSV files are stored.
+    store_path(str): If given, the binary group store holding the data instead.
+Returns:
+    tuple: (name, mtime_ns, size) of every data file. It changes whenever the data does.
+'''
+def data_signature(data_dir, store_path=None):
+    if store_path is not None:
+        paths = [store_path, index_path(store_path)]
+    elif os.path.isdir(data_dir):
+        paths = [os.path.join(data_dir, f) for f in os.listdir(data_dir) if f.endswith('.csv')]
+    else:
+        paths = []
+
+    signature = []
+    for path in sorted(paths):
+        try:
+            file_stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        signature.append((path, file_stat.st_mtime_ns, file_stat.st_size))
+    return tuple(signature)
+
+
+'''
+Every group loaded once, with the analysis of every day the data can affect
+precomputed and its default response already encoded as JSON.
+
+Args:
+    data_dir(str): The directory where the group CSV files are stored.
+    store_path(str): If given, read the groups from this binary group store instead.
+    k(int): The number of recommendations of the precomputed responses.
+'''
+class RecommendationState:
+    def __init__(self, data_dir=DATA_DIR, store_path=None, k=5):
+        # Taken before loading, so a change during the load triggers another reload
+        self.signature = data_signature(data_dir, store_path)
+        self.k = k
+        self.loaded_at = time.time()
+
+        groups = load_all_groups(data_dir, store_path)
+        self.group_count = len(groups)
+        self.results = {}
+        if groups:
+            # Days after the last group + 7 have the same history as an earlier day of their cycle
+            self.last_day = max(groups) + 7
+            histogram_size = int(max(numbers.max() for numbers in groups.values())) + 1
+            for cycle_day, days in group_days_by_cycle(range(1, self.last_day + 1)).items():
+                self.results.update(analyze_cycle(cycle_day, days, groups, k, histogram_size=histogram_size))
+        else:
+            self.last_day = 0
+
+        self.summaries = {day: self._summarize(day, result) for day, result in self.results.items()}
+        # Encoded responses by (day, k); bounded by the number of days times MAX_K
+        self.responses = {(day, k): json.dumps(summary).encode('utf-8') for day, summary in self.summaries.items()}
+
+    def _summarize(self, day, result):
+        summary = summarize_analysis(
+            result['last_digit_freq'], result['medians_over_time'], result['recommendations'], day, result['quantiles']
+        )
+        summary['relevant_group_ids'] = list(range((day - 1) % 7 + 1, day, 7))
+        return summary
+
+    '''
+    Args:
+        day(int): The target day.
+        k(int): The number of recommendations.
+    Returns:
+        bytes: The JSON summary of the day, or None if the day has no past data.
+    '''
+    def recommend(self, day, k):
+        response = self.responses.get((day, k))
+        if response is not None:
+            return response
+
+        history_day = day
+        if day > self.last_day:
+            # No group after last_day - 7 exists, so use the last day of the same cycle
+            history_day = day - (day - self.last_day + 6) // 7 * 7
+        result = self.results.get(history_day)
+        if result is None:
+            return None
+
+        summary = dict(self.summaries[history_day], day=day, relevant_group_ids=list(range((day - 1) % 7 + 1, day, 7)))
+        if k != self.k:
+            summary['recommendations'] = recommend_from_stats(
+                result['quantiles'], result['bucket_counts'], result['last_digit_freq'], result['medians_over_time'], k
+            )
+
+        response = json.dumps(summary).encode('utf-8')
+        if day <= self.last_day:
+            self.responses[(day, k)] = response
+        return response
+
+
+class RecommendationHandler(BaseHTTPRequestHandler):
+    # Keep-alive, so a client doesn't pay for a new connection per query. Headers and
+    # body are separate writes, so Nagle's algorithm would hold the body back ~40ms.
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def _send_json(self, status, body):
+        if not isinstance(body, bytes):
+            body = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        state = self.server.state
+
+        if url.path == '/health':
+            self._send_json(200, {'groups': state.group_count, 'last_day': state.last_day, 'loaded_at': state.loaded_at})
+            return
+        if url.path != '/recommend':
+            self._send_json(404, {'error': f"Unknown path: {url.path}"})
+            return
+
+        query = parse_qs(url.query)
+        try:
+            day = int(query['day'][0])
+            k = int(query.get('k', [state.k])[0])
+        except (KeyError, ValueError):
+            self._send_json(400, {'error': "Expected /recommend?day=<int>[&k=<int>]"})
+            return
+        if day < 1 or not 1 <= k <= MAX_K:
+            self._send_json(400, {'error': f"day must be positive and k between 1 and {MAX_K}"})
+            return
+
+        body = state.recommend(day, k)
+        if body is None:
+            self._send_json(404, {'error': f"No past data available in the cycle for Day {day}"})
+            return
+        self._send_json(200, body)
+
+    def log_message(self, format, *args):
+        # Logging every query to stderr would cost more than answering it
+        pass
+
+
+'''
+Args:
+    server(ThreadingHTTPServer): The running server.
+    data_dir(str): The directory where the group CSV files are stored.
+    store_path(str): If given, the binary group store holding the data instead.
+    interval(float): Seconds between checks of the data files.
+'''
+def _reload_loop(server, data_dir, store_path, interval):
+    while True:
+        time.sleep(interval)
+        if data_signature(data_dir, store_path) == server.state.signature:
+            continue
+        try:
+            # Requests keep using the old state until the new one is swapped in
+            server.state = RecommendationState(data_dir, store_path, server.state.k)
+            print(f"Reloaded {server.state.group_count} groups")
+        except Exception as e:
+            print(f"Error: Reloading the group data failed: {e}")
+
+
+'''
+Serves recommendations over HTTP until interrupted:
+    GET /recommend?day=N&k=5 : The summary report of day N as JSON.
+    GET /health              : The number of loaded groups and the load time.
+The data is reloaded in the background whenever the data files change.
+
+Args:
+    host(str): The interface to listen on.
+    port(int): The port to listen on.
+    data_dir(str): The directory where the group CSV files are stored.
+    store_path(str): If given, read the groups from this binary group store instead.
+    k(int): The default number of recommendations.
+    reload_interval(float): Seconds between checks of the data files.
+'''
+def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, data_dir=DATA_DIR, store_path=None, k=5,
+          reload_interval=DEFAULT_RELOAD_INTERVAL):
+    server = ThreadingHTTPServer((host, port), RecommendationHandler)
+    server.daemon_threads = True
+    server.state = RecommendationState(data_dir, store_path, k)
+
+    threading.Thread(target=_reload_loop, args=(server, data_dir, store_path, reload_interval), daemon=True).start()
+    print(f"Serving recommendations for {server.state.group_count} groups on http://{host}:{port}/recommend?day=N")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("Stopped serving")
+    finally:
+        server.server_close()
@@ -0,0 +1,195 @@
+import os
+import numpy as np
+import pandas as pd
+from .group_store import read_groups
+
+# Rows read at a time in streaming mode
+CHUNK_ROWS = 100_000
+# Numbers below this are counted in a dense histogram (800 KB at most). The rare larger
+# ones, e.g. a misread 123456789, are counted sparsely, so one of them can't make every
+# histogram huge. A multiple of 100, so the histogram reshapes into buckets.
+DENSE_LIMIT = 100_000
+
+
+'''
+Reads the value at each position of the sorted numbers straight from a value histogram.
+
+Args:
+    cumulative_counts(np.ndarray): np.cumsum of the value histogram.
+    positions(np.ndarray): Positions in the sorted numbers.
+    overflow_values(np.ndarray): Sorted values above the histogram, counted sparsely.
+    overflow_cumulative_counts(np.ndarray): np.cumsum of the counts of overflow_values.
+Returns:
+    np.ndarray: The values at those positions.
+'''
+def _values_at(cumulative_counts, positions, overflow_values=None, overflow_cumulative_counts=None):
+    positions = np.asarray(positions)
+    values = np.searchsorted(cumulative_counts, positions, side='right')
+    if overflow_values is not None and len(overflow_values):
+        dense_total = cumulative_counts[-1] if len(cumulative_counts) else 0
+        beyond = positions >= dense_total
+        overflow_positions = np.searchsorted(overflow_cumulative_counts, positions[beyond] - dense_total, side='right')
+        values[beyond] = overflow_values[overflow_positions]
+    return values
+
+
+'''
+Args:
+    value_counts(np.ndarray): The value histogram (index = number).
+    total(int): The number of values in the histogram.
+    overflow_values(np.ndarray): Sorted values above the histogram, counted sparsely.
+    overflow_counts(np.ndarray): The counts of overflow_values.
+Returns:
+    dict: The 'q1', 'median' and 'q3', matching pandas' linear interpolation.
+'''
+def histogram_quantiles(value_counts, total, overflow_values=None, overflow_counts=None):
+    cumulative_counts = np.cumsum(value_counts)
+    overflow_cumulative_counts = None if overflow_counts is None else np.cumsum(overflow_counts)
+    quantiles = {}
+    for name, q in (('q1', 0.25), ('median', 0.5), ('q3', 0.75)):
+        position = q * (total - 1)
+        lower = int(np.floor(position))
+        low_value, high_value = _values_at(
+            cumulative_counts, [lower, min(lower + 1, total - 1)], overflow_values, overflow_cumulative_counts
+        )
+        quantiles[name] = float(low_value + (high_value - low_value) * (position - lower))
+    return quantiles
+
+
+'''
+A mergeable summary of a stream of numbers. The numbers are small non-negative
+integers, so a value histogram is both exact and bounded: its size follows the
+largest number below DENSE_LIMIT, never the number of rows. Numbers from DENSE_LIMIT
+up are kept as sorted (value, count) arrays. Hundreds-buckets, last digits and
+quantiles are all read from both.
+'''
+class NumberSketch:
+    def __init__(self, size=0):
+        # Padded to whole hundreds so it reshapes into buckets
+        self.value_counts = np.zeros(-(-min(size, DENSE_LIMIT) // 100) * 100, dtype=np.int64)
+        self.overflow_values = np.empty(0, dtype=np.int64)
+        self.overflow_counts = np.empty(0, dtype=np.int64)
+        self.total = 0
+
+    def _grow(self, size):
+        size = min(size, DENSE_LIMIT)
+        if size > len(self.value_counts):
+            value_counts = np.zeros(-(-size // 100) * 100, dtype=np.int64)
+            value_counts[:len(self.value_counts)] = self.value_counts
+            self.value_counts = value_counts
+
+    def _add_overflow(self, values, counts):
+        values = np.concatenate([self.overflow_values, values])
+        counts = np.concatenate([self.overflow_counts, counts])
+        self.overflow_values, inverse = np.unique(values, return_inverse=True)
+        self.overflow_counts = np.bincount(inverse, weights=counts, minlength=len(self.overflow_values)).astype(np.int64)
+
+    '''
+    Args:
+        numbers(np.ndarray): A chunk of numbers. Negative numbers are ignored.
+    '''
+    def update(self, numbers):
+        numbers = np.asarray(numbers, dtype=np.int64)
+        numbers = numbers[numbers >= 0]
+        if numbers.size == 0:
+            return
+        large = numbers >= DENSE_LIMIT
+        if large.any():
+            self._add_overflow(*np.unique(numbers[large], return_counts=True))
+            numbers = numbers[~large]
+        if numbers.size:
+            self._grow(int(numbers.max()) + 1)
+            self.value_counts += np.bincount(numbers, minlength=len(self.value_counts))
+        self.total += numbers.size + int(large.sum())
+
+    '''
+    Args:
+        other(NumberSketch): A sketch to add to this one, e.g. of another group.
+    '''
+    def merge(self, other):
+        self._grow(len(other.value_counts))
+        self.value_counts[:len(other.value_counts)] += other.value_counts
+        if len(other.overflow_values):
+            self._add_overflow(other.overflow_values, other.overflow_counts)
+        self.total += other.total
+
+    def bucket_counts(self):
+        bucket_totals = self.value_counts.reshape(-1, 100).sum(axis=1)
+        nonzero_buckets = np.flatnonzero(bucket_totals)
+        counts = pd.Series(bucket_totals[nonzero_buckets], index=nonzero_buckets)
+        if len(self.overflow_values):
+            overflow = pd.Series(self.overflow_counts).groupby(self.overflow_values // 100).sum()
+            counts = pd.concat([counts, overflow])
+        return counts
+
+    def last_digit_freq(self):
+        if self.value_counts.size == 0 and self.overflow_values.size == 0:
+            return pd.Series(0, index=range(10), dtype=np.int64)
+        digit_counts = self.value_counts.reshape(-1, 10).sum(axis=0) if self.value_counts.size else np.zeros(10, np.int64)
+        if len(self.overflow_values):
+            digit_counts = digit_counts + np.bincount(
+                self.overflow_values % 10, weights=self.overflow_counts, minlength=10
+            ).astype(np.int64)
+        return pd.Series(digit_counts, index=range(10))
+
+    def quantiles(self):
+        return histogram_quantiles(self.value_counts, self.total, self.overflow_values, self.overflow_counts)
+
+
+'''
+Args:
+    data_dir(str): The directory where the group CSV files are stored.
+    group_id(int): The group to read.
+    chunk_rows(int): The number of rows per chunk.
+Yields:
+    np.ndarray: The group's numbers, at most chunk_rows at a time.
+'''
+def iter_csv_chunks(data_dir, group_id, chunk_rows=CHUNK_ROWS):
+    file_path = os.path.join(data_dir, f"{group_id}.csv")
+    if not os.path.exists(file_path):
+        print(f"Warning: File '{file_path}' not found and will be skipped")
+        return
+    try:
+        for chunk in pd.read_csv(file_path, usecols=['number'], chunksize=chunk_rows):
+            yield chunk['number'].to_numpy(dtype=np.int64)
+    except pd.errors.EmptyDataError:
+        print(f"Warning: File '{file_path}' is empty and will be skipped")
+
+
+def _iter_array_chunks(numbers, chunk_rows):
+    # Slicing a memory map only pages in the chunk being read
+    for start in range(0, len(numbers), chunk_rows):
+        yield np.asarray(numbers[start:start + chunk_rows], dtype=np.int64)
+
+
+'''
+Builds the statistics of a target day from its prior same-cycle groups in one pass,
+reading every group in chunks.
+
+Args:
+    relevant_group_ids(list[int]): The groups to summarize.
+    data_dir(str): The directory where the group CSV files are stored.
+    store_path(str): If given, read the groups from this binary group store instead.
+    chunk_rows(int): The number of rows per chunk.
+Returns:
+    NumberSketch: The sketch of all groups together.
+    pd.Series: The median of every group, NaN for groups without data.
+'''
+def sketch_groups(relevant_group_ids, data_dir, store_path=None, chunk_rows=CHUNK_ROWS):
+    stored_groups = read_groups(store_path, relevant_group_ids) if store_path is not None else None
+
+    sketch = NumberSketch()
+    medians = []
+    for group_id in relevant_group_ids:
+        if stored_groups is None:
+            chunks = iter_csv_chunks(data_dir, group_id, chunk_rows)
+        else:
+            chunks = _iter_array_chunks(stored_groups.get(group_id, []), chunk_rows)
+
+        group_sketch = NumberSketch()
+        for chunk in chunks:
+            group_sketch.update(chunk)
+        medians.append(group_sketch.quantiles()['median'] if group_sketch.total else np.nan)
+        sketch.merge(group_sketch)
+
+    return sketch, pd.Series(medians, index=relevant_group_ids, dtype=np.float64)
@@ -0,0 +1,105 @@
+import hashlib
+import cv2
+import numpy as np
+
+TILE_DEDUP_MODES = ('exact', 'perceptual')
+
+# Perceptual keys compare the ink at this size (width, height)
+PERCEPTUAL_HASH_SIZE = (64, 16)
+# Perceptual keys also hold the digits' aspect ratio, in bins of 1/8 of a doubling
+ASPECT_BINS_PER_OCTAVE = 8
+# Border ink this many pixels deeper beside the digits than the frame is a clipped digit
+CLIPPED_DEPTH_MARGIN = 3
+
+
+'''
+Args:
+    thresh_roi(np.ndarray): A binarized ROI (black digits on white) from preprocess_roi.
+Returns:
+    np.ndarray: The ROI cropped to its digits, i.e. the ink that doesn't touch the
+                ROI border, or None if there is no such ink or a digit may be clipped
+                by the border.
+'''
+def _crop_to_digits(thresh_roi):
+    ink = (thresh_roi < 128).astype(np.uint8)
+    n_labels, labels, component_stats, _ = cv2.connectedComponentsWithStats(ink, connectivity=8)
+
+    height, width = ink.shape
+    x, y, w, h = component_stats[1:, 0], component_stats[1:, 1], component_stats[1:, 2], component_stats[1:, 3]
+    inner = (x > 0) & (y > 0) & (x + w < width) & (y + h < height)
+    if not inner.any():
+        return None
+
+    x1, y1 = x[inner].min(), y[inner].min()
+    x2, y2 = (x + w)[inner].max(), (y + h)[inner].max()
+
+    # The ink touching the border is normally the frame left of the yellow rectangle,
+    # a ring as deep above and below the digits as beside them. Ink beside the digits
+    # that reaches deeper is a digit cut off by the border, and dropping it would give
+    # the tile the key of a different number.
+    border_rows, border_columns = np.nonzero(np.isin(labels, np.flatnonzero(~inner) + 1))
+    depth = np.minimum.reduce([border_rows, border_columns, height - 1 - border_rows, width - 1 - border_columns])
+    beside_digits = (border_rows >= y1) & (border_rows < y2)
+    frame_depth = depth[~beside_digits].max() if (~beside_digits).any() else 0
+    if beside_digits.any() and depth[beside_digits].max() > frame_depth + CLIPPED_DEPTH_MARGIN:
+        return None
+
+    digits = np.isin(labels[y1:y2, x1:x2], np.flatnonzero(inner) + 1)
+    return np.where(digits, 0, 255).astype(np.uint8)
+
+
+'''
+Args:
+    thresh_roi(np.ndarray): A binarized ROI from preprocess_roi.
+    mode(str): 'exact' hashes the pixels, 'perceptual' hashes the digits cropped and
+               scaled to PERCEPTUAL_HASH_SIZE, together with the crop's aspect ratio,
+               so tiles that only differ in position or a pixel of anti-aliasing share
+               a key. Tiles whose digits may be clipped get an exact key.
+Returns:
+    str: The key of the tile.
+'''
+def tile_key(thresh_roi, mode='exact'):
+    if mode == 'perceptual':
+        digits = _crop_to_digits(thresh_roi)
+        if digits is not None:
+            scaled = cv2.resize(digits, PERCEPTUAL_HASH_SIZE, interpolation=cv2.INTER_AREA)
+            # The scaling hides the width of the digits, e.g. a stretched 1 and 11
+            aspect_bin = int(round(np.log2(digits.shape[1] / digits.shape[0]) * ASPECT_BINS_PER_OCTAVE))
+            digest = hashlib.blake2b(str(aspect_bin).encode(), digest_size=16)
+            digest.update(np.packbits(scaled < 128).tobytes())
+            return 'p:' + digest.hexdigest()
+
+    digest = hashlib.blake2b(str(thresh_roi.shape).encode(), digest_size=16)
+    digest.update(np.ascontiguousarray(thresh_roi).tobytes())
+    return 'e:' + digest.hexdigest()
+
+
+'''
+The recognized text of every distinct ROI tile seen in a run, so a tile that repeats
+within or across images is only OCR'd once. Failed reads are not stored, so the
+next image with the tile tries again.
+
+Args:
+    mode(str): 'exact' or 'perceptual', see tile_key.
+    table(dict): The key -> text table. Pass a multiprocessing.Manager().dict() to
+                 share one table between worker processes; defaults to a plain dict.
+'''
+class TileCache:
+    def __init__(self, mode='exact', table=None):
+        if mode not in TILE_DEDUP_MODES:
+            raise ValueError(f"mode must be one of {TILE_DEDUP_MODES}. Got: {mode}")
+        self.mode = mode
+        self.table = {} if table is None else table
+
+    def key(self, thresh_roi):
+        return tile_key(thresh_roi, self.mode)
+
+    def get(self, key):
+        return self.table.get(key)
+
+    def put(self, key, text):
+        if text:
+            self.table[key] = text
+
+    def __len__(self):
+        return len(self.table)
@@ -0,0 +1,207 @@
+import os
+import re
+import json
+import time
+from .extract_num_from_image import extract_num_from_img
+from .extract_csv import image_sort_key, save_group_numbers, delete_group_numbers
+
+# inotify is optional; without it the image directory is polled
+try:
+    from inotify_simple import INotify, flags
+except ImportError:
+    INotify = None
+
+WATCH_STATE_FILE = '.watch_state.json'
+DEFAULT_POLL_INTERVAL = 2.0
+# Wait this long after an inotify event for the rest of a burst, e.g. a whole scrape
+DEBOUNCE_MS = 500
+
+IMAGE_NAME_PATTERN = re.compile(r'(\d+)_\d+\.(png|jpe?g)', re.IGNORECASE)
+
+
+'''
+Args:
+    output_group_dir(str): The directory where the group data is saved.
+Returns:
+    dict: {filename: {'mtime_ns', 'size', 'numbers'}} of every image processed so far.
+'''
+def load_watch_state(output_group_dir):
+    path = os.path.join(output_group_dir, WATCH_STATE_FILE)
+    if not os.path.exists(path):
+        return {}
+
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"Warning: Watch state '{path}' could not be read and will be rebuilt: {e}")
+        return {}
+
+
+def _save_watch_state(output_group_dir, state):
+    os.makedirs(output_group_dir, exist_ok=True)
+    path = os.path.join(output_group_dir, WATCH_STATE_FILE)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
+
+
+'''
+Compares image files with the watch state.
+
+Args:
+    image_dir(str): A path to the directory containing images.
+    state(dict): The watch state from load_watch_state.
+    filenames(set[str]): Only look at these files, e.g. from inotify. None scans the directory.
+    group_ids(set[int]): If given, ignore images of other groups.
+Returns:
+    dict: {filename: (mtime_ns, size)} of new or changed images.
+    list[str]: Images in the state that no longer exist.
+'''
+def scan_changes(image_dir, state, filenames=None, group_ids=None):
+    if filenames is None:
+        try:
+            filenames = set(os.listdir(image_dir)) | set(state)
+        except FileNotFoundError:
+            print(f"Error: Directory not found at {image_dir}")
+            return {}, []
+
+    changed, removed = {}, []
+    for filename in filenames:
+        match = IMAGE_NAME_PATTERN.fullmatch(filename)
+        if not match or (group_ids is not None and int(match.group(1)) not in group_ids):
+            continue
+
+        try:
+            file_stat = os.stat(os.path.join(image_dir, filename))
+        except FileNotFoundError:
+            if filename in state:
+                removed.append(filename)
+            continue
+
+        entry = state.get(filename)
+        if entry is None or entry['mtime_ns'] != file_stat.st_mtime_ns or entry['size'] != file_stat.st_size:
+            changed[filename] = (file_stat.st_mtime_ns, file_stat.st_size)
+
+    return changed, removed
+
+
+'''
+OCRs the changed images and rewrites the data of every affected group from the
+per-image numbers in the state, so unchanged images are never OCR'd again.
+
+Args:
+    image_dir(str): A path to the directory containing images.
+    output_group_dir(str): A directory where the group data is saved.
+    state(dict): The watch state, updated in place.
+    changed(dict): New or changed images from scan_changes.
+    removed(list[str]): Deleted images from scan_changes.
+    store_path(str): If given, write the numbers to this binary group store instead of a CSV file.
+    outlier_filter(bool | dict): False writes the numbers unfiltered. A dict sets the
+                                 digit rules, see outlier_filter.outlier_mask.
+    ocr_options(dict): Keyword arguments for extract_num_from_img.
+Returns:
+    list[int]: The updated group IDs.
+'''
+def apply_changes(image_dir, output_group_dir, state, changed, removed, store_path=None, outlier_filter=True, **ocr_options):
+    affected_groups = set()
+    for filename in removed:
+        state.pop(filename, None)
+        affected_groups.add(int(IMAGE_NAME_PATTERN.fullmatch(filename).group(1)))
+
+    for filename in sorted(changed, key=image_sort_key):
+        numbers = extract_num_from_img(os.path.join(image_dir, filename), **ocr_options)
+        mtime_ns, size = changed[filename]
+        state[filename] = {'mtime_ns': mtime_ns, 'size': size, 'numbers': numbers}
+        affected_groups.add(int(IMAGE_NAME_PATTERN.fullmatch(filename).group(1)))
+
+    for group_id in sorted(affected_groups):
+        filenames = sorted(
+            (f for f in state if int(IMAGE_NAME_PATTERN.fullmatch(f).group(1)) == group_id), key=image_sort_key
+        )
+        if not filenames:
+            # Every image of the group is gone, so its old data must not feed the analysis
+            delete_group_numbers(group_id, output_group_dir, store_path)
+            continue
+        numbers = [number for filename in filenames for number in state[filename]['numbers']]
+        save_group_numbers(group_id, numbers, output_group_dir, store_path, outlier_filter)
+
+    # Saved after the group data, so an interrupted update is redone on the next start
+    _save_watch_state(output_group_dir, state)
+    return sorted(affected_groups)
+
+
+def _inotify_batches(inotify, interval):
+    while True:
+        events = inotify.read(timeout=int(interval * 1000), read_delay=DEBOUNCE_MS)
+        if events:
+            yield {event.name for event in events}
+
+
+def _poll_batches(interval):
+    while True:
+        time.sleep(interval)
+        yield None
+
+
+'''
+Watches the image directory and keeps the group data up to date. New or changed
+images are OCR'd one by one and only their groups are rewritten. Uses inotify when
+inotify_simple is installed, and polls the directory otherwise.
+
+Args:
+    image_dir(str): A path to the directory containing images.
+    output_group_dir(str): A directory where the group data is saved.
+    interval(float): Seconds between polls, or the inotify read timeout.
+    group_ids(list[int]): If given, only watch the images of these groups.
+    store_path(str): If given, write the numbers to this binary group store instead of a CSV file.
+    analyze(bool): If True, re-run the analysis (without plots) of the day each updated
+                   group feeds into, i.e. the next day of its 7-day cycle.
+    once(bool): If True, process the current changes and return instead of watching.
+    outlier_filter(bool | dict): False writes the numbers unfiltered. A dict sets the
+                                 digit rules, see outlier_filter.outlier_mask.
+    ocr_options(dict): Keyword arguments for extract_num_from_img, e.g. batch_ocr or cache.
+'''
+def watch_images(image_dir, output_group_dir, interval=DEFAULT_POLL_INTERVAL, group_ids=None, store_path=None,
+                 analyze=False, once=False, outlier_filter=True, **ocr_options):
+    group_ids = set(group_ids) if group_ids else None
+    state = load_watch_state(output_group_dir)
+    use_inotify = INotify is not None and not once
+
+    if use_inotify:
+        # Watch before the first scan, so nothing written in between is missed
+        inotify = INotify()
+        inotify.add_watch(image_dir, flags.CLOSE_WRITE | flags.MOVED_TO | flags.MOVED_FROM | flags.DELETE)
+        batches = _inotify_batches(inotify, interval)
+    else:
+        batches = _poll_batches(interval)
+
+    # The first scan catches up on everything that changed while the watcher wasn't running
+    filenames = None
+
+    if not once:
+        print(f"Watching {image_dir} for new images ({'inotify' if use_inotify else 'polling'}). Press Ctrl+C to stop.")
+    try:
+        while True:
+            changed, removed = scan_changes(image_dir, state, filenames, group_ids)
+            if changed or removed:
+                print(f"Found {len(changed)} new or changed and {len(removed)} removed images")
+                updated_groups = apply_changes(
+                    image_dir, output_group_dir, state, changed, removed, store_path, outlier_filter, **ocr_options
+                )
+                if analyze:
+                    from .analyze_data import run_full_analysis
+                    for group_id in updated_groups:
+                        run_full_analysis(
+                            group_id + 7, store_path=store_path, plot_mode='none', data_dir=output_group_dir
+                        )
+
+            if once:
+                return
+            filenames = next(batches)
+    except KeyboardInterrupt:
+        print("Stopped watching")
+    finally:
+        if use_inotify:
+            inotify.close()